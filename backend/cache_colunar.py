@@ -0,0 +1,194 @@
+# backend/cache_colunar.py
+"""
+Cache de parse (Arrow IPC) das planilhas do catálogo.
+
+A planilha é convertida uma vez para um arquivo .arrow identificado pelo hash
+do conteúdo. Nos próximos starts (e nos outros workers) o DataFrame sai desse
+arquivo tipado em milissegundos, sem refazer o parse do xlsx. Ao gravar a
+versão nova, os .arrow de versões antigas da mesma planilha são apagados.
+
+Não é memória compartilhada: ler_cache converte para pandas, então cada
+worker continua com a sua cópia do DataFrame (e o CatalogoSnapshot deriva
+dele as visões e o JSON pré-renderizado). O que se economiza é o parse.
+
+Uso (ingestão manual):
+    python -m backend.cache_colunar
+"""
+import glob
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:  # sem pyarrow o catálogo continua lendo o xlsx direto
+    pa = None
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.getenv("CATALOGO_CACHE_DIR", os.path.join(ROOT_DIR, "data", "cache"))
+PLANILHAS = [os.path.join(ROOT_DIR, "data", "database.xlsx")]
+
+# Colunas da planilha com tipos misturados (ex.: MODELO com "Uno" e 500) são
+# gravadas em até três colunas tipadas e remontadas na leitura.
+_SEP = "\x00"
+_PARTES = ("str", "int", "float")
+_META_MISTAS = b"smvbr.colunas_mistas"
+
+
+def disponivel() -> bool:
+    return pa is not None
+
+
+def _nome_cache(caminho_planilha: str) -> str:
+    return os.path.splitext(os.path.basename(caminho_planilha))[0].replace(" ", "_")
+
+
+def caminho_cache(caminho_planilha: str, hash_conteudo: str) -> str:
+    return os.path.join(CACHE_DIR, f"{_nome_cache(caminho_planilha)}-{hash_conteudo[:16]}.arrow")
+
+
+def podar(caminho_planilha: str, hash_conteudo: str) -> list:
+    """Apaga os .arrow de outras versões da planilha; retorna os caminhos apagados."""
+    atual = caminho_cache(caminho_planilha, hash_conteudo)
+    nome = glob.escape(_nome_cache(caminho_planilha))
+    apagados = []
+    for antigo in glob.glob(os.path.join(glob.escape(CACHE_DIR), f"{nome}-" + "[0-9a-f]" * 16 + ".arrow")):
+        if antigo == atual:
+            continue
+        try:
+            os.remove(antigo)  # quem ainda lê o arquivo (memory-map) mantém o conteúdo até fechar
+            apagados.append(antigo)
+        except OSError as e:
+            print(f"⚠️ Não foi possível apagar o cache colunar antigo ({antigo}): {e}")
+    return apagados
+
+
+# -------------------------
+# DataFrame <-> Arrow
+# -------------------------
+def _tipo_arrow(sufixo: str):
+    return {"str": pa.string(), "int": pa.int64(), "float": pa.float64()}[sufixo]
+
+
+def _separar_coluna_mista(serie: pd.Series) -> dict:
+    """Quebra uma coluna object em colunas tipadas (uma por tipo Python presente)."""
+    partes = {}
+    tipos = serie.map(lambda v: None if v is None or (isinstance(v, float) and np.isnan(v)) else type(v).__name__)
+    for sufixo in _PARTES:
+        mascara = tipos == sufixo
+        if mascara.any():
+            valores = serie.where(mascara, None)
+            partes[sufixo] = pa.array(valores.tolist(), type=_tipo_arrow(sufixo))
+    if set(tipos.dropna().unique()) - set(_PARTES):
+        raise TypeError(f"Coluna '{serie.name}' tem tipos não suportados: {set(tipos.dropna().unique())}")
+    return partes
+
+
+def dataframe_para_tabela(df: pd.DataFrame) -> "pa.Table":
+    arrays, nomes, mistas = [], [], []
+    for col in df.columns:
+        serie = df[col]
+        try:
+            arrays.append(pa.array(serie, from_pandas=True))
+            nomes.append(col)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            mistas.append(col)
+            for sufixo, arr in _separar_coluna_mista(serie).items():
+                arrays.append(arr)
+                nomes.append(f"{col}{_SEP}{sufixo}")
+
+    tabela = pa.Table.from_arrays(arrays, names=nomes)
+    meta = {_META_MISTAS: json.dumps({"mistas": mistas, "ordem": list(df.columns)}).encode()}
+    return tabela.replace_schema_metadata(meta)
+
+
+def tabela_para_dataframe(tabela: "pa.Table") -> pd.DataFrame:
+    meta = json.loads((tabela.schema.metadata or {}).get(_META_MISTAS, b'{"mistas": [], "ordem": null}'))
+    mistas = set(meta["mistas"])
+    simples = [n for n in tabela.column_names if _SEP not in n]
+    df = tabela.select(simples).to_pandas()
+
+    for col in mistas:
+        valores = np.full(tabela.num_rows, np.nan, dtype=object)
+        for sufixo in _PARTES:
+            nome = f"{col}{_SEP}{sufixo}"
+            if nome in tabela.column_names:
+                parte = np.array(tabela.column(nome).to_pylist(), dtype=object)
+                mascara = np.array([v is not None for v in parte], dtype=bool)
+                valores[mascara] = parte[mascara]
+        df[col] = valores
+
+    if meta["ordem"]:
+        df = df[meta["ordem"]]
+    return df
+
+
+# -------------------------
+# Escrita / leitura do cache
+# -------------------------
+def gravar_cache(df: pd.DataFrame, destino: str):
+    """Grava o Arrow IPC sem compressão (a leitura fica só no custo do to_pandas)."""
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    tabela = dataframe_para_tabela(df)
+    temporario = f"{destino}.{os.getpid()}.tmp"
+    with pa.OSFile(temporario, "wb") as sink:
+        with pa.ipc.new_file(sink, tabela.schema) as writer:
+            writer.write_table(tabela)
+    os.replace(temporario, destino)  # atômico: outro worker nunca lê arquivo pela metade
+
+
+def ler_cache(origem: str) -> pd.DataFrame:
+    """DataFrame do cache (cópia própria deste processo; o memory-map só evita um buffer intermediário)."""
+    with pa.memory_map(origem, "r") as fonte:
+        tabela = pa.ipc.open_file(fonte).read_all()
+    return tabela_para_dataframe(tabela)
+
+
+def ler_planilha(caminho_planilha: str, hash_conteudo: str) -> pd.DataFrame:
+    """
+    Lê a planilha pelo cache colunar quando existe uma versão com o mesmo hash;
+    caso contrário faz o parse do xlsx e já deixa o cache gravado para os próximos.
+    """
+    if not disponivel():
+        return pd.read_excel(caminho_planilha)
+
+    destino = caminho_cache(caminho_planilha, hash_conteudo)
+    if os.path.exists(destino):
+        try:
+            return ler_cache(destino)
+        except Exception as e:
+            print(f"⚠️ Cache colunar inválido ({destino}): {e}. Relendo a planilha.")
+
+    df = pd.read_excel(caminho_planilha)
+    try:
+        gravar_cache(df, destino)
+    except Exception as e:
+        print(f"⚠️ Não foi possível gravar o cache colunar ({destino}): {e}")
+    else:
+        podar(caminho_planilha, hash_conteudo)
+    return df
+
+
+def ingerir(caminhos=PLANILHAS):
+    """Converte as planilhas para Arrow IPC (passo de ingestão, rodar após atualizar os dados)."""
+    from backend.catalogo import hash_arquivo
+
+    if not disponivel():
+        raise RuntimeError("pyarrow não está instalado")
+
+    for caminho in caminhos:
+        inicio = time.perf_counter()
+        hash_conteudo = hash_arquivo(caminho)
+        destino = caminho_cache(caminho, hash_conteudo)
+        df = pd.read_excel(caminho)
+        gravar_cache(df, destino)
+        podar(caminho, hash_conteudo)
+        print(f"{os.path.basename(caminho)} -> {destino} ({len(df)} linhas, {time.perf_counter() - inicio:.2f}s)")
+
+
+if __name__ == "__main__":
+    ingerir(sys.argv[1:] or PLANILHAS)
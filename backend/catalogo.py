@@ -0,0 +1,319 @@
+# backend/catalogo.py
+import hashlib
+import os
+import threading
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from backend import cache_colunar, quartis
+from backend.indices import IndiceInvertido, IndiceNgramas
+from backend.serializacao import pre_renderizar
+from backend.sugestoes import Sugestoes
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CAMINHO_PLANILHA = os.path.join(ROOT_DIR, "data", "database.xlsx")
+
+# De quanto em quanto tempo (segundos) o monitor confere se a planilha mudou
+INTERVALO_VERIFICACAO = float(os.getenv("CATALOGO_INTERVALO_VERIFICACAO", "30"))
+
+
+# Filtros de /filtro-carros -> nomes possíveis da coluna na planilha
+COLUNAS_FILTRO = {
+    "ano": ["ANO", "Ano", "ano"],
+    "grupo": ["GRUPO", "Grupo"],
+    "marca": ["MARCA", "Marca"],
+    "motor": ["FAIXA", "Faixa"],
+    "transmissao": ["CÂMBIO", "Câmbio"],
+    "ar_condicionado": ["AR-CONDICIONADO", "Ar-Condicionado", "AR CONDICIONADO"],
+    "direcao_assistida": ["DIREÇAO ASSISTIDA", "DIRECAO ASSISTIDA", "Direção Assistida"],
+    "combustivel": ["COMBUSTÍVEL", "Combustivel", "Combustível"],
+}
+FILTROS_NUMERICOS = {"ano"}
+
+# Coluna usada para ordenar /filtro-carros (maior pontuação primeiro)
+COLUNA_RANKING = ["Pontuação Final"]
+
+# Campos pesquisados pela busca livre de /carros
+COLUNAS_BUSCA = ["marca", "modelo", "ano"]
+
+
+# -------------------------
+# Normalização de colunas
+# -------------------------
+def normalizar_nome_coluna(coluna: str) -> str:
+    """'Emissão de CO (g/km)' -> 'emissao_de_co_g/km' (mesmo padrão usado em /favoritar)"""
+    return (
+        coluna.strip().lower()
+        .replace(" ", "_")
+        .replace("-", "_")
+        .replace("(", "")
+        .replace(")", "")
+        .replace("ç", "c")
+        .replace("ã", "a")
+        .replace("â", "a")
+        .replace("é", "e")
+        .replace("ê", "e")
+        .replace("í", "i")
+        .replace("ó", "o")
+        .replace("ô", "o")
+        .replace("ú", "u")
+    )
+
+
+def achar_coluna(df: pd.DataFrame, candidatos) -> Optional[str]:
+    """Primeira coluna cujo nome é igual a um dos candidatos (ignorando maiúsculas)."""
+    for c in candidatos:
+        for col in df.columns:
+            if col.lower() == c.lower():
+                return col
+    return None
+
+
+def _montar_indices_filtro(df: pd.DataFrame) -> dict:
+    """Um índice invertido por filtro de /filtro-carros cuja coluna existe na planilha."""
+    indices = {}
+    for filtro, candidatos in COLUNAS_FILTRO.items():
+        col = achar_coluna(df, candidatos)
+        if col:
+            indices[filtro] = IndiceInvertido(df[col], numerico=filtro in FILTROS_NUMERICOS)
+    return indices
+
+
+def _ordem_ranking(df: pd.DataFrame):
+    """
+    Permutação das linhas por pontuação decrescente (vazios no fim, empates na
+    ordem da planilha) e a posição de cada linha nessa permutação.
+    """
+    col = achar_coluna(df, COLUNA_RANKING)
+    if col is None:
+        ordem = np.arange(len(df), dtype=np.int32)
+    else:
+        scores = df[col].to_numpy(dtype=float)
+        chave = np.where(np.isnan(scores), np.inf, -scores)
+        ordem = np.argsort(chave, kind="stable").astype(np.int32)
+    rank = np.empty(len(df), dtype=np.int32)
+    rank[ordem] = np.arange(len(df), dtype=np.int32)
+    return ordem, rank
+
+
+def _preparar_busca(df: pd.DataFrame) -> pd.DataFrame:
+    """Visão usada por /carros: colunas minúsculas e marca/modelo/ano/codigo em texto maiúsculo."""
+    df = df.copy()
+    df.columns = [c.lower() for c in df.columns]
+
+    if "ano" in df.columns:
+        df["ano"] = df["ano"].apply(
+            lambda x: str(int(x)) if pd.notnull(x) and str(x).replace(".", "", 1).isdigit() else str(x)
+        ).str.strip()
+
+    for col in ["marca", "modelo", "ano", "codigo"]:
+        if col in df.columns:
+            df[col] = df[col].fillna("").astype(str).str.strip().str.upper()
+    return df
+
+
+def preparar_favoritos(df: pd.DataFrame) -> pd.DataFrame:
+    """Visão usada por /favoritar: colunas em snake_case sem acentos e codigo como texto."""
+    df = df.copy()
+    df.columns = [normalizar_nome_coluna(c) for c in df.columns]
+    if "codigo" in df.columns:
+        df["codigo"] = df["codigo"].astype(str).str.strip()
+    return df
+
+
+def hash_arquivo(caminho: str) -> str:
+    """SHA-256 do conteúdo do arquivo (lido em blocos)."""
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def _sem_espacos(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
+    df.columns = [c.strip() for c in df.columns]
+    return df
+
+
+# -------------------------
+# Snapshot
+# -------------------------
+class VisoesCatalogo:
+    """
+    Visões de /filtro-carros e /carros, o ranking e o JSON pré-renderizado de
+    cada linha: o que as respostas e a tabela catalogo_linhas (modo SQL) usam.
+    A carga do catálogo monta só isto, sem os índices do snapshot.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        df = _sem_espacos(df)
+
+        # Visão "original" (colunas só com strip) usada por /filtro-carros,
+        # com a pontuação já numérica
+        col_ranking = achar_coluna(df, COLUNA_RANKING)
+        filtro = df.copy()
+        if col_ranking:
+            filtro[col_ranking] = pd.to_numeric(filtro[col_ranking], errors="coerce")
+        self.df = filtro
+        # Ranking pré-calculado de /filtro-carros
+        self.ordem_ranking, self.rank = _ordem_ranking(filtro)
+        # Visão de /carros
+        self.df_busca = _preparar_busca(df)
+
+        # JSON de cada linha já serializado (com imagem_url) para as respostas
+        self.json_filtro = pre_renderizar(self.df)
+        self.json_busca = pre_renderizar(self.df_busca)
+
+    def __len__(self):
+        return len(self.df)
+
+
+class CatalogoSnapshot(VisoesCatalogo):
+    """
+    Versão imutável do catálogo. Tudo o que depende dos dados da planilha é
+    montado aqui, uma vez por versão; os endpoints só leem (nunca alteram)
+    estes DataFrames.
+    """
+
+    def __init__(self, df: pd.DataFrame, caminho: str, mtime: float, hash_conteudo: str):
+        super().__init__(df)
+
+        self.caminho = caminho
+        self.mtime = mtime
+        self.hash = hash_conteudo
+        self.versao = hash_conteudo[:12]
+
+        # Visão de /favoritar e os quartis recalculados (backend/quartis.py)
+        # que ele grava em quartis_veiculo; as respostas seguem a planilha
+        self.df_favoritos = preparar_favoritos(_sem_espacos(df))
+        self.quartis_banco = quartis.para_banco(self.df_favoritos)
+
+        # codigo -> posição da linha (cursor de /carros, /carros/{id} e /favoritar)
+        self.posicao_por_codigo = {c: i for i, c in enumerate(self.df_busca["codigo"])} if "codigo" in self.df_busca.columns else {}
+
+        # Índice de n-gramas da busca livre de /carros
+        colunas_busca = [c for c in COLUNAS_BUSCA if c in self.df_busca.columns]
+        self.indice_busca = IndiceNgramas(self.df_busca, colunas_busca)
+        # Vocabulário do "você quis dizer" de /carros
+        self.sugestoes = Sugestoes(self.df_busca, colunas_busca)
+
+        # Índices invertidos dos filtros de /filtro-carros
+        self.indices_filtro = _montar_indices_filtro(self.df)
+
+
+def carregar_snapshot(caminho: str = CAMINHO_PLANILHA) -> CatalogoSnapshot:
+    """Monta um novo snapshot (via cache colunar quando já existe um para este conteúdo)."""
+    if not os.path.exists(caminho):
+        raise FileNotFoundError(caminho)
+
+    mtime = os.path.getmtime(caminho)
+    hash_conteudo = hash_arquivo(caminho)
+    df = cache_colunar.ler_planilha(caminho, hash_conteudo)
+    return CatalogoSnapshot(df, caminho, mtime, hash_conteudo)
+
+
+# -------------------------
+# Estado global + recarga em segundo plano
+# -------------------------
+_snapshot: Optional[CatalogoSnapshot] = None
+_lock_carga = threading.Lock()
+_monitor: Optional[threading.Thread] = None
+_parar_monitor = threading.Event()
+_fixo = False  # usar_snapshot: o snapshot veio de fora e a planilha não o substitui
+
+
+def obter_catalogo() -> CatalogoSnapshot:
+    """
+    Retorna o snapshot atual. Só lê a planilha se nada foi carregado ainda
+    (ex.: startup não executado); no caminho normal é apenas uma leitura de referência.
+    """
+    snap = _snapshot
+    if snap is not None:
+        return snap
+    with _lock_carga:
+        if _snapshot is None:
+            _trocar_snapshot(carregar_snapshot())
+        return _snapshot
+
+
+def snapshot_atual() -> Optional[CatalogoSnapshot]:
+    """Snapshot em uso, sem carregar a planilha (None antes da primeira carga)."""
+    return _snapshot
+
+
+def _trocar_snapshot(novo: CatalogoSnapshot):
+    global _snapshot
+    _snapshot = novo  # atribuição única: leitores veem a versão antiga ou a nova, nunca metade
+
+
+def usar_snapshot(snap: CatalogoSnapshot):
+    """
+    Passa a responder com ``snap`` (ex.: catálogo sintético dos benchmarks) e
+    desliga a recarga pela planilha, inclusive a do monitor.
+    """
+    global _fixo
+    with _lock_carga:
+        _fixo = True
+        _trocar_snapshot(snap)
+    parar_monitor()
+
+
+def reiniciar():
+    """
+    Descarta o snapshot e volta a recarregar pela planilha (desfaz
+    usar_snapshot); a próxima obter_catalogo lê a planilha de novo.
+    """
+    global _fixo
+    with _lock_carga:
+        _fixo = False
+        _trocar_snapshot(None)
+
+
+def recarregar_se_mudou(caminho: str = CAMINHO_PLANILHA) -> bool:
+    """Confere mtime e, se mudou, o hash da planilha. Recarrega quando o conteúdo é outro."""
+    with _lock_carga:
+        if _fixo:
+            return False
+        atual = _snapshot
+        try:
+            mtime = os.path.getmtime(caminho)
+        except OSError:
+            return False
+
+        if atual is not None and mtime == atual.mtime:
+            return False
+
+        if atual is not None and hash_arquivo(caminho) == atual.hash:
+            atual.mtime = mtime  # só o "touch" mudou; evita recalcular o hash na próxima volta
+            return False
+
+        novo = carregar_snapshot(caminho)
+        _trocar_snapshot(novo)
+        print(f"Catálogo recarregado (versão {novo.versao}, {len(novo)} linhas)")
+        return True
+
+
+def _loop_monitor(intervalo: float):
+    while not _parar_monitor.wait(intervalo):
+        try:
+            recarregar_se_mudou()
+        except Exception as e:
+            # Mantém o snapshot anterior se a planilha nova estiver corrompida/incompleta
+            print(f"⚠️ Falha ao recarregar catálogo: {e}")
+
+
+def iniciar_monitor(intervalo: float = INTERVALO_VERIFICACAO):
+    """Inicia (uma única vez) a thread que recarrega o catálogo quando a planilha muda."""
+    global _monitor
+    if _fixo or (_monitor is not None and _monitor.is_alive()):
+        return
+    _parar_monitor.clear()
+    _monitor = threading.Thread(target=_loop_monitor, args=(intervalo,), name="monitor-catalogo", daemon=True)
+    _monitor.start()
+
+
+def parar_monitor():
+    _parar_monitor.set()
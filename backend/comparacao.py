@@ -0,0 +1,209 @@
+# backend/comparacao.py
+"""
+Comparação de vários veículos (GET /comparar e o /comparar-carros antigo).
+
+Os k veículos vêm numa única consulta: veículo + emissão + consumo do MESMO
+combustível (antes emissão e consumo eram pegos com .first() cada um, podendo
+misturar combustíveis). As métricas viram uma matriz k x m e deltas, ranks e
+percentis são calculados com NumPy de uma vez.
+
+- delta / delta_percentual: diferença para o primeiro veículo pedido;
+- rank: 1 = melhor entre os comparados (empates dividem a posição);
+- percentil: % dos veículos do catálogo (do mesmo combustível, se foi pedido
+  um) que são iguais ou piores na métrica; a distribuição do catálogo fica
+  em cache por TTL_DISTRIBUICAO.
+
+Pedido inválido levanta ComparacaoInvalida e veículo inexistente ou sem
+emissão/consumo levanta VeiculoSemDados (main.py responde 400 e 404).
+"""
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import and_, select
+from sqlalchemy.orm import Session
+
+from backend.modelo import Combustivel, Consumo, Emissao, Veiculo
+
+MAX_VEICULOS = 50
+TTL_DISTRIBUICAO = 300
+
+# métrica -> (coluna, maior é melhor?)
+METRICAS = {
+    "nmhc": (Emissao.nmhc, False),
+    "co": (Emissao.co, False),
+    "nox": (Emissao.nox, False),
+    "co2": (Emissao.co2, False),
+    "rendimento_cidade": (Consumo.rendimento_cidade, True),
+    "rendimento_estrada": (Consumo.rendimento_estrada, True),
+    "consumo_energetico": (Consumo.consumo_energetico, False),
+    "scoreFinal": (Veiculo.scoreFinal, True),
+}
+NOMES = list(METRICAS)
+MAIOR_MELHOR = np.array([METRICAS[n][1] for n in NOMES])
+
+
+class ComparacaoInvalida(ValueError):
+    pass
+
+
+class VeiculoSemDados(LookupError):
+    pass
+
+
+def _consulta(combustivel_id: Optional[int] = None):
+    emissao = [Emissao.veiculo_id == Veiculo.veiculo_id]
+    if combustivel_id is not None:
+        emissao.append(Emissao.combustivel_id == combustivel_id)
+    return (
+        select(
+            Veiculo.veiculo_id, Veiculo.marca, Veiculo.modelo, Veiculo.ano, Veiculo.versao,
+            Veiculo.imagem_url, Emissao.emissao_id, Emissao.combustivel_id, Combustivel.tipo,
+            Consumo.consumo_id, *[coluna.label(nome) for nome, (coluna, _) in METRICAS.items()],
+        )
+        .outerjoin(Emissao, and_(*emissao))
+        .outerjoin(Combustivel, Combustivel.combustivel_id == Emissao.combustivel_id)
+        .outerjoin(Consumo, and_(
+            Consumo.veiculo_id == Emissao.veiculo_id,
+            Consumo.combustivel_id == Emissao.combustivel_id,
+        ))
+    )
+
+
+def carregar(db: Session, ids: list, combustivel_id: Optional[int] = None) -> list:
+    """
+    Uma linha por veículo, na ordem de ``ids``. Sem ``combustivel_id`` usa o
+    primeiro combustível do veículo (menor emissao_id).
+    """
+    stmt = (
+        _consulta(combustivel_id)
+        .where(Veiculo.veiculo_id.in_(ids))
+        .order_by(Veiculo.veiculo_id, Emissao.emissao_id)
+    )
+
+    por_id = {}
+    for linha in db.execute(stmt).mappings():
+        atual = por_id.get(linha["veiculo_id"])
+        # prefere o primeiro combustível que tem emissão e consumo
+        if atual is None or (atual["consumo_id"] is None and linha["consumo_id"] is not None):
+            por_id[linha["veiculo_id"]] = linha
+
+    faltando = [i for i in ids if i not in por_id]
+    if faltando:
+        raise VeiculoSemDados(f"Veículo(s) não encontrado(s): {faltando}")
+    linhas = [por_id[i] for i in ids]
+
+    if any(l["emissao_id"] is None for l in linhas):
+        raise VeiculoSemDados("Faltam dados de emissões para um dos veículos")
+    if any(l["consumo_id"] is None for l in linhas):
+        raise VeiculoSemDados("Faltam dados de consumo para um dos veículos")
+    return linhas
+
+
+def _matriz(linhas) -> np.ndarray:
+    return np.array(
+        [[np.nan if l[n] is None else float(l[n]) for n in NOMES] for l in linhas],
+        dtype=np.float64,
+    ).reshape(len(linhas), len(NOMES))
+
+
+# -------------------------
+# Distribuição do catálogo (percentis)
+# -------------------------
+_distribuicoes = {}  # combustivel_id (None = todos) -> (expira_em, valores)
+_locks_distribuicao = {}  # combustivel_id -> Lock de quem está recalculando
+_lock_distribuicao = threading.Lock()  # só para _locks_distribuicao
+
+
+def limpar_cache():
+    """Descarta as distribuições em cache (a próxima comparação consulta o catálogo de novo)."""
+    with _lock_distribuicao:
+        _distribuicoes.clear()
+        _locks_distribuicao.clear()
+
+
+def distribuicao(db: Session, combustivel_id: Optional[int] = None) -> list:
+    """
+    Valores ordenados de cada métrica no catálogo (já com o sinal de "maior é
+    melhor"), só do combustível pedido quando ``combustivel_id`` é informado.
+
+    A consulta ao catálogo roda uma vez por combustível (quem chega durante
+    ela espera pelo mesmo resultado); outros combustíveis e quem acha o valor
+    ainda válido não esperam.
+    """
+    item = _distribuicoes.get(combustivel_id)
+    if item is not None and item[0] >= time.monotonic():
+        return item[1]
+    with _lock_distribuicao:
+        lock = _locks_distribuicao.setdefault(combustivel_id, threading.Lock())
+    with lock:
+        item = _distribuicoes.get(combustivel_id)
+        if item is None or item[0] < time.monotonic():
+            matriz = _matriz(db.execute(_consulta(combustivel_id)).mappings().all())
+            orientada = np.where(MAIOR_MELHOR, matriz, -matriz)
+            valores = [np.sort(col[~np.isnan(col)]) for col in orientada.T]
+            item = _distribuicoes[combustivel_id] = (time.monotonic() + TTL_DISTRIBUICAO, valores)
+        return item[1]
+
+
+# -------------------------
+# Cálculo
+# -------------------------
+def _lista(valores: np.ndarray, casas: int = 6) -> list:
+    return [None if np.isnan(v) else round(float(v), casas) for v in valores]
+
+
+def comparar(db: Session, ids: list, combustivel_id: Optional[int] = None) -> dict:
+    ids = list(dict.fromkeys(ids))
+    if not 2 <= len(ids) <= MAX_VEICULOS:
+        raise ComparacaoInvalida(f"Informe de 2 a {MAX_VEICULOS} veículos diferentes")
+
+    linhas = carregar(db, ids, combustivel_id)
+    matriz = _matriz(linhas)  # k x m
+    orientada = np.where(MAIOR_MELHOR, matriz, -matriz)  # maior = melhor em todas as colunas
+
+    delta = matriz - matriz[0]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        delta_percentual = np.where(matriz[0] != 0, delta / np.abs(matriz[0]) * 100, np.nan)
+
+    # rank = 1 + quantos comparados são estritamente melhores (NaN fica em último)
+    valida = ~np.isnan(orientada)
+    melhores = (orientada[None, :, :] > orientada[:, None, :]).sum(axis=1)
+    rank = np.where(valida, 1 + melhores, valida.sum(axis=0) + 1)
+
+    percentil = np.full(matriz.shape, np.nan)
+    for j, valores in enumerate(distribuicao(db, combustivel_id)):
+        if len(valores):
+            posicao = np.searchsorted(valores, orientada[:, j], side="right")
+            percentil[:, j] = np.where(valida[:, j], posicao / len(valores) * 100, np.nan)
+
+    melhor = np.where(valida, orientada, -np.inf).argmax(axis=0)
+
+    return {
+        "veiculos": [
+            {
+                "veiculo_id": l["veiculo_id"],
+                "marca": l["marca"],
+                "modelo": l["modelo"],
+                "ano": l["ano"],
+                "versao": l["versao"],
+                "imagem_url": l["imagem_url"],
+                "combustivel_id": l["combustivel_id"],
+                "combustivel": l["tipo"],
+            }
+            for l in linhas
+        ],
+        "metricas": {
+            nome: {
+                "maior_melhor": bool(MAIOR_MELHOR[j]),
+                "valores": _lista(matriz[:, j]),
+                "delta": _lista(delta[:, j]),
+                "delta_percentual": _lista(delta_percentual[:, j], 2),
+                "rank": rank[:, j].tolist(),
+                "percentil": _lista(percentil[:, j], 2),
+                "melhor_veiculo_id": ids[melhor[j]] if valida[:, j].any() else None,
+            }
+            for j, nome in enumerate(NOMES)
+        },
+    }
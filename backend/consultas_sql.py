@@ -0,0 +1,272 @@
+# backend/consultas_sql.py
+"""
+Consultas de /carros, /filtro-carros e /carros/{id} direto no banco (modo CATALOGO_MODO=sql).
+
+Depois que o catálogo foi carregado (python -m backend.etl_catalogo), vários
+workers podem responder pelo banco em vez de cada um manter o catálogo
+inteiro em memória. O contrato é o mesmo do modo memória: a tabela
+catalogo_linhas guarda cada linha da planilha com o JSON que o snapshot
+responderia, a posição no ranking e os valores de busca/filtro já
+normalizados como nos índices do snapshot.
+
+- Busca e filtros: o termo é conferido (regex/substring, indices.casa_termo)
+  no vocabulário distinto da coluna, que é pequeno e fica em cache por
+  TTL_VOCABULARIO; a consulta usa ``coluna IN (valores que casaram)`` nos
+  índices de catalogo_linhas. Acima de MAX_VALORES_IN valores, termo literal
+  vira ``LIKE '%termo%'`` e regex vira ``NOT IN`` dos que não casaram, se
+  for a lista menor.
+- /filtro-carros: ordem de posicao_ranking, com página ou cursor
+  (proximo_cursor, só neste modo).
+- /carros: ordem da planilha, cursor = codigo do último carro.
+- /favoritar: a linha do código vem de catalogo_linhas, como em /carros/{id}.
+
+As funções devolvem as linhas já serializadas; a resposta é montada em main.py
+pelo mesmo código do modo memória. Cursor que não corresponde a nenhuma linha
+levanta CursorInvalido (main.py responde 400).
+"""
+import json
+import threading
+import time
+from typing import Optional
+
+import pandas as pd
+from sqlalchemy import false, func, or_, select
+from sqlalchemy.orm import Session
+
+from backend import catalogo, indices, metricas
+from backend.modelo import LinhaCatalogo
+from backend.sugestoes import Sugestoes
+
+TTL_VOCABULARIO = 300
+# Acima disso a condição de um termo deixa de ser uma lista IN com todos os valores que casam
+MAX_VALORES_IN = 100
+METACARACTERES = set(".^$*+?{}[]\\|()")
+
+# Campos pesquisados pela busca livre de /carros (como catalogo.COLUNAS_BUSCA)
+COLUNAS_BUSCA = [LinhaCatalogo.marca, LinhaCatalogo.modelo, LinhaCatalogo.ano]
+# Filtros de texto de /filtro-carros (ano é comparado por igualdade numérica)
+COLUNAS_FILTRO = {
+    "grupo": LinhaCatalogo.filtro_grupo,
+    "marca": LinhaCatalogo.filtro_marca,
+    "motor": LinhaCatalogo.filtro_motor,
+    "transmissao": LinhaCatalogo.filtro_transmissao,
+    "ar_condicionado": LinhaCatalogo.filtro_ar_condicionado,
+    "direcao_assistida": LinhaCatalogo.filtro_direcao_assistida,
+    "combustivel": LinhaCatalogo.filtro_combustivel,
+}
+
+
+class CursorInvalido(ValueError):
+    pass
+
+
+# -------------------------
+# Vocabulários (cache por TTL)
+# -------------------------
+_vocabularios = {}  # nome -> (valor, expira)
+_lock_vocabulario = threading.Lock()
+
+
+def _em_cache(nome: str, montar):
+    agora = time.monotonic()
+    with _lock_vocabulario:
+        item = _vocabularios.get(nome)
+        if item is not None and item[1] > agora:
+            return item[0]
+    valor = montar()
+    with _lock_vocabulario:
+        _vocabularios[nome] = (valor, agora + TTL_VOCABULARIO)
+    return valor
+
+
+def limpar_cache():
+    """Descarta os vocabulários em cache (ex.: depois de carregar o catálogo em outro banco)."""
+    with _lock_vocabulario:
+        _vocabularios.clear()
+
+
+def _vocabulario(db: Session, coluna) -> list:
+    """Valores distintos da coluna, na ordem em que aparecem na planilha."""
+    def montar():
+        stmt = (
+            select(coluna).where(coluna.is_not(None))
+            .group_by(coluna).order_by(func.min(LinhaCatalogo.posicao))
+        )
+        return db.execute(stmt).scalars().all()
+
+    return _em_cache(coluna.key, montar)
+
+
+def _sugestoes(db: Session) -> Sugestoes:
+    """Vocabulário do "você quis dizer" (marca, modelo e ano, como no snapshot)."""
+    def montar():
+        valores = [v for coluna in COLUNAS_BUSCA for v in _vocabulario(db, coluna)]
+        return Sugestoes(pd.DataFrame({"valor": valores}), ["valor"])
+
+    return _em_cache("sugestoes", montar)
+
+
+def _condicao_valores(coluna, vocabulario: list, termo: str):
+    """``coluna`` casa com o termo (None se nenhum valor do vocabulário casa)."""
+    casa = indices.casa_termo(termo)
+    valores = [v for v in vocabulario if casa(str(v))]
+    if not valores:
+        return None
+    if len(valores) <= MAX_VALORES_IN:
+        return coluna.in_(valores)
+    if not METACARACTERES & set(termo):
+        # literal: mesmo resultado do "termo in valor" (valores e termo já na mesma caixa)
+        return coluna.contains(termo, autoescape=True)
+    if len(vocabulario) - len(valores) < len(valores):
+        return coluna.not_in([v for v in vocabulario if not casa(str(v))])
+    return coluna.in_(valores)
+
+
+def _contar(db: Session, condicoes) -> int:
+    return db.execute(select(func.count()).select_from(LinhaCatalogo).where(*condicoes)).scalar_one()
+
+
+def _paginar(rows: list, limite, chave) -> tuple:
+    """(linhas, proximo_cursor) de uma consulta feita com LIMIT limite + 1."""
+    if limite is None or len(rows) <= limite:
+        return rows, None
+    return rows[:limite], str(chave(rows[limite - 1]))
+
+
+# -------------------------
+# /filtro-carros
+# -------------------------
+def filtrar(db: Session, filtros: dict, pagina: int, limite: int, cursor=None) -> dict:
+    """``{"total", "linhas" (JSON de cada linha), "proximo_cursor"}`` da página pedida."""
+    condicoes = []
+    if filtros.get("ano") is not None and _vocabulario(db, LinhaCatalogo.filtro_ano):
+        condicoes.append(LinhaCatalogo.filtro_ano == float(filtros["ano"]))
+    for nome, coluna in COLUNAS_FILTRO.items():
+        valor = filtros.get(nome)
+        vocabulario = _vocabulario(db, coluna) if valor else []
+        if not vocabulario:
+            continue  # filtro não pedido ou coluna ausente na planilha: ignorado, como no modo memória
+        condicao = _condicao_valores(coluna, vocabulario, valor.lower())
+        condicoes.append(condicao if condicao is not None else false())
+
+    stmt = (
+        select(LinhaCatalogo.json_filtro, LinhaCatalogo.posicao_ranking)
+        .where(*condicoes).order_by(LinhaCatalogo.posicao_ranking)
+    )
+    if cursor:
+        try:
+            stmt = stmt.where(LinhaCatalogo.posicao_ranking > int(cursor))
+        except ValueError:
+            raise CursorInvalido(cursor)
+    else:
+        stmt = stmt.offset((pagina - 1) * limite)
+
+    rows, proximo = _paginar(db.execute(stmt.limit(limite + 1)).all(), limite, lambda r: r.posicao_ranking)
+    return {"total": _contar(db, condicoes), "linhas": [r.json_filtro for r in rows], "proximo_cursor": proximo}
+
+
+# -------------------------
+# /carros/{id}
+# -------------------------
+def _linha(db: Session, coluna, codigo: str):
+    """``coluna`` da linha com esse código (a última, se repetido, como no snapshot); None se não existe."""
+    return db.execute(
+        select(coluna)
+        .where(LinhaCatalogo.codigo == codigo.strip().upper())
+        .order_by(LinhaCatalogo.posicao.desc()).limit(1)
+    ).scalar()
+
+
+def detalhe(db: Session, codigo: str) -> Optional[bytes]:
+    """JSON da linha com esse código (a última, se repetido, como no snapshot); None se não existe."""
+    return _linha(db, LinhaCatalogo.json_busca, codigo)
+
+
+# -------------------------
+# /favoritar
+# -------------------------
+def carro(db: Session, codigo: str) -> Optional[dict]:
+    """
+    Linha com esse código como um registro de snap.df_favoritos (colunas
+    normalizadas), montada do JSON de /filtro-carros; None se não existe.
+    """
+    corpo = _linha(db, LinhaCatalogo.json_filtro, codigo)
+    if corpo is None:
+        return None
+    registro = {k: float("nan") if v is None else v for k, v in json.loads(corpo).items()}  # null = célula vazia
+    registro.pop("imagem_url", None)
+    return catalogo.preparar_favoritos(pd.DataFrame([registro])).iloc[0].to_dict()
+
+
+# -------------------------
+# /carros
+# -------------------------
+def _condicao_termo(db: Session, termo: str):
+    """Linhas cuja marca, modelo ou ano contém o termo (None se nenhuma)."""
+    partes = []
+    for coluna in COLUNAS_BUSCA:
+        condicao = _condicao_valores(coluna, _vocabulario(db, coluna), termo)
+        if condicao is not None:
+            partes.append(condicao)
+    return or_(*partes) if partes else None
+
+
+def _condicoes_busca(db: Session, termos: list) -> Optional[list]:
+    """Uma condição por termo (todos precisam casar); None se algum termo não casa com nada."""
+    condicoes = []
+    for termo in termos:
+        condicao = _condicao_termo(db, termo)
+        if condicao is None:
+            return None
+        condicoes.append(condicao)
+    return condicoes
+
+
+def _posicao_cursor(db: Session, cursor: str) -> int:
+    posicao = db.execute(
+        select(func.max(LinhaCatalogo.posicao)).where(LinhaCatalogo.codigo == cursor.strip().upper())
+    ).scalar()
+    if posicao is None:
+        raise CursorInvalido(cursor)
+    return posicao
+
+
+def _carros(db: Session, condicoes: Optional[list], limite, pos_cursor) -> tuple:
+    """(total, linhas, proximo_cursor) na ordem da planilha; total conta antes do cursor."""
+    if condicoes is None:
+        return 0, [], None
+    stmt = (
+        select(LinhaCatalogo.json_busca, LinhaCatalogo.codigo)
+        .where(*condicoes).order_by(LinhaCatalogo.posicao)
+    )
+    if pos_cursor is not None:
+        stmt = stmt.where(LinhaCatalogo.posicao > pos_cursor)
+    if limite is not None:
+        stmt = stmt.limit(limite + 1)
+
+    rows = db.execute(stmt).all()
+    total = len(rows) if limite is None and pos_cursor is None else _contar(db, condicoes)
+    rows, proximo = _paginar(rows, limite, lambda r: r.codigo)
+    return total, [r.json_busca for r in rows], proximo
+
+
+def buscar(db: Session, busca, limite=None, cursor=None) -> dict:
+    """``{"mensagem", "total", "linhas" (JSON de cada carro), "proximo_cursor"}``."""
+    termos = busca.strip().upper().split() if busca else []
+    pos_cursor = _posicao_cursor(db, cursor) if cursor is not None else None
+
+    mensagem = None
+    total, linhas, proximo = _carros(db, _condicoes_busca(db, termos), limite, pos_cursor)
+    if termos and total == 0:
+        # Se não achou → fuzzy match (marca, modelo ou ano)
+        sugestao, score = _sugestoes(db).sugerir(termos)
+        if score >= 70:
+            total, linhas, proximo = _carros(db, _condicoes_busca(db, [sugestao]), limite, pos_cursor)
+            mensagem = f"Nenhum carro encontrado com '{busca}', exibindo resultados semelhantes a '{sugestao}'"
+        else:
+            mensagem = f"Nenhum carro encontrado com '{busca}'"
+        metricas.registro.incrementar(
+            "smvbr_busca_fuzzy_total", modo="sql", resultado="sugestao" if score >= 70 else "sem_resultado"
+        )
+
+    return {"mensagem": mensagem, "total": total, "linhas": linhas, "proximo_cursor": proximo}
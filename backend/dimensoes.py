@@ -0,0 +1,83 @@
+# backend/dimensoes.py
+"""
+Cache em memória (por processo) de tabelas de dimensão pequenas, como
+combustiveis: valor da chave única -> id.
+
+- leitura: o id sai do dicionário; só vai ao banco na primeira vez;
+- obter_ou_criar: INSERT que não faz nada se a chave já existe (upsert do
+  ETL) seguido de SELECT, numa transação própria e já confirmada. Com a
+  restrição UNIQUE, dois processos criando o mesmo valor ao mesmo tempo
+  acabam com a mesma linha, e o id guardado não some se a transação de
+  quem chamou for desfeita;
+- aquecer: carrega todos os valores de uma vez (startup);
+- invalidar: descarta um valor ou o cache inteiro (ex.: depois de mexer
+  na tabela por fora; a carga do catálogo invalida combustiveis).
+"""
+import threading
+from typing import Optional
+
+from sqlalchemy import select
+
+from backend.etl_catalogo import upsert
+from backend.modelo import Combustivel
+
+
+class CacheDimensao:
+    def __init__(self, modelo, coluna_chave: str, coluna_id: str):
+        self.tabela = modelo.__table__
+        self.chave = self.tabela.c[coluna_chave]
+        self.id = self.tabela.c[coluna_id]
+        self._ids = {}
+        self._lock = threading.Lock()
+        self.contadores = {"acertos": 0, "consultas": 0, "criados": 0}
+
+    def _contar(self, nome: str):
+        with self._lock:
+            self.contadores[nome] += 1
+
+    def _guardar(self, valor, id_):
+        with self._lock:
+            self._ids[valor] = id_
+
+    def obter(self, db, valor) -> Optional[int]:
+        """Id de ``valor`` (None se não existe). ``db`` pode ser Session ou Connection."""
+        id_ = self._ids.get(valor)
+        if id_ is not None:
+            self._contar("acertos")
+            return id_
+        self._contar("consultas")
+        id_ = db.execute(select(self.id).where(self.chave == valor)).scalar()
+        if id_ is not None:
+            self._guardar(valor, id_)
+        return id_
+
+    def obter_ou_criar(self, db, valor) -> int:
+        id_ = self.obter(db, valor)
+        if id_ is not None:
+            return id_
+        with db.get_bind().begin() as conn:
+            upsert(conn, self.tabela, [{self.chave.name: valor}], [self.chave.name])
+            id_ = conn.execute(select(self.id).where(self.chave == valor)).scalar_one()
+        self._contar("criados")
+        self._guardar(valor, id_)
+        return id_
+
+    def aquecer(self, db) -> int:
+        """Carrega a tabela inteira no cache (dimensões são pequenas)."""
+        linhas = db.execute(select(self.chave, self.id)).all()
+        with self._lock:
+            self._ids.update(dict(linhas))
+        return len(linhas)
+
+    def invalidar(self, valor=None):
+        with self._lock:
+            if valor is None:
+                self._ids.clear()
+            else:
+                self._ids.pop(valor, None)
+
+    def metricas(self) -> dict:
+        return {"tamanho": len(self._ids), **self.contadores}
+
+
+combustiveis = CacheDimensao(Combustivel, "tipo", "combustivel_id")
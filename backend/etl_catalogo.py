@@ -0,0 +1,389 @@
+# backend/etl_catalogo.py
+"""
+Carga em lote do catálogo (planilha) para o banco.
+
+Grava todos os veículos e as linhas filhas (emissoes, consumo, quartis_veiculo),
+os tipos de combustível e as linhas que o modo CATALOGO_MODO=sql responde
+(catalogo_linhas, com as mesmas VisoesCatalogo do snapshot do modo memória)
+em lotes, com upsert (MySQL: INSERT ... ON DUPLICATE
+KEY UPDATE; SQLite: INSERT ... ON CONFLICT DO UPDATE). Rodar de novo com a
+mesma planilha não duplica nada: isso depende do índice único em
+veiculos.codigo, então a carga cria as colunas e os índices que faltam e
+confere esse antes de gravar (verificar_banco); outros bancos são recusados.
+
+Os veículos saem da visão de /favoritar (catalogo.preparar_favoritos) só
+com as colunas que a carga grava (COLUNAS_CARGA), convertidos em registros
+lote a lote. Ficam com os valores da planilha; só quartis_veiculo recebe os
+quartis recalculados (backend/quartis.py), com a assinatura do recalculo.
+
+Uso:
+    python -m backend.etl_catalogo                       # banco configurado em database.py
+    python -m backend.etl_catalogo --url sqlite:///smvbr.db --lote 500
+"""
+import argparse
+import time
+import uuid
+
+import pandas as pd
+from sqlalchemy import create_engine, delete, inspect, select, text
+from sqlalchemy.dialects import mysql, sqlite
+
+from backend import cache_colunar, quartis
+from backend.catalogo import (
+    CAMINHO_PLANILHA, COLUNAS_FILTRO, FILTROS_NUMERICOS, VisoesCatalogo, achar_coluna, hash_arquivo,
+    normalizar_nome_coluna, preparar_favoritos,
+)
+from backend.database import Base
+from backend.indices import normalizar_filtro
+from backend.modelo import Combustivel, Consumo, Emissao, LinhaCatalogo, QuartilVeiculo, Veiculo, VersaoDados
+from backend.serializacao import numero, vazio
+
+TAMANHO_LOTE = 1000
+VERSAO_CATALOGO = "catalogo"  # linha de versoes_dados trocada a cada carga
+DIRECOES_VALIDAS = ["H", "E", "H-E", "M"]
+DIALETOS_UPSERT = ("mysql", "sqlite")
+
+# Colunas (nome normalizado) que a carga lê: as dos registro_* e as que o
+# recalculo de quartis usa
+COLUNAS_CARGA = {
+    "codigo", "ano", "categoria", "marca", "modelo", "versao", "motor", "transmissao", "ar_condicionado",
+    "direcao_assistida", "combustivel", "imagem", "pontuacao_final", "quartil_do_score",
+    "rendimento_da_gasolina_ou_diesel_na_cidade_km/l", "rendimento_do_etanol_na_cidade_km/l",
+    "rendimento_da_gasolina_ou_diesel_estrada_km/l", "rendimento_do_etanol_na_estrada_km/l",
+} | {c for trio in quartis.METRICAS.values() for c in trio} | set(quartis.OUTRAS_PONTUACOES)
+
+
+# -------------------------
+# Linha da planilha -> registros
+# (mesmas regras de /favoritar)
+# -------------------------
+def _texto(valor):
+    return None if vazio(valor) else str(valor).strip()
+
+
+def tipo_combustivel(carro: dict) -> str:
+    tipo = _texto(carro.get("combustivel"))
+    return tipo.upper() if tipo else "N/A"
+
+
+def registro_veiculo(carro: dict) -> dict:
+    ar_condicionado = carro.get("ar_condicionado", "N")
+    if isinstance(ar_condicionado, str):
+        ar_condicionado = ar_condicionado.strip().lower() in ["sim", "s", "true", "1"]
+    else:
+        ar_condicionado = bool(ar_condicionado) and not vazio(ar_condicionado)
+
+    direcao_assistida = carro.get("direcao_assistida", "M")
+    if direcao_assistida not in DIRECOES_VALIDAS:
+        direcao_assistida = "M"
+
+    imagem = carro.get("imagem")
+    return {
+        "codigo": int(carro["codigo"]),
+        "ano": int(numero(carro.get("ano"))),
+        "categoria": _texto(carro.get("categoria")),
+        "marca": _texto(carro.get("marca")) or "",
+        "modelo": _texto(carro.get("modelo")) or "",
+        "versao": _texto(carro.get("versao")),
+        "motor": _texto(carro.get("motor")),
+        "transmissao": _texto(carro.get("transmissao")),
+        "ar_condicionado": ar_condicionado,
+        "direcao_assistida": direcao_assistida,
+        "scoreFinal": numero(carro.get("pontuacao_final")),
+        "imagem_url": f"/imgs/{imagem}" if imagem else None,
+    }
+
+
+def registro_emissao(carro: dict) -> dict:
+    return {
+        "nmhc": numero(carro.get("emissao_de_nmhc_g/km")),
+        "co": numero(carro.get("emissao_de_co_g/km")),
+        "nox": numero(carro.get("emissao_de_nox_g/km")),
+        "co2": numero(carro.get("emissao_de_co2_g/km")),
+    }
+
+
+def registro_consumo(carro: dict) -> dict:
+    return {
+        "rendimento_cidade": numero(
+            carro.get("rendimento_da_gasolina_ou_diesel_na_cidade_km/l"),
+            carro.get("rendimento_do_etanol_na_cidade_km/l"),
+        ),
+        "rendimento_estrada": numero(
+            carro.get("rendimento_da_gasolina_ou_diesel_estrada_km/l"),
+            carro.get("rendimento_do_etanol_na_estrada_km/l"),
+        ),
+        "consumo_energetico": numero(carro.get("consumo_energetico_mj/km")),
+    }
+
+
+def registro_quartil(carro: dict) -> dict:
+    return {
+        "quartil_nmhc": _texto(carro.get("quartil_do_nmhc")),
+        "quartil_co": _texto(carro.get("quartil_do_co")),
+        "quartil_nox": _texto(carro.get("quartil_do_nox")),
+        "quartil_co2": _texto(carro.get("quartil_do_co2")),
+        "quartil_consumo_energetico": _texto(carro.get("quartil_do_consumo_energetico")),
+        "quartil_score": _texto(carro.get("quartil_do_score")),
+        "assinatura": _texto(carro.get("assinatura_quartis")),
+    }
+
+
+def linha_valida(carro: dict) -> bool:
+    """Ignora as linhas vazias do fim da planilha (sem código, ano ou marca)."""
+    return not (vazio(carro.get("codigo")) or vazio(carro.get("ano")) or vazio(carro.get("marca")))
+
+
+# -------------------------
+# Upsert em lote
+# -------------------------
+def _exigir_dialeto(dialeto: str):
+    if dialeto not in DIALETOS_UPSERT:
+        raise RuntimeError(
+            f"Banco '{dialeto}' não suportado: o upsert do catálogo só existe para {', '.join(DIALETOS_UPSERT)}"
+        )
+
+
+def upsert(conn, tabela, linhas: list, chaves: list):
+    """INSERT em lote que atualiza as colunas não-chave quando ``chaves`` já existem."""
+    if not linhas:
+        return
+    atualizar = [c for c in linhas[0] if c not in chaves]
+    dialeto = conn.dialect.name
+    _exigir_dialeto(dialeto)
+
+    if dialeto == "mysql":
+        stmt = mysql.insert(tabela)
+        stmt = stmt.on_duplicate_key_update({c: stmt.inserted[c] for c in atualizar} or {chaves[0]: stmt.inserted[chaves[0]]})
+    else:
+        stmt = sqlite.insert(tabela)
+        if atualizar:
+            stmt = stmt.on_conflict_do_update(index_elements=chaves, set_={c: stmt.excluded[c] for c in atualizar})
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=chaves)
+
+    conn.execute(stmt, linhas)  # lista de dicts -> executemany
+
+
+def marcar_versao(conn):
+    """Troca a versão dos dados do catálogo no banco (invalida o ETag de /veiculos_favoritos)."""
+    upsert(conn, VersaoDados.__table__, [{"nome": VERSAO_CATALOGO, "versao": uuid.uuid4().hex}], ["nome"])
+
+
+def garantir_colunas(engine) -> list:
+    """
+    Acrescenta as colunas anuláveis declaradas em modelo.py que faltam em
+    tabelas já existentes (create_all só cria tabelas novas). Retorna
+    ``tabela.coluna`` de cada uma criada.
+    """
+    insp = inspect(engine)
+    preparador = engine.dialect.identifier_preparer
+    criadas = []
+    for tabela in Base.metadata.sorted_tables:
+        if not insp.has_table(tabela.name):
+            continue
+        existentes = {c["name"] for c in insp.get_columns(tabela.name)}
+        for coluna in tabela.columns:
+            if coluna.name in existentes or not coluna.nullable:
+                continue
+            with engine.begin() as conn:
+                conn.execute(text(
+                    f"ALTER TABLE {preparador.format_table(tabela)} ADD COLUMN "
+                    f"{preparador.format_column(coluna)} {coluna.type.compile(dialect=engine.dialect)}"
+                ))
+            criadas.append(f"{tabela.name}.{coluna.name}")
+    return criadas
+
+
+def garantir_indices(engine) -> list:
+    """
+    Cria os índices declarados em modelo.py que faltam em tabelas já existentes
+    (create_all só cria tabelas novas). Retorna os nomes criados.
+    """
+    insp = inspect(engine)
+    criados = []
+    for tabela in Base.metadata.sorted_tables:
+        if not insp.has_table(tabela.name):
+            continue
+        nomes = {i["name"] for i in insp.get_indexes(tabela.name)}
+        nomes |= {c["name"] for c in insp.get_unique_constraints(tabela.name)}
+        for indice in tabela.indexes:
+            if indice.name in nomes:
+                continue
+            try:
+                indice.create(bind=engine)
+            except Exception as e:
+                # ex.: códigos repetidos impedem o índice único; verificar_banco recusa a carga
+                print(f"⚠️ Não foi possível criar o índice {indice.name}: {e}")
+                continue
+            criados.append(indice.name)
+    return criados
+
+
+def verificar_banco(engine):
+    """Levanta RuntimeError se o upsert não seria idempotente neste banco (dialeto ou índice único ausente)."""
+    _exigir_dialeto(engine.dialect.name)
+    insp = inspect(engine)
+    unicos = [i["column_names"] for i in insp.get_indexes(Veiculo.__tablename__) if i.get("unique")]
+    unicos += [c["column_names"] for c in insp.get_unique_constraints(Veiculo.__tablename__)]
+    if ["codigo"] not in unicos:
+        raise RuntimeError(
+            "veiculos.codigo sem índice único (uq_veiculos_codigo): o upsert duplicaria o catálogo. "
+            "Remova os códigos repetidos e rode de novo para o índice ser criado."
+        )
+
+
+def _carregar_lote(conn, carros: list, ids_combustivel: dict) -> int:
+    veiculos = [registro_veiculo(c) for c in carros]
+    upsert(conn, Veiculo.__table__, veiculos, ["codigo"])
+
+    codigos = [v["codigo"] for v in veiculos]
+    ids_veiculo = dict(conn.execute(
+        select(Veiculo.codigo, Veiculo.veiculo_id).where(Veiculo.codigo.in_(codigos))
+    ).all())
+
+    emissoes, consumos, quartis = [], [], []
+    for carro, veiculo in zip(carros, veiculos):
+        chave = {
+            "veiculo_id": ids_veiculo[veiculo["codigo"]],
+            "combustivel_id": ids_combustivel[tipo_combustivel(carro)],
+        }
+        emissoes.append({**chave, **registro_emissao(carro)})
+        consumos.append({**chave, **registro_consumo(carro)})
+        quartis.append({"veiculo_id": chave["veiculo_id"], **registro_quartil(carro)})
+
+    upsert(conn, Emissao.__table__, emissoes, ["veiculo_id", "combustivel_id"])
+    upsert(conn, Consumo.__table__, consumos, ["veiculo_id", "combustivel_id"])
+    upsert(conn, QuartilVeiculo.__table__, quartis, ["veiculo_id"])
+    return len(carros)
+
+
+def carregar_veiculo(conn, carro: dict, combustivel_id: int):
+    """Grava um veículo (linha da planilha) e as linhas filhas pelo mesmo upsert da carga em lote."""
+    _carregar_lote(conn, [carro], {tipo_combustivel(carro): combustivel_id})
+
+
+def linhas_catalogo(snap: VisoesCatalogo) -> list:
+    """Registros de catalogo_linhas: uma por linha da planilha, na ordem dela."""
+    n = len(snap)
+    nulos = [None] * n
+    busca = {
+        c: snap.df_busca[c].tolist() if c in snap.df_busca.columns else nulos
+        for c in ["codigo", "marca", "modelo", "ano"]
+    }
+    filtros = {}
+    for filtro, candidatos in COLUNAS_FILTRO.items():
+        col = achar_coluna(snap.df, candidatos)
+        if col is None:
+            filtros[filtro] = nulos  # coluna ausente: o filtro é ignorado, como no modo memória
+        else:
+            valores = normalizar_filtro(snap.df[col], filtro in FILTROS_NUMERICOS)
+            filtros[filtro] = [None if vazio(v) else v for v in valores.tolist()]
+
+    return [
+        {
+            "posicao": i,
+            "posicao_ranking": int(snap.rank[i]),
+            **{c: valores[i] for c, valores in busca.items()},
+            **{f"filtro_{f}": valores[i] for f, valores in filtros.items()},
+            "json_filtro": snap.json_filtro[i],
+            "json_busca": snap.json_busca[i],
+        }
+        for i in range(n)
+    ]
+
+
+def carregar_linhas_catalogo(engine, snap: VisoesCatalogo, tamanho_lote: int = TAMANHO_LOTE) -> int:
+    """Substitui catalogo_linhas pelas linhas das visões (upsert por posição, sobras apagadas)."""
+    linhas = linhas_catalogo(snap)
+    for i in range(0, len(linhas), tamanho_lote):
+        with engine.begin() as conn:
+            upsert(conn, LinhaCatalogo.__table__, linhas[i:i + tamanho_lote], ["posicao"])
+    with engine.begin() as conn:
+        conn.execute(delete(LinhaCatalogo).where(LinhaCatalogo.posicao >= len(linhas)))
+    return len(linhas)
+
+
+def _visao_carga(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Linhas válidas da planilha na visão de /favoritar, só com COLUNAS_CARGA e
+    com os quartis recalculados que vão para quartis_veiculo.
+    """
+    df = df[[c for c in df.columns if normalizar_nome_coluna(c) in COLUNAS_CARGA]]
+    carga = preparar_favoritos(df)
+    carga = carga.assign(**quartis.para_banco(carga))
+    chaves = carga.reindex(columns=["codigo", "ano", "marca"]).to_dict(orient="records")
+    return carga[[linha_valida(c) for c in chaves]]
+
+
+def carregar_catalogo(engine, caminho: str = CAMINHO_PLANILHA, tamanho_lote: int = TAMANHO_LOTE) -> dict:
+    """Carrega a planilha inteira no banco. Cada lote é uma transação."""
+    df = cache_colunar.ler_planilha(caminho, hash_arquivo(caminho))
+    return carregar_dataframe(engine, df, tamanho_lote)
+
+
+def carregar_dataframe(engine, df, tamanho_lote: int = TAMANHO_LOTE, snap: VisoesCatalogo = None) -> dict:
+    """
+    Como carregar_catalogo, para um DataFrame com as colunas originais da
+    planilha (``snap``: as visões, ou o snapshot, já montados desse
+    DataFrame, se houver).
+    """
+    inicio = time.perf_counter()
+    garantir_colunas(engine)
+    garantir_indices(engine)
+    verificar_banco(engine)
+
+    carga = _visao_carga(df)
+
+    # Dimensão pequena: todos os combustíveis de uma vez
+    tipos = sorted({tipo_combustivel(c) for c in carga.reindex(columns=["combustivel"]).to_dict(orient="records")})
+    with engine.begin() as conn:
+        upsert(conn, Combustivel.__table__, [{"tipo": t} for t in tipos], ["tipo"])
+        ids_combustivel = dict(conn.execute(select(Combustivel.tipo, Combustivel.combustivel_id)).all())
+    # o cache de combustíveis deste processo pode ter ids de antes da carga
+    from backend import dimensoes  # dimensoes -> etl_catalogo
+    dimensoes.combustiveis.invalidar()
+
+    total = 0
+    for i in range(0, len(carga), tamanho_lote):
+        carros = carga.iloc[i:i + tamanho_lote].to_dict(orient="records")
+        with engine.begin() as conn:
+            total += _carregar_lote(conn, carros, ids_combustivel)
+
+    # catalogo_linhas precisa do JSON pré-renderizado, mas não dos índices do snapshot
+    linhas = carregar_linhas_catalogo(engine, snap if snap is not None else VisoesCatalogo(df), tamanho_lote)
+    with engine.begin() as conn:
+        marcar_versao(conn)
+
+    duracao = time.perf_counter() - inicio
+    return {
+        "veiculos": total,
+        "linhas_catalogo": linhas,
+        "combustiveis": len(tipos),
+        "segundos": round(duracao, 3),
+        "linhas_por_segundo": round(total / duracao, 1) if duracao else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carrega o catálogo da planilha no banco de dados")
+    parser.add_argument("--url", help="URL do banco (padrão: a de backend/database.py)")
+    parser.add_argument("--planilha", default=CAMINHO_PLANILHA)
+    parser.add_argument("--lote", type=int, default=TAMANHO_LOTE)
+    args = parser.parse_args()
+
+    if args.url:
+        engine = create_engine(args.url)
+    else:
+        from backend.database import engine
+    Base.metadata.create_all(bind=engine)
+
+    stats = carregar_catalogo(engine, args.planilha, args.lote)
+    print(
+        f"{stats['veiculos']} veículos carregados em {stats['segundos']}s "
+        f"({stats['linhas_por_segundo']} linhas/s, {stats['combustiveis']} combustíveis)"
+    )
+
+
+if __name__ == "__main__":
+    main()
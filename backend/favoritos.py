@@ -0,0 +1,266 @@
+# backend/favoritos.py
+"""
+Favoritar/desfavoritar com o mínimo de idas ao banco.
+
+- Veículo já conhecido (codigo -> veiculo_id em cache): uma transação com
+  DELETE do favorito e, se nada foi apagado, INSERT.
+- Veículo que ainda não está no banco: é criado com as linhas filhas pelo
+  mesmo caminho em lote da carga do catálogo (etl_catalogo) e depois segue
+  o caminho acima.
+
+A lista de /veiculos_favoritos sai de uma única consulta "plana" (favorito +
+veículo + primeira emissão/consumo + quartis, sem o produto cartesiano dos
+joinedload encadeados), paginada por favorito_id. O ETag vem do próprio
+banco, numa única consulta:
+
+- ``usuarios.favoritos_versao``, incrementado na mesma transação de cada
+  favoritar/desfavoritar (não depende de o AUTO_INCREMENT nunca reutilizar
+  ids, o que o MySQL < 8 faz depois de reiniciar);
+- ``count(*)`` e ``max(favorito_id)`` dos favoritos do usuário, pelo índice
+  (usuario_id, veiculo_id), para escritas feitas por fora da API;
+- a versão dos dados do catálogo (``versoes_dados``), trocada a cada carga
+  do catálogo e a cada recalculo de quartis que altera veículos.
+
+O 304 e a resposta guardada no processo só valem enquanto nada disso muda,
+em qualquer worker; a resposta guardada ainda expira por TTL
+(FAVORITOS_CACHE_TTL, em segundos).
+"""
+import hashlib
+import os
+import threading
+import time
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from backend import dimensoes, etl_catalogo
+from backend.modelo import Consumo, Emissao, Favorito, QuartilVeiculo, Usuario, Veiculo, VersaoDados
+from backend.serializacao import dumps
+
+TTL_CACHE = float(os.getenv("FAVORITOS_CACHE_TTL", "300"))
+MAX_USUARIOS_CACHE = 10000
+
+_ids_veiculo = {}  # codigo -> veiculo_id (ids não mudam depois de criados)
+_codigos_veiculo = {}  # veiculo_id -> codigo
+_lock = threading.Lock()
+
+
+def limpar_cache():
+    """Esquece os pares codigo <-> veiculo_id em cache (ex.: ao trocar de banco)."""
+    with _lock:
+        _ids_veiculo.clear()
+        _codigos_veiculo.clear()
+
+
+def _guardar_id(codigo: int, veiculo_id: int):
+    with _lock:
+        _ids_veiculo[codigo] = veiculo_id
+        _codigos_veiculo[veiculo_id] = codigo
+
+
+def _id_veiculo(db: Session, codigo: int):
+    veiculo_id = _ids_veiculo.get(codigo)
+    if veiculo_id is None:
+        veiculo_id = db.execute(select(Veiculo.veiculo_id).where(Veiculo.codigo == codigo)).scalar()
+        if veiculo_id is not None:
+            _guardar_id(codigo, veiculo_id)
+    return veiculo_id
+
+
+def codigo_do_veiculo(db: Session, veiculo_id: int):
+    """Código da planilha do veículo ``veiculo_id`` (None se não está no banco)."""
+    codigo = _codigos_veiculo.get(veiculo_id)
+    if codigo is None:
+        codigo = db.execute(select(Veiculo.codigo).where(Veiculo.veiculo_id == veiculo_id)).scalar()
+        if codigo is not None:
+            _guardar_id(codigo, veiculo_id)
+    return codigo
+
+
+def _materializar(db: Session, carro: dict) -> int:
+    """Cria o veículo e as linhas filhas (emissões, consumo, quartis) de uma vez."""
+    tipo = etl_catalogo.tipo_combustivel(carro)
+    combustivel_id = dimensoes.combustiveis.obter_ou_criar(db, tipo)
+    etl_catalogo.carregar_veiculo(db.connection(), carro, combustivel_id)
+    return _id_veiculo(db, int(carro["codigo"]))
+
+
+def alternar_favorito(db: Session, usuario_id: int, carro: dict) -> tuple:
+    """
+    Adiciona o veículo aos favoritos do usuário ou remove se já estava.
+    Retorna ``(adicionado, veiculo_id)``.
+    """
+    codigo = int(carro["codigo"])
+    try:
+        veiculo_id = _id_veiculo(db, codigo)
+        if veiculo_id is None:
+            veiculo_id = _materializar(db, carro)
+
+        apagados = db.execute(
+            delete(Favorito).where(Favorito.usuario_id == usuario_id, Favorito.veiculo_id == veiculo_id)
+        ).rowcount
+        if not apagados:
+            db.execute(insert(Favorito).values(usuario_id=usuario_id, veiculo_id=veiculo_id))
+        db.execute(
+            update(Usuario).where(Usuario.usuario_id == usuario_id)
+            .values(favoritos_versao=func.coalesce(Usuario.favoritos_versao, 0) + 1)
+        )
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        # ids em cache podem ter ficado velhos (ex.: banco recriado)
+        with _lock:
+            _codigos_veiculo.pop(_ids_veiculo.pop(codigo, None), None)
+        dimensoes.combustiveis.invalidar(etl_catalogo.tipo_combustivel(carro))
+        raise
+    respostas.invalidar(usuario_id)
+    return not apagados, veiculo_id
+
+
+# -------------------------
+# /veiculos_favoritos
+# -------------------------
+def _primeiro(modelo, coluna_id):
+    """Id da primeira linha filha (emissão/consumo) do veículo, como o [0] de antes."""
+    return (
+        select(func.min(coluna_id))
+        .where(modelo.veiculo_id == Veiculo.veiculo_id)
+        .correlate(Veiculo)
+        .scalar_subquery()
+    )
+
+
+def _decimal(valor):
+    return float(valor) if valor is not None else None
+
+
+def listar_favoritos(db: Session, usuario_id: int, limite=None, cursor=None) -> tuple:
+    """
+    Veículos favoritos do usuário em ordem de favorito_id, a partir de ``cursor``
+    (favorito_id do último item da página anterior). Retorna ``(itens, proximo_cursor)``.
+    """
+    stmt = (
+        select(
+            Favorito.favorito_id,
+            Veiculo.veiculo_id, Veiculo.ano, Veiculo.categoria, Veiculo.marca, Veiculo.modelo,
+            Veiculo.versao, Veiculo.motor, Veiculo.transmissao, Veiculo.ar_condicionado,
+            Veiculo.direcao_assistida, Veiculo.imagem_url,
+            Emissao.nmhc, Emissao.co, Emissao.nox, Emissao.co2,
+            Consumo.rendimento_cidade, Consumo.rendimento_estrada, Consumo.consumo_energetico,
+            QuartilVeiculo.quartil_nmhc, QuartilVeiculo.quartil_co, QuartilVeiculo.quartil_nox,
+            QuartilVeiculo.quartil_co2, QuartilVeiculo.quartil_consumo_energetico, QuartilVeiculo.quartil_score,
+            QuartilVeiculo.quartil_id,
+        )
+        .join(Veiculo, Veiculo.veiculo_id == Favorito.veiculo_id)
+        .outerjoin(Emissao, Emissao.emissao_id == _primeiro(Emissao, Emissao.emissao_id))
+        .outerjoin(Consumo, Consumo.consumo_id == _primeiro(Consumo, Consumo.consumo_id))
+        .outerjoin(QuartilVeiculo, QuartilVeiculo.veiculo_id == Veiculo.veiculo_id)
+        .where(Favorito.usuario_id == usuario_id)
+        .order_by(Favorito.favorito_id)
+    )
+    if cursor is not None:
+        stmt = stmt.where(Favorito.favorito_id > cursor)
+    if limite:
+        stmt = stmt.limit(limite + 1)
+
+    linhas = db.execute(stmt).all()
+    proximo = None
+    if limite and len(linhas) > limite:
+        linhas = linhas[:limite]
+        proximo = linhas[-1].favorito_id
+
+    itens = []
+    for r in linhas:
+        tem_quartil = r.quartil_id is not None
+        itens.append({
+            "veiculo_id": r.veiculo_id,
+            "ano": r.ano,
+            "categoria": r.categoria,
+            "marca": r.marca,
+            "modelo": r.modelo,
+            "versao": r.versao,
+            "motor": r.motor,
+            "transmissao": r.transmissao,
+            "ar_condicionado": r.ar_condicionado,
+            "direcao_assistida": r.direcao_assistida,
+            "imagem_url": r.imagem_url,
+
+            "emissao_nmhc": _decimal(r.nmhc),
+            "emissao_co": _decimal(r.co),
+            "emissao_nox": _decimal(r.nox),
+            "emissao_co2": _decimal(r.co2),
+
+            "rendimento_cidade": _decimal(r.rendimento_cidade),
+            "rendimento_estrada": _decimal(r.rendimento_estrada),
+            "consumo_energetico": _decimal(r.consumo_energetico),
+
+            "quartis": {
+                "nmhc": r.quartil_nmhc if tem_quartil else None,
+                "co": r.quartil_co if tem_quartil else None,
+                "nox": r.quartil_nox if tem_quartil else None,
+                "co2": r.quartil_co2 if tem_quartil else None,
+                "consumo_energetico": r.quartil_consumo_energetico if tem_quartil else None,
+                "score": r.quartil_score if tem_quartil else None,
+            },
+        })
+    return itens, proximo
+
+
+def validador(db: Session, usuario_id: int) -> tuple:
+    """``(versão dos favoritos, quantidade, maior favorito_id, versão do catálogo)`` do usuário."""
+    dos_favoritos = Favorito.usuario_id == usuario_id
+    return tuple(db.execute(select(
+        select(Usuario.favoritos_versao).where(Usuario.usuario_id == usuario_id).scalar_subquery(),
+        select(func.count()).select_from(Favorito).where(dos_favoritos).scalar_subquery(),
+        select(func.max(Favorito.favorito_id)).where(dos_favoritos).scalar_subquery(),
+        select(VersaoDados.versao).where(VersaoDados.nome == etl_catalogo.VERSAO_CATALOGO).scalar_subquery(),
+    )).one())
+
+
+class CacheRespostas:
+    """Respostas prontas de /veiculos_favoritos por usuário, válidas enquanto o ETag do banco não muda."""
+
+    def __init__(self, ttl: float = TTL_CACHE, max_usuarios: int = MAX_USUARIOS_CACHE):
+        self.ttl = ttl
+        self.max_usuarios = max_usuarios
+        self._por_usuario = {}  # usuario_id -> {(limite, cursor): (etag, expira_em, corpo, proximo_cursor)}
+        self._lock = threading.Lock()
+
+    def etag(self, db: Session, usuario_id: int, limite=None, cursor=None) -> str:
+        """ETag (fraco) da página pedida, a partir do estado dos favoritos no banco."""
+        chave = f"{usuario_id}:{validador(db, usuario_id)}:{limite}:{cursor}"
+        return f'W/"{hashlib.sha1(chave.encode()).hexdigest()[:20]}"'
+
+    def obter(self, db: Session, usuario_id: int, limite=None, cursor=None, etag=None) -> tuple:
+        """``(corpo, proximo_cursor)`` da página; ``etag`` é o que ``self.etag`` acabou de devolver."""
+        chave = (limite, cursor)
+        with self._lock:
+            item = self._por_usuario.get(usuario_id, {}).get(chave)
+        if item and item[0] == etag and item[1] > time.monotonic():
+            return item[2], item[3]
+
+        itens, proximo = listar_favoritos(db, usuario_id, limite, cursor)
+        corpo = dumps(itens)
+        if etag is not None:
+            with self._lock:
+                if usuario_id not in self._por_usuario and len(self._por_usuario) >= self.max_usuarios:
+                    self._por_usuario.clear()
+                self._por_usuario.setdefault(usuario_id, {})[chave] = (etag, time.monotonic() + self.ttl, corpo, proximo)
+        return corpo, proximo
+
+    def proximo_cursor(self, usuario_id: int, limite=None, cursor=None, etag=None):
+        """X-Proximo-Cursor guardado para esta página (para o 304), se o ETag ainda é o mesmo."""
+        with self._lock:
+            item = self._por_usuario.get(usuario_id, {}).get((limite, cursor))
+        return item[3] if item and item[0] == etag else None
+
+    def invalidar(self, usuario_id=None):
+        with self._lock:
+            if usuario_id is None:
+                self._por_usuario.clear()
+            else:
+                self._por_usuario.pop(usuario_id, None)
+
+
+respostas = CacheRespostas()
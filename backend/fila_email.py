@@ -0,0 +1,200 @@
+# backend/fila_email.py
+"""
+Fila de envio de e-mails em segundo plano (usada por /recuperar-senha).
+
+O endpoint só coloca a mensagem na fila e responde. Uma thread consome a fila
+reaproveitando uma única sessão SMTP autenticada, envia em lotes e tenta de
+novo com backoff quando o envio falha. Se mesmo assim não der, o log mostra
+só o destinatário e o erro: o corpo leva a senha temporária.
+
+Configuração por variáveis de ambiente (SMTP_HOST, SMTP_PORT, SMTP_SSL,
+SMTP_USUARIO, SMTP_SENHA, SMTP_REMETENTE); para testes basta apontar para um
+servidor SMTP local (ex.: aiosmtpd) com SMTP_SSL=0 e SMTP_USUARIO vazio.
+Sem SMTP_SENHA (com SMTP_USUARIO definido) o envio fica desativado e
+enfileirar levanta EnvioDesativado.
+"""
+import os
+import queue
+import smtplib
+import threading
+import time
+from email.mime.text import MIMEText
+from typing import Optional
+
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "465"))
+SMTP_SSL = os.getenv("SMTP_SSL", "1") == "1"
+SMTP_USUARIO = os.getenv("SMTP_USUARIO", "seuemail@gmail.com")  # seu e-mail Gmail real
+SMTP_SENHA = os.getenv("SMTP_SENHA", "")                          # senha do app do Gmail
+SMTP_REMETENTE = os.getenv("SMTP_REMETENTE", SMTP_USUARIO or "nao-responda@smvbr.local")
+
+TAMANHO_FILA = int(os.getenv("EMAIL_FILA_TAMANHO", "1000"))
+TAMANHO_LOTE = int(os.getenv("EMAIL_FILA_LOTE", "20"))
+MAX_TENTATIVAS = int(os.getenv("EMAIL_FILA_TENTATIVAS", "4"))
+BACKOFF_INICIAL = float(os.getenv("EMAIL_FILA_BACKOFF", "1"))
+# Fecha a conexão SMTP depois desse tempo sem mensagens (servidores derrubam conexões ociosas)
+TEMPO_OCIOSO = float(os.getenv("EMAIL_FILA_OCIOSO", "60"))
+
+
+class FilaCheia(Exception):
+    pass
+
+
+class EnvioDesativado(Exception):
+    pass
+
+
+class DespachanteEmail:
+    def __init__(
+        self,
+        host: str = SMTP_HOST,
+        porta: int = SMTP_PORT,
+        ssl: bool = SMTP_SSL,
+        usuario: str = SMTP_USUARIO,
+        senha: str = SMTP_SENHA,
+        remetente: str = SMTP_REMETENTE,
+        tamanho_fila: int = TAMANHO_FILA,
+    ):
+        self.host = host
+        self.porta = porta
+        self.ssl = ssl
+        self.usuario = usuario
+        self.senha = senha
+        self.remetente = remetente
+        self.fila = queue.Queue(maxsize=tamanho_fila)
+        self._conexao: Optional[smtplib.SMTP] = None
+        self._thread: Optional[threading.Thread] = None
+        self._parar = threading.Event()
+        self._lock_contadores = threading.Lock()
+        self.contadores = {
+            "enfileirados": 0,
+            "enviados": 0,
+            "falhas": 0,
+            "tentativas_extras": 0,
+            "recusados_fila_cheia": 0,
+            "conexoes_abertas": 0,
+        }
+
+    def _contar(self, nome: str):
+        with self._lock_contadores:
+            self.contadores[nome] += 1
+
+    @property
+    def habilitado(self) -> bool:
+        """False sem servidor ou com usuário sem senha (nada é enviado)."""
+        return bool(self.host) and (not self.usuario or bool(self.senha))
+
+    # ---------- produtor ----------
+    def cheia(self) -> bool:
+        return self.fila.full()
+
+    def enfileirar(self, destinatario: str, assunto: str, corpo: str, espera: float = 2.0):
+        """
+        Coloca a mensagem na fila; levanta FilaCheia se não couber em ``espera``
+        segundos e EnvioDesativado se o SMTP não está configurado.
+        """
+        if not self.habilitado:
+            raise EnvioDesativado()
+        self.iniciar()
+        try:
+            self.fila.put((destinatario, assunto, corpo), timeout=espera)
+        except queue.Full:
+            self._contar("recusados_fila_cheia")
+            raise FilaCheia()
+        self._contar("enfileirados")
+
+    def metricas(self) -> dict:
+        return {
+            "profundidade": self.fila.qsize(),
+            "capacidade": self.fila.maxsize,
+            "habilitado": self.habilitado,
+            "conectado": self._conexao is not None,
+            **self.contadores,
+        }
+
+    # ---------- consumidor ----------
+    def iniciar(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        if not self.habilitado:
+            print("⚠️ SMTP_SENHA não configurada: envio de e-mails desativado.")
+            return
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._loop, name="fila-email", daemon=True)
+        self._thread.start()
+
+    def parar(self, timeout: float = 10.0):
+        """Para a thread depois de esvaziar a fila (até ``timeout`` segundos)."""
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _loop(self):
+        while True:
+            try:
+                primeira = self.fila.get(timeout=TEMPO_OCIOSO if not self._parar.is_set() else 0.1)
+            except queue.Empty:
+                self._desconectar()
+                if self._parar.is_set():
+                    return
+                continue
+
+            lote = [primeira]
+            while len(lote) < TAMANHO_LOTE:
+                try:
+                    lote.append(self.fila.get_nowait())
+                except queue.Empty:
+                    break
+
+            for mensagem in lote:
+                self._enviar_com_retentativa(*mensagem)
+                self.fila.task_done()
+
+    def _conectar(self) -> smtplib.SMTP:
+        if self._conexao is not None:
+            return self._conexao
+        if self.ssl:
+            conexao = smtplib.SMTP_SSL(self.host, self.porta, timeout=10)
+        else:
+            conexao = smtplib.SMTP(self.host, self.porta, timeout=10)
+        if self.usuario:
+            conexao.login(self.usuario, self.senha)
+        self._conexao = conexao
+        self._contar("conexoes_abertas")
+        return conexao
+
+    def _desconectar(self):
+        if self._conexao is None:
+            return
+        try:
+            self._conexao.quit()
+        except Exception:
+            pass
+        self._conexao = None
+
+    def _enviar_com_retentativa(self, destinatario: str, assunto: str, corpo: str):
+        msg = MIMEText(corpo)
+        msg["Subject"] = assunto
+        msg["From"] = self.remetente
+        msg["To"] = destinatario
+
+        espera = BACKOFF_INICIAL
+        for tentativa in range(1, MAX_TENTATIVAS + 1):
+            try:
+                self._conectar().sendmail(self.remetente, destinatario, msg.as_string())
+                self._contar("enviados")
+                print(f"E-mail REAL enviado para {destinatario} ✅")
+                return
+            except Exception as e:
+                # Conexão pode ter caído: descarta e reconecta na próxima tentativa
+                self._desconectar()
+                if tentativa == MAX_TENTATIVAS or self._parar.is_set():
+                    self._contar("falhas")
+                    print(f"Erro ao enviar e-mail para {destinatario}: {e}")
+                    return
+                self._contar("tentativas_extras")
+                time.sleep(espera)
+                espera *= 2
+
+
+despachante = DespachanteEmail()
@@ -0,0 +1,67 @@
+# backend/importacao.py
+"""
+Import adiado de módulos pesados (pandas, numpy, rapidfuzz, httpx e os
+módulos do catálogo que dependem deles).
+
+``ModuloPreguicoso("pandas")`` se comporta como o módulo, mas só o importa no
+primeiro acesso a um atributo. Assim ``import backend.main`` fica rápido e o
+custo do import vai para o aquecimento do startup (carregar_todos), fora do
+caminho crítico do boot do worker.
+"""
+import importlib
+import threading
+
+_registrados = []
+
+
+class ModuloPreguicoso:
+    # Atributos com "__" (name mangling) para não esconder atributos do módulo
+    # de mesmo nome (ex.: comparacao.carregar); os dois métodos públicos têm
+    # nomes que nenhum dos módulos adiados usa
+    def __init__(self, nome: str):
+        self.__nome = nome
+        self.__modulo = None
+        self.__lock = threading.Lock()
+        _registrados.append(self)
+
+    def __importar(self):
+        if self.__modulo is None:
+            with self.__lock:
+                if self.__modulo is None:
+                    self.__modulo = importlib.import_module(self.__nome)
+        return self.__modulo
+
+    def importado(self) -> bool:
+        """True se o módulo já foi importado."""
+        return self.__modulo is not None
+
+    def importar(self):
+        """O módulo de verdade (importando agora, se preciso)."""
+        return self.__modulo or self.__importar()
+
+    def __getattr__(self, atributo):
+        return getattr(self.__modulo or self.__importar(), atributo)
+
+    def __repr__(self):
+        estado = "carregado" if self.__modulo is not None else "não carregado"
+        return f"<módulo preguiçoso {self.__nome!r} ({estado})>"
+
+
+def carregado(modulo) -> bool:
+    """True se o módulo (preguiçoso ou não) já foi importado."""
+    if isinstance(modulo, ModuloPreguicoso):
+        return modulo.importado()
+    return True
+
+
+def carregar(modulo):
+    """O módulo de verdade por trás de um ModuloPreguicoso (importando agora, se preciso)."""
+    if isinstance(modulo, ModuloPreguicoso):
+        return modulo.importar()
+    return modulo
+
+
+def carregar_todos():
+    """Importa todos os módulos adiados (chamado no aquecimento do startup)."""
+    for modulo in list(_registrados):
+        carregar(modulo)
@@ -0,0 +1,208 @@
+# backend/indices.py
+"""
+Índices em memória montados uma vez por versão do catálogo (ver catalogo.CatalogoSnapshot).
+
+As listas de posições são arrays numpy ordenados com as posições (iloc) das
+linhas no DataFrame do snapshot.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+VAZIO = np.empty(0, dtype=np.int32)
+
+# Quantas consultas por substring cada índice guarda prontas
+MAX_CACHE_CONSULTAS = 512
+
+
+def intersectar(listas) -> np.ndarray:
+    """Interseção de listas de posições ordenadas, começando pela menor."""
+    listas = sorted(listas, key=len)
+    resultado = listas[0]
+    for lista in listas[1:]:
+        if len(resultado) == 0:
+            break
+        resultado = np.intersect1d(resultado, lista, assume_unique=True)
+    return resultado
+
+
+def casa_termo(termo: str):
+    """
+    ``valor -> match`` com a regra do ``str.contains`` antigo: o termo é uma
+    regex; se não for uma regex válida, compara como texto literal.
+    """
+    try:
+        return re.compile(termo).search
+    except re.error:
+        return lambda v: termo in v  # noqa: E731 - termo não é regex válida, compara literal
+
+
+def normalizar_filtro(serie: pd.Series, numerico: bool = False) -> pd.Series:
+    """Valor que os filtros comparam: ``pd.to_numeric`` ou ``astype(str).str.lower()``."""
+    if numerico:
+        return pd.to_numeric(serie, errors="coerce")
+    return serie.astype(str).str.lower()
+
+
+class IndiceInvertido:
+    """
+    Índice invertido de uma coluna: valor normalizado -> posições das linhas.
+
+    Para colunas de texto o valor normalizado é o mesmo que o filtro antigo
+    comparava (``astype(str).str.lower()``); para colunas numéricas é o
+    resultado de ``pd.to_numeric``.
+    """
+
+    def __init__(self, serie: pd.Series, numerico: bool = False):
+        chaves = normalizar_filtro(serie, numerico)
+        codigos, valores = pd.factorize(chaves, use_na_sentinel=True)
+        ordem = np.argsort(codigos, kind="stable").astype(np.int32)
+        # valores ausentes (código -1) ficam antes do limite do código 0 e não entram em nenhuma lista
+        limites = np.searchsorted(codigos[ordem], np.arange(len(valores) + 1))
+
+        self.numerico = numerico
+        self.total = len(serie)
+        self.postings = {
+            valores[i]: ordem[limites[i]:limites[i + 1]]
+            for i in range(len(valores))
+        }
+        self._cache_contem = {}
+
+    def igual(self, valor) -> np.ndarray:
+        """Linhas cujo valor normalizado é exatamente ``valor``."""
+        if self.numerico:
+            valor = float(valor)
+        else:
+            valor = str(valor).lower()
+        return self.postings.get(valor, VAZIO)
+
+    def contem(self, termo: str) -> np.ndarray:
+        """
+        Linhas cujo valor contém ``termo`` (mesma regra do ``str.contains`` antigo).
+        Varre só o vocabulário distinto da coluna, não as linhas.
+        """
+        termo = termo.lower()
+        cache = self._cache_contem
+        if termo in cache:
+            return cache[termo]
+
+        casa = casa_termo(termo)
+        listas = [pos for valor, pos in self.postings.items() if casa(str(valor))]
+        if not listas:
+            resultado = VAZIO
+        elif len(listas) == 1:
+            resultado = listas[0]
+        else:
+            resultado = np.sort(np.concatenate(listas))
+
+        if len(cache) >= MAX_CACHE_CONSULTAS:
+            cache.clear()
+        cache[termo] = resultado
+        return resultado
+
+
+class IndiceNgramas:
+    """
+    Busca por substring nos campos de /carros (marca, modelo, ano).
+
+    Os n-gramas (1 a 3 letras) apontam para os valores distintos dos campos e
+    cada valor aponta para as linhas onde aparece. Um termo é resolvido pelos
+    n-gramas do próprio termo e só os valores candidatos são conferidos com
+    ``in``, sem varrer as linhas do catálogo.
+    """
+
+    N = 3
+
+    def __init__(self, df: pd.DataFrame, colunas):
+        linhas_por_valor = {}
+        for col in colunas:
+            codigos, valores = pd.factorize(df[col])
+            ordem = np.argsort(codigos, kind="stable").astype(np.int32)
+            limites = np.searchsorted(codigos[ordem], np.arange(len(valores) + 1))
+            for i, valor in enumerate(valores):
+                linhas_por_valor.setdefault(str(valor), []).append(ordem[limites[i]:limites[i + 1]])
+
+        self.valores = list(linhas_por_valor)
+        self.linhas = [
+            partes[0] if len(partes) == 1 else np.unique(np.concatenate(partes))
+            for partes in linhas_por_valor.values()
+        ]
+
+        ngramas = {}
+        for id_valor, valor in enumerate(self.valores):
+            vistos = set()
+            for n in range(1, self.N + 1):
+                for i in range(len(valor) - n + 1):
+                    vistos.add(valor[i:i + n])
+            for g in vistos:
+                ngramas.setdefault(g, []).append(id_valor)
+        self.ngramas = {g: np.array(ids, dtype=np.int32) for g, ids in ngramas.items()}
+        self._cache = {}
+
+    def _valores_com(self, termo: str) -> np.ndarray:
+        """Ids dos valores distintos que contêm ``termo``."""
+        if re.escape(termo) != termo:
+            # termo com caracteres de regex: mantém a semântica do str.contains antigo
+            casa = casa_termo(termo)
+            return np.array([i for i, v in enumerate(self.valores) if casa(v)], dtype=np.int32)
+
+        if len(termo) <= self.N:
+            return self.ngramas.get(termo, VAZIO)
+
+        trigramas = {termo[i:i + self.N] for i in range(len(termo) - self.N + 1)}
+        if any(g not in self.ngramas for g in trigramas):
+            return VAZIO
+        candidatos = intersectar([self.ngramas[g] for g in trigramas])
+        return np.array([i for i in candidatos if termo in self.valores[i]], dtype=np.int32)
+
+    def buscar(self, termo: str) -> np.ndarray:
+        """Linhas em que algum dos campos contém ``termo``."""
+        if termo in self._cache:
+            return self._cache[termo]
+
+        ids = self._valores_com(termo)
+        if len(ids) == 0:
+            resultado = VAZIO
+        elif len(ids) == 1:
+            resultado = self.linhas[ids[0]]
+        else:
+            resultado = np.unique(np.concatenate([self.linhas[i] for i in ids]))
+
+        if len(self._cache) >= MAX_CACHE_CONSULTAS:
+            self._cache.clear()
+        self._cache[termo] = resultado
+        return resultado
+
+    def limpar_cache(self):
+        """Esquece as consultas já resolvidas (ex.: para medir a busca a frio)."""
+        self._cache.clear()
+
+    def buscar_todos(self, termos) -> np.ndarray:
+        """Linhas que casam com todos os termos (interseção das listas de cada termo)."""
+        listas = []
+        for termo in termos:
+            linhas = self.buscar(termo)
+            if len(linhas) == 0:
+                return VAZIO
+            listas.append(linhas)
+        return intersectar(listas) if listas else VAZIO
+
+
+def pagina_por_rank(posicoes: np.ndarray, rank: np.ndarray, inicio: int, fim: int) -> np.ndarray:
+    """
+    Linhas ``[inicio:fim)`` de ``posicoes`` na ordem do ranking, sem ordenar o
+    resto: ``argpartition`` separa a faixa pedida e só ela é ordenada.
+    """
+    fim = min(fim, len(posicoes))
+    if inicio >= fim:
+        return VAZIO
+
+    ranks = rank[posicoes]
+    if fim - inicio < len(posicoes):
+        kth = [k for k in (inicio, fim - 1) if k < len(posicoes)]
+        faixa = np.argpartition(ranks, kth)[inicio:fim]
+    else:
+        faixa = np.arange(len(posicoes))
+    faixa = faixa[np.argsort(ranks[faixa])]
+    return posicoes[faixa]
@@ -0,0 +1,137 @@
+# backend/inicializacao.py
+"""
+Startup da API (lifespan de main.py) e prontidão (GET /pronto).
+
+O boot do worker só monta o app; o aquecimento roda depois, em duas threads
+em paralelo:
+- banco: create_all, índices que faltam em tabelas antigas (recusa o banco
+  sem o índice único de veiculos.codigo) e o cache de combustíveis;
+- catálogo: imports pesados adiados (importacao.carregar_todos), snapshot da
+  planilha com os índices e o monitor de recarga (no modo sql os imports e a
+  conferência de que o ETL já carregou catalogo_linhas).
+
+Se uma parte falha (ex.: MySQL ainda subindo) ela é tentada de novo com
+espera crescente, em vez de derrubar o worker. /pronto responde 503 até as
+duas partes terminarem, para o balanceador não mandar tráfego a um worker frio.
+"""
+import asyncio
+import threading
+import time
+
+from backend import importacao
+
+ESPERA_INICIAL = 0.5
+ESPERA_MAX = 30.0
+COMPONENTES = ("banco", "catalogo")
+
+
+class Prontidao:
+    def __init__(self, componentes=COMPONENTES):
+        self._componentes = componentes
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._lock:
+            self._inicio = time.monotonic()
+            self._estado = {nome: {"estado": "pendente", "tentativas": 0} for nome in self._componentes}
+
+    def _atualizar(self, nome: str, **dados):
+        with self._lock:
+            self._estado[nome].update(dados)
+
+    def tentar(self, nome: str, tentativa: int):
+        self._atualizar(nome, estado="aquecendo", tentativas=tentativa)
+
+    def concluir(self, nome: str):
+        self._atualizar(nome, estado="pronto", segundos=round(time.monotonic() - self._inicio, 3), erro=None)
+
+    def falhar(self, nome: str, erro: Exception):
+        self._atualizar(nome, estado="erro", erro=str(erro))
+
+    def pronto(self, nome: str) -> bool:
+        with self._lock:
+            return self._estado[nome]["estado"] == "pronto"
+
+    def estado(self) -> dict:
+        with self._lock:
+            return {
+                "pronto": all(c["estado"] == "pronto" for c in self._estado.values()),
+                "segundos_desde_inicio": round(time.monotonic() - self._inicio, 3),
+                "componentes": {nome: dict(c) for nome, c in self._estado.items()},
+            }
+
+
+prontidao = Prontidao()
+_parar = threading.Event()
+
+
+def _com_novas_tentativas(nome: str, passo):
+    espera = ESPERA_INICIAL
+    tentativa = 0
+    while not _parar.is_set():
+        tentativa += 1
+        prontidao.tentar(nome, tentativa)
+        try:
+            passo()
+        except Exception as e:
+            prontidao.falhar(nome, e)
+            print(f"⚠️ Startup: {nome} falhou (tentativa {tentativa}, nova tentativa em {espera:.1f}s): {e}")
+            _parar.wait(espera)
+            espera = min(espera * 2, ESPERA_MAX)
+        else:
+            prontidao.concluir(nome)
+            return
+
+
+def _preparar_banco(engine):
+    from backend import dimensoes, etl_catalogo
+    from backend.database import Base
+
+    Base.metadata.create_all(bind=engine)  # cria tabelas (se ainda não criadas)
+    # create_all não mexe em tabelas existentes: colunas e índices novos (e o
+    # único de veiculos.codigo, que o upsert de /favoritar exige) são criados aqui
+    etl_catalogo.garantir_colunas(engine)
+    etl_catalogo.garantir_indices(engine)
+    etl_catalogo.verificar_banco(engine)
+    with engine.connect() as conn:
+        dimensoes.combustiveis.aquecer(conn)
+
+
+def _conferir_catalogo_sql(engine):
+    from sqlalchemy import func, select
+
+    from backend.modelo import LinhaCatalogo
+
+    with engine.connect() as conn:
+        linhas = conn.execute(select(func.count()).select_from(LinhaCatalogo)).scalar()
+    if not linhas:
+        raise RuntimeError("catalogo_linhas vazia: carregue o catálogo com python -m backend.etl_catalogo")
+    print(f"Catálogo no banco ({linhas} linhas)")
+
+
+def _aquecer_catalogo(engine, modo: str):
+    importacao.carregar_todos()
+    if modo == "sql":
+        _conferir_catalogo_sql(engine)
+        return
+    from backend import catalogo
+
+    snap = catalogo.obter_catalogo()
+    print(f"Catálogo carregado (versão {snap.versao}, {len(snap)} linhas)")
+    catalogo.iniciar_monitor()
+
+
+async def aquecer(engine, modo: str):
+    """Prepara banco e catálogo ao mesmo tempo; termina quando os dois estão prontos (ou em parar())."""
+    _parar.clear()
+    prontidao.reiniciar()
+    await asyncio.gather(
+        asyncio.to_thread(_com_novas_tentativas, "banco", lambda: _preparar_banco(engine)),
+        asyncio.to_thread(_com_novas_tentativas, "catalogo", lambda: _aquecer_catalogo(engine, modo)),
+    )
+
+
+def parar():
+    """Interrompe as novas tentativas do aquecimento (shutdown)."""
+    _parar.set()
@@ -1,41 +1,66 @@
 # backend/main.py
-from fastapi import FastAPI, Depends, HTTPException, Query,Body
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, HTTPException, Query,Body, Request
 from sqlalchemy.orm import Session
 from backend import modelo as models
 from backend import esquemas as schemas
-from backend.database import Base, engine, SessionLocal
-import pandas as pd
-import numpy as np
-from rapidfuzz import fuzz, process
+from backend.database import engine, SessionLocal, metricas_checkout, metricas_pool
 import os
-from typing import Optional
-from backend.modelo import Combustivel, Consumo, Emissao, Favorito,Veiculo
-from backend.esquemas import VeiculoFavorito, FavoritoCreate
-import requests
+from typing import List, Optional
 import re
 import random
 import string
-import smtplib
-from email.mime.text import MIMEText
-from backend.esquemas import UsuarioCreate, UsuarioLogin,UsuarioUpdate
+import time
 from backend.esquemas import EmailRequest
-from backend.modelo import Usuario
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import RedirectResponse
-from sqlalchemy.orm import joinedload
-from fastapi import HTTPException, Body, Depends
-from sqlalchemy.orm import Session
+from fastapi.responses import JSONResponse, RedirectResponse, Response, StreamingResponse
 from sqlalchemy.exc import IntegrityError
-import os
-import pandas as pd
-from backend.modelo import QuartilVeiculo
-
-
+from backend import verificacao_email
+from backend import fila_email
+from backend import metricas
+from backend import inicializacao
+from backend import senhas
+from backend import usuarios
+from backend import pesquisas
+from fastapi.concurrency import run_in_threadpool
+from backend import importacao
+from backend.importacao import ModuloPreguicoso
+from backend.serializacao import RespostaJSON, dumps, linhas_ndjson, montar_json, numero
+
+# Módulos que puxam pandas/numpy/rapidfuzz: importados no aquecimento do startup
+# (backend/inicializacao.py), não no boot do worker
+np = ModuloPreguicoso("numpy")
+catalogo = ModuloPreguicoso("backend.catalogo")
+consultas_sql = ModuloPreguicoso("backend.consultas_sql")
+etl_catalogo = ModuloPreguicoso("backend.etl_catalogo")
+favoritos = ModuloPreguicoso("backend.favoritos")
+dimensoes = ModuloPreguicoso("backend.dimensoes")
+comparacao = ModuloPreguicoso("backend.comparacao")
+indices = ModuloPreguicoso("backend.indices")
+
+
+@asynccontextmanager
+async def ciclo_de_vida(app: FastAPI):
+    """Startup/shutdown: fila de e-mails, registro de pesquisas e pool de senhas sobem na hora; banco e catálogo aquecem em segundo plano (GET /pronto)."""
+    fila_email.despachante.iniciar()
+    senhas.servico.aquecer()
+    pesquisas.registro.iniciar()
+    aquecimento = asyncio.create_task(inicializacao.aquecer(engine, MODO_CATALOGO))
+    try:
+        yield
+    finally:
+        inicializacao.parar()
+        aquecimento.cancel()
+        if importacao.carregado(catalogo):
+            catalogo.parar_monitor()
+        fila_email.despachante.parar()
+        await asyncio.to_thread(pesquisas.registro.parar)
+        await asyncio.to_thread(senhas.servico.encerrar)
+        await verificacao_email.verificador.fechar()
 
-# cria tabelas (se ainda não criadas)
-Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="SMVBR API")
+app = FastAPI(title="SMVBR API", lifespan=ciclo_de_vida)
 
 # ---------- Dependência DB ----------
 def get_db():
@@ -53,48 +78,86 @@ DOMINIOS_PUBLICOS = [
 
 EMAIL_REGEX = r"^[\w\.-]+@[\w\.-]+\.\w+$"
 
-app = FastAPI()
+def _email_ja_cadastrado(db: Session, email: str) -> bool:
+    return db.query(models.Usuario).filter(models.Usuario.email == email).first() is not None
+
+
+def _salvar_usuario(db: Session, usuario: schemas.UsuarioCreate, senha_hash: str) -> models.Usuario:
+    novo = models.Usuario(
+        nome=usuario.nome,
+        email=usuario.email,
+        senha=senha_hash
+    )
+    db.add(novo)
+    db.commit()
+    db.refresh(novo)
+    return novo
+
+
+def _usuario_por_email(db: Session, email: str) -> Optional[models.Usuario]:
+    return db.query(models.Usuario).filter(models.Usuario.email == email).first()
+
+
+def _usuario_por_id(db: Session, usuario_id: int) -> Optional[models.Usuario]:
+    return db.query(models.Usuario).filter(models.Usuario.usuario_id == usuario_id).first()
+
+
+def _gravar(db: Session, usuario: models.Usuario, **campos):
+    for campo, valor in campos.items():
+        setattr(usuario, campo, valor)
+    db.commit()
+    db.refresh(usuario)
+
+
+def _servico_senhas_cheio():
+    return HTTPException(status_code=503, detail="Serviço de autenticação sobrecarregado. Tente novamente em instantes.")
+
+
+async def _hash_senha(senha: str) -> str:
+    """Hash da senha no pool de processos (backend/senhas.py)."""
+    try:
+        return await senhas.servico.gerar_hash(senha)
+    except senhas.FilaCheia:
+        raise _servico_senhas_cheio()
+
+
+async def _conferir_senha(db: Session, usuario: models.Usuario, senha: str) -> bool:
+    """Confere a senha no pool de processos e regrava o hash se estiver desatualizado (ex.: texto puro antigo)."""
+    try:
+        ok, novo_hash = await senhas.servico.verificar(senha, usuario.senha)
+    except senhas.FilaCheia:
+        raise _servico_senhas_cheio()
+    if novo_hash:
+        await run_in_threadpool(_gravar, db, usuario, senha=novo_hash)
+    return ok
+
 
 @app.post("/cadastro", response_model=schemas.UsuarioResponse)
-def cadastro(usuario: schemas.UsuarioCreate, db: Session = Depends(get_db)):
+async def cadastro(usuario: schemas.UsuarioCreate, db: Session = Depends(get_db)):
     # 1️⃣ Validar formato do e-mail via regex (extra)
     if not re.match(EMAIL_REGEX, usuario.email):
         raise HTTPException(status_code=400, detail="Formato de e-mail inválido")
 
-    # 2️⃣ Verificar se o e-mail já está cadastrado
-    existe = db.query(models.Usuario).filter(models.Usuario.email == usuario.email).first()
-    if existe:
+    # 2️⃣ Verificar se o e-mail já está cadastrado (consulta síncrona vai para o threadpool)
+    if await run_in_threadpool(_email_ja_cadastrado, db, usuario.email):
         raise HTTPException(status_code=400, detail="E-mail já cadastrado")
 
-    # 3️⃣ Verificação via API externa para domínios públicos
+    # 3️⃣ Verificação via API externa para domínios públicos (assíncrona, com cache e disjuntor;
+    #    se a API falhar ou estiver lenta o cadastro continua)
     dominio = usuario.email.split("@")[-1].lower()
     if dominio in DOMINIOS_PUBLICOS:
-        api_url = f"https://rapid-email-verifier.fly.dev/api/verify?email={usuario.email}"
-        try:
-            response = requests.get(api_url, timeout=5)
-            response.raise_for_status()
-            data = response.json()
-            if not data.get("valid", True):
-                raise HTTPException(status_code=400, detail="E-mail inválido ou inexistente")
-        except (requests.RequestException, ValueError):
-            print(f"⚠️ Falha na API de verificação para {usuario.email}. Cadastro continuará.")
-
-    # 4️⃣ Criar e salvar o novo usuário
-    novo = models.Usuario(
-        nome=usuario.nome,
-        email=usuario.email,
-        senha=usuario.senha
-    )
-    db.add(novo)
-    db.commit()
-    db.refresh(novo)
+        if await verificacao_email.verificador.verificar(usuario.email) is False:
+            raise HTTPException(status_code=400, detail="E-mail inválido ou inexistente")
+
+    # 4️⃣ Criar e salvar o novo usuário (senha com hash, calculado no pool de processos)
+    senha_hash = await _hash_senha(usuario.senha)
+    return await run_in_threadpool(_salvar_usuario, db, usuario, senha_hash)
+
 
-    return novo
-    
 @app.post("/login")
-def login(usuario: schemas.UsuarioLogin, db: Session = Depends(get_db)):
-    user = db.query(models.Usuario).filter(models.Usuario.email == usuario.email).first()
-    if not user or user.senha != usuario.senha:
+async def login(usuario: schemas.UsuarioLogin, db: Session = Depends(get_db)):
+    user = await run_in_threadpool(_usuario_por_email, db, usuario.email)
+    if not user or not await _conferir_senha(db, user, usuario.senha):
         raise HTTPException(status_code=401, detail="Credenciais inválidas")
     
     # Retorna o id e o nome do usuário para uso no app
@@ -106,10 +169,47 @@ def login(usuario: schemas.UsuarioLogin, db: Session = Depends(get_db)):
     }
 
 
-@app.get("/usuarios", response_model=list[schemas.UsuarioResponse])
-def listar_usuarios(db: Session = Depends(get_db)):
-    usuarios = db.query(models.Usuario).all()
-    return usuarios
+# /usuarios responde em três formatos; o OpenAPI descreve cada um
+_ESQUEMA_USUARIO = schemas.UsuarioResponse.model_json_schema()
+RESPOSTAS_USUARIOS = {
+    200: {
+        "description": "Usuários em ordem de usuario_id, no formato pedido",
+        "headers": {
+            "X-Proximo-Cursor": {
+                "description": "Só com limite, em formato=json: cursor da próxima página",
+                "schema": {"type": "integer"},
+            },
+        },
+        "content": {
+            "application/json": {"schema": {"type": "array", "items": _ESQUEMA_USUARIO}},
+            "application/x-ndjson": {"schema": _ESQUEMA_USUARIO, "example": '{"usuario_id":1,"nome":"Fulano","email":"fulano@exemplo.com"}\n'},
+            "text/csv": {"schema": {"type": "string"}, "example": "usuario_id,nome,email\r\n1,Fulano,fulano@exemplo.com\r\n"},
+        },
+    },
+}
+
+
+@app.get("/usuarios", response_class=RespostaJSON, responses=RESPOSTAS_USUARIOS)
+def listar_usuarios(
+    limite: Optional[int] = Query(None, ge=1, le=1000, description="Tamanho da página (sem limite retorna todos, em streaming)"),
+    cursor: Optional[int] = Query(None, description="usuario_id do último usuário da página anterior (X-Proximo-Cursor)"),
+    formato: str = Query("json", pattern="^(json|ndjson|csv)$"),
+    db: Session = Depends(get_db),
+):
+    if formato == "csv":
+        return StreamingResponse(
+            usuarios.exportar_csv(cursor, limite), media_type="text/csv; charset=utf-8",
+            headers={"Content-Disposition": 'attachment; filename="usuarios.csv"'},
+        )
+    if formato == "ndjson":
+        return StreamingResponse(usuarios.exportar_ndjson(cursor, limite), media_type="application/x-ndjson")
+    if limite is None:
+        return StreamingResponse(usuarios.exportar_json(cursor), media_type="application/json")
+
+    # Página por keyset em usuario_id
+    itens, proximo_cursor = usuarios.pagina(db, limite, cursor)
+    headers = {"X-Proximo-Cursor": str(proximo_cursor)} if proximo_cursor is not None else {}
+    return RespostaJSON(dumps(itens), headers=headers)
 
 
 #---- editar email
@@ -132,44 +232,41 @@ def atualizar_email_usuario(
     return {"usuario_id": usuario.usuario_id, "email": usuario.email, "detail": "E-mail atualizado com sucesso"}
 
 @app.put("/usuario/senha")
-def atualizar_senha_usuario(
+async def atualizar_senha_usuario(
     usuario_id: int = Body(..., embed=True),
     nova_senha: str = Body(..., embed=True),
     db: Session = Depends(get_db)
 ):
-    usuario = db.query(models.Usuario).filter(models.Usuario.usuario_id == usuario_id).first()
+    usuario = await run_in_threadpool(_usuario_por_id, db, usuario_id)
     if not usuario:
         raise HTTPException(status_code=404, detail="Usuário não encontrado")
 
     if not nova_senha or len(nova_senha) < 6:
         raise HTTPException(status_code=400, detail="Senha inválida. Mínimo 6 caracteres.")
 
-    usuario.senha = nova_senha.strip()  # Pode adicionar hash aqui
-    db.commit()
-    db.refresh(usuario)
+    senha_hash = await _hash_senha(nova_senha.strip())
+    await run_in_threadpool(_gravar, db, usuario, senha=senha_hash)
     return {"usuario_id": usuario.usuario_id, "detail": "Senha atualizada com sucesso"}
 
 @app.put("/usuario/nome")
-def atualizar_nome_usuario(
+async def atualizar_nome_usuario(
     usuario_id: int = Body(..., embed=True),
     novo_nome: str = Body(..., embed=True),
     senha: str = Body(..., embed=True),
     db: Session = Depends(get_db)
 ):
-    usuario = db.query(models.Usuario).filter(models.Usuario.usuario_id == usuario_id).first()
+    usuario = await run_in_threadpool(_usuario_por_id, db, usuario_id)
     if not usuario:
         raise HTTPException(status_code=404, detail="Usuário não encontrado")
     
     # Verifica se a senha bate
-    if usuario.senha != senha:  # Se estiver usando hash, usar bcrypt.checkpw()
+    if not await _conferir_senha(db, usuario, senha):
         raise HTTPException(status_code=401, detail="Senha incorreta")
     
     if not novo_nome or novo_nome.strip() == "":
         raise HTTPException(status_code=400, detail="Nome inválido")
     
-    usuario.nome = novo_nome.strip()
-    db.commit()
-    db.refresh(usuario)
+    await run_in_threadpool(_gravar, db, usuario, nome=novo_nome.strip())
     
     return {"usuario_id": usuario.usuario_id, "nome": usuario.nome, "detail": "Nome atualizado com sucesso"}
 
@@ -194,11 +291,8 @@ def gerar_senha(tamanho=8):
 
 def enviar_email(destinatario: str, senha_nova: str):
     """
-    Envia e-mail real se for Gmail. Para outros domínios, apenas simula.
+    Coloca o e-mail com a nova senha na fila de envio (o envio acontece em segundo plano).
     """
-    remetente = "seuemail@gmail.com"  # seu e-mail Gmail real
-    senha_email = "ukbe prlx dzrp evzw"      # senha do app do Gmail
-
     assunto = "Recuperação de senha"
     corpo = f"""
 Olá,
@@ -212,117 +306,163 @@ Recomendamos que você altere sua senha após o login.
 Atenciosamente,
 Sua Equipe
 """
-
-    msg = MIMEText(corpo)
-    msg["Subject"] = assunto
-    msg["From"] = remetente
-    msg["To"] = destinatario
-
-    try:
-        # Se for Gmail, envia de verdade
-        if remetente.endswith("@gmail.com"):
-            with smtplib.SMTP_SSL("smtp.gmail.com", 465) as server:
-                server.login(remetente, senha_email)
-                server.sendmail(remetente, destinatario, msg.as_string())
-            print(f"E-mail REAL enviado para {destinatario} ✅")
-        else:
-            # Para outros domínios, apenas simula
-            print(f"[SIMULAÇÃO] E-mail enviado para {destinatario}:\n{corpo}")
-    except Exception as e:
-        # Se houver erro, apenas simula e não quebra
-        print(f"Erro ao enviar e-mail para {destinatario}: {e}")
-        print(f"[SIMULAÇÃO] E-mail que não foi enviado:\n{corpo}")
+    fila_email.despachante.enfileirar(destinatario, assunto, corpo)
 
 
 # ---------- Endpoint de recuperação de senha ----------
 @app.post("/recuperar-senha")
-def recuperar_senha(dados: EmailRequest, db: Session = Depends(get_db)):
+async def recuperar_senha(dados: EmailRequest, db: Session = Depends(get_db)):
     email = dados.email
 
     # Buscar usuário
-    usuario = db.query(Usuario).filter(Usuario.email == email).first()
+    usuario = await run_in_threadpool(_usuario_por_email, db, email)
     if not usuario:
         raise HTTPException(status_code=404, detail="E-mail não cadastrado")
 
+    # Não troca a senha se o e-mail não vai poder ser enviado
+    if not fila_email.despachante.habilitado:
+        raise HTTPException(status_code=503, detail="Envio de e-mail não configurado no servidor.")
+    if fila_email.despachante.cheia():
+        raise HTTPException(status_code=503, detail="Serviço de e-mail sobrecarregado. Tente novamente em instantes.")
+
     # Gerar nova senha
     senha_nova = gerar_senha(10)
-    usuario.senha = senha_nova  # sem bcrypt
-    db.commit()
+    senha_hash = await _hash_senha(senha_nova)
+    senha_anterior = usuario.senha
+    await run_in_threadpool(_gravar, db, usuario, senha=senha_hash)
 
-    # Enviar ou simular envio de e-mail
-    enviar_email(email, senha_nova)
+    # Enfileirar o e-mail (enviado em segundo plano; enfileirar pode esperar a fila)
+    try:
+        await run_in_threadpool(enviar_email, email, senha_nova)
+    except fila_email.FilaCheia:
+        # a fila encheu depois da conferência acima: a senha nova não vai ser
+        # enviada, então a anterior volta a valer
+        await run_in_threadpool(_gravar, db, usuario, senha=senha_anterior)
+        raise HTTPException(status_code=503, detail="Serviço de e-mail sobrecarregado. Tente novamente em instantes.")
 
     return {
-        "detail": f"Uma nova senha foi gerada para {email}. Verifique seu e-mail (ou console, se simulado)."
+        "detail": f"Uma nova senha foi gerada para {email}. Verifique seu e-mail."
     }
-    
 
-# ---------- Função utilitária ----------
-def find_col_insensitive(df: pd.DataFrame, candidates):
-    """Retorna o nome da primeira coluna do df que contenha qualquer candidato (ignora maiúsculas e espaços)."""
-    cols = list(df.columns)
-    cols_norm = {c.replace(" ", "").lower(): c for c in cols}
-    for cand in candidates:
-        key = cand.replace(" ", "").lower()
-        for k, orig in cols_norm.items():
-            if key in k:
-                return orig
-    return None
-
-
-# -------------------------
-# Função auxiliar
-# -------------------------
-def pandas_to_json_safe(df: pd.DataFrame):
-    """Converte um DataFrame do Pandas para lista de dicionários pronta para JSON"""
-    df = df.replace({np.nan: None, np.inf: None, -np.inf: None})
-    if "nota sobre os dados faltantes" in df.columns:
-        df = df.drop(columns=["nota sobre os dados faltantes"])
-
-    for col in df.select_dtypes(include=["datetime64[ns]", "datetime64[ns, UTC]"]).columns:
-        df[col] = df[col].apply(lambda x: x.isoformat() if x is not None else None)
-
-    return df.to_dict(orient="records")
-
-def find_col_insensitive(df: pd.DataFrame, possíveis: list[str]) -> Optional[str]:
-    """Encontra coluna no dataframe ignorando maiúsculas/minúsculas"""
-    for p in possíveis:
-        for c in df.columns:
-            if c.strip().lower() == p.strip().lower():
-                return c
-    return None
-
-def adicionar_imagem(df_in):
-    col_img = None
-    for c in df_in.columns:
-        if "imagem" in c.lower() or "foto" in c.lower():
-            col_img = c
-            break
-
-    resultados = pandas_to_json_safe(df_in)
-
-    if col_img:
-        for item in resultados:
-            filename = item.get(col_img)
-            if filename:
-                item["imagem_url"] = f"/imgs/{filename}"  # URL dinâmica
-            else:
-                item["imagem_url"] = None
-    return resultados
+
+@app.get("/fila-email/metricas")
+def metricas_fila_email():
+    return fila_email.despachante.metricas()
+
+
+@app.get("/senhas/metricas")
+def metricas_senhas():
+    """Pool de hash de senhas: algoritmo, custo, operações em andamento e tempo de fila."""
+    return senhas.servico.metricas()
+
+
+@app.get("/pesquisas/metricas")
+def metricas_pesquisas():
+    """Registro de pesquisas: buffer, linhas gravadas/descartadas e aquecimentos."""
+    return pesquisas.registro.metricas()
+
+
+@app.get("/pesquisas/populares")
+def pesquisas_populares():
+    """Consultas mais frequentes da última agregação (as que são refeitas para aquecer os caches)."""
+    return pesquisas.registro.populares
+
+
+@app.get("/pronto")
+def prontidao():
+    """Prontidão para o balanceador: 503 até banco e catálogo estarem aquecidos."""
+    estado = inicializacao.prontidao.estado()
+    return JSONResponse(estado, status_code=200 if estado["pronto"] else 503)
+
+
+@app.get("/db/pool")
+def metricas_banco():
+    """Estado do pool de conexões e tempo de espera no checkout."""
+    return metricas_pool()
+
+
+@app.middleware("http")
+async def medir_requisicoes(request: Request, call_next):
+    """Latência por rota (o molde da rota, ex.: /carros/{id}, para não explodir os rótulos)."""
+    inicio = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        rota = request.scope.get("route")
+        metricas.registro.observar(
+            "smvbr_http_requisicao_segundos", time.perf_counter() - inicio,
+            metodo=request.method, rota=getattr(rota, "path", "desconhecida"), status=status,
+        )
+
+
+def _separar_metricas(prefixo: str, ajuda: str, valores: dict, contadores, medidores: dict, totais: dict):
+    """
+    Métricas numéricas de um componente para o /metrics: as que estão em
+    ``contadores`` (o que o componente conta desde que subiu) vão para
+    ``totais`` (counter), as outras para ``medidores`` (gauge).
+    """
+    for nome, valor in valores.items():
+        if isinstance(valor, (int, float)):
+            destino = totais if nome in contadores else medidores
+            destino[f"{prefixo}_{nome}"] = (f"{ajuda}: {nome}", valor)
+
+
+@app.get("/metrics")
+def metricas_prometheus():
+    """Métricas no formato texto do Prometheus."""
+    medidores, totais = {}, {}
+    componentes = [
+        ("smvbr_fila_email", "Fila de e-mails", fila_email.despachante.metricas(), fila_email.despachante.contadores),
+        ("smvbr_db_pool", "Pool de conexões", metricas_pool(), metricas_checkout.contadores),
+        ("smvbr_senhas", "Hash de senhas", senhas.servico.metricas(), senhas.servico.contadores),
+        ("smvbr_pesquisas", "Registro de pesquisas", pesquisas.registro.metricas(), pesquisas.registro.contadores),
+    ]
+    if importacao.carregado(dimensoes):
+        componentes.append((
+            "smvbr_cache_combustiveis", "Cache de combustíveis",
+            dimensoes.combustiveis.metricas(), dimensoes.combustiveis.contadores,
+        ))
+    for prefixo, ajuda, valores, contadores in componentes:
+        _separar_metricas(prefixo, ajuda, valores, contadores, medidores, totais)
+
+    medidores["smvbr_pronto"] = ("1 quando banco e catálogo já foram aquecidos", inicializacao.prontidao.estado()["pronto"])
+    snap = catalogo.snapshot_atual() if importacao.carregado(catalogo) else None
+    if snap is not None:
+        medidores["smvbr_catalogo_linhas"] = ("Linhas do catálogo carregado", {(("versao", snap.versao),): len(snap)})
+    return Response(metricas.registro.texto(medidores, totais), media_type="text/plain; version=0.0.4; charset=utf-8")
+    
 
 ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 img_path = os.path.join(ROOT_DIR, "data", "image")
 app.mount("/imgs", StaticFiles(directory=img_path), name="imgs")
 
-def find_col_insensitive(df, candidates):
-    """Encontra coluna ignorando maiúsculas/minúsculas"""
-    for c in candidates:
-        for col in df.columns:
-            if col.lower() == c.lower():
-                return col
-    return None
+
+# ---------- Catálogo em memória ----------
+# "memoria": /carros e /filtro-carros respondem pelo snapshot da planilha;
+# "sql": respondem por consultas no banco (catálogo carregado com backend.etl_catalogo)
+MODO_CATALOGO = os.getenv("CATALOGO_MODO", "memoria")
 
 
+def catalogo_atual() -> "catalogo.CatalogoSnapshot":
+    """Snapshot atual do catálogo, convertendo falhas de carga em HTTPException."""
+    try:
+        return catalogo.obter_catalogo()
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Arquivo da planilha não encontrado")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao abrir planilha: {e}")
+
+
+def _consulta_sql(consulta, *args):
+    """Consulta do modo SQL (backend/consultas_sql.py), com cursor inválido virando 400."""
+    try:
+        return consulta(*args)
+    except consultas_sql.CursorInvalido:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
 @app.get("/filtro-carros")
 def filtro_carros(
     ano: Optional[int] = Query(None),
@@ -334,169 +474,239 @@ def filtro_carros(
     direcao_assistida: Optional[str] = Query(None),
     combustivel: Optional[str] = Query(None),
     pagina: int = Query(1, ge=1),
-    limite: int = Query(20, ge=1, le=200)
+    limite: int = Query(20, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="Só no modo SQL: proximo_cursor da página anterior"),
+    db: Session = Depends(get_db),
 ):
-    ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    caminho = os.path.join(ROOT_DIR, "data", "database.xlsx")
+    pesquisas.registro.registrar("/filtro-carros", {
+        "ano": ano, "grupo": grupo, "marca": marca, "motor": motor, "transmissao": transmissao,
+        "ar_condicionado": ar_condicionado, "direcao_assistida": direcao_assistida, "combustivel": combustivel,
+        "pagina": pagina, "limite": limite, "cursor": cursor,
+    })
+    if MODO_CATALOGO == "sql":
+        filtros = {
+            "ano": ano, "grupo": grupo, "marca": marca, "motor": motor, "transmissao": transmissao,
+            "ar_condicionado": ar_condicionado, "direcao_assistida": direcao_assistida, "combustivel": combustivel,
+        }
+        with metricas.etapa("/filtro-carros", "sql"):
+            resultado = _consulta_sql(consultas_sql.filtrar, db, filtros, pagina, limite, cursor)
+        linhas = resultado["linhas"]
+        with metricas.etapa("/filtro-carros", "serializacao"):
+            corpo = montar_json(
+                {"total": resultado["total"], "pagina": pagina, "limite": limite, "resultados": None,
+                 "proximo_cursor": resultado["proximo_cursor"]},
+                "resultados", range(len(linhas)), linhas,
+            )
+        return RespostaJSON(corpo)
+
+    with metricas.etapa("/filtro-carros", "catalogo"):
+        snap = catalogo_atual()
+    df_work = snap.df
+
+    # -------- Aplicar filtros (interseção dos índices invertidos) --------
+    filtros = {
+        "grupo": grupo,
+        "marca": marca,
+        "motor": motor,
+        "transmissao": transmissao,
+        "ar_condicionado": ar_condicionado,
+        "direcao_assistida": direcao_assistida,
+        "combustivel": combustivel,
+    }
+    with metricas.etapa("/filtro-carros", "filtro"):
+        listas = []
+        if ano is not None and "ano" in snap.indices_filtro:
+            listas.append(snap.indices_filtro["ano"].igual(int(ano)))
+        for nome, valor in filtros.items():
+            if valor and nome in snap.indices_filtro:
+                listas.append(snap.indices_filtro[nome].contem(valor))
+        posicoes = indices.intersectar(listas) if listas else None
+
+    # -------- Ordenar por Ranking (do maior para o menor) + Paginação --------
+    # A ordem por "Pontuação Final" vem pronta do snapshot; com filtros só a
+    # página pedida é ordenada (top-k via argpartition).
+    inicio = (pagina - 1) * limite
+    fim = inicio + limite
+    with metricas.etapa("/filtro-carros", "ordenacao"):
+        if posicoes is not None:
+            total = len(posicoes)
+            linhas = indices.pagina_por_rank(posicoes, snap.rank, inicio, fim)
+        else:
+            total = len(df_work)
+            linhas = snap.ordem_ranking[inicio:fim]
+
+    # -------- JSON das linhas já vem pronto do snapshot --------
+    with metricas.etapa("/filtro-carros", "serializacao"):
+        corpo = montar_json(
+            {"total": total, "pagina": pagina, "limite": limite, "resultados": None},
+            "resultados", linhas, snap.json_filtro,
+        )
+    return RespostaJSON(corpo)
 
-    if not os.path.exists(caminho):
-        raise HTTPException(status_code=404, detail="Arquivo da planilha não encontrado")
 
-    try:
-        df = pd.read_excel(caminho)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erro ao abrir planilha: {e}")
 
-    df.columns = [c.strip() for c in df.columns]
-    df_work = df.copy()
-
-    # -------- Aplicar filtros --------
-    if ano is not None:
-        col = find_col_insensitive(df_work, ["ANO", "Ano", "ano"])
-        if col:
-            df_work = df_work[pd.to_numeric(df_work[col], errors="coerce") == int(ano)]
-
-    if grupo:
-        col = find_col_insensitive(df_work, ["GRUPO", "Grupo"])
-        if col:
-            df_work = df_work[df_work[col].astype(str).str.lower().str.contains(grupo.lower(), na=False)]
-
-    if marca:
-        col = find_col_insensitive(df_work, ["MARCA", "Marca"])
-        if col:
-            df_work = df_work[df_work[col].astype(str).str.lower().str.contains(marca.lower(), na=False)]
-
-    if motor:
-        col = find_col_insensitive(df_work, ["FAIXA", "Faixa"])
-        if col:
-            df_work = df_work[df_work[col].astype(str).str.lower().str.contains(motor.lower(), na=False)]
-
-    if transmissao:
-        col = find_col_insensitive(df_work, ["CÂMBIO" "Câmbio"])
-        if col:
-            df_work = df_work[df_work[col].astype(str).str.lower().str.contains(transmissao.lower(), na=False)]
-
-    if ar_condicionado:
-        col = find_col_insensitive(df_work, ["AR-CONDICIONADO", "Ar-Condicionado", "AR CONDICIONADO"])
-        if col:
-            df_work = df_work[df_work[col].astype(str).str.lower().str.contains(ar_condicionado.lower(), na=False)]
-
-    if direcao_assistida:
-        col = find_col_insensitive(df_work, ["DIRECAO ASSISTIDA", "Direção Assistida"])
-        if col:
-            df_work = df_work[df_work[col].astype(str).str.lower().str.contains(direcao_assistida.lower(), na=False)]
 
-    if combustivel:
-        col = find_col_insensitive(df_work, ["COMBUSTÍVEL", "Combustivel", "Combustível"])
-        if col:
-            df_work = df_work[df_work[col].astype(str).str.lower().str.contains(combustivel.lower(), na=False)]
-
-    # -------- Ordenar por Ranking (do maior para o menor) --------
-    col_ranking = find_col_insensitive(df_work, ["Pontuação Final"])
-    if col_ranking:
-        df_work[col_ranking] = pd.to_numeric(df_work[col_ranking], errors="coerce")
-        df_work = df_work.sort_values(by=col_ranking, ascending=False)
-
-    # -------- Paginação --------
-    total = len(df_work)
-    inicio = (pagina - 1) * limite
-    fim = inicio + limite
-    page = df_work.iloc[inicio:fim]
 
-    # -------- Converter para JSON seguro --------
-    def df_to_json_safe(df_in):
-        dfj = df_in.replace({np.nan: None, np.inf: None, -np.inf: None})
-        return dfj.to_dict(orient="records")
 
-    #--resultados = df_to_json_safe(page)
+# Quantas linhas são enviadas por vez no modo NDJSON
+TAMANHO_BLOCO_STREAM = 500
 
-    resultados=adicionar_imagem(page)
 
-    return {"total": total, "pagina": pagina, "limite": limite, "resultados": resultados}
+#Consulta carros na planilha (versão simplificada e #otimizada)
+#-------------------------
+@app.get("/carros")
+def listar_carros(
+    busca: str = Query(None, description="Pesquisar por marca, modelo ou ano"),
+    cursor: Optional[str] = Query(None, description="codigo do último carro da página anterior"),
+    limite: Optional[int] = Query(None, ge=1, le=500, description="Tamanho da página (sem limite retorna tudo)"),
+    formato: str = Query("json", pattern="^(json|ndjson)$"),
+    db: Session = Depends(get_db),
+):
+    pesquisas.registro.registrar("/carros", {"busca": busca, "cursor": cursor, "limite": limite, "formato": formato})
+    if MODO_CATALOGO == "sql":
+        with metricas.etapa("/carros", "sql"):
+            resultado = _consulta_sql(consultas_sql.buscar, db, busca, limite, cursor)
+        linhas = resultado["linhas"]
+        return _resposta_carros(
+            resultado["mensagem"], resultado["total"], range(len(linhas)), linhas,
+            resultado["proximo_cursor"], limite, formato,
+        )
 
+    # Visão já normalizada (colunas minúsculas, marca/modelo/ano/codigo em maiúsculo)
+    with metricas.etapa("/carros", "catalogo"):
+        snap = catalogo_atual()
+    df = snap.df_busca
 
+    for col in ["marca", "modelo", "ano", "codigo"]:
+        if col not in df.columns:
+            raise HTTPException(status_code=500, detail=f"Coluna '{col}' ausente na planilha")
 
-# -------------------------
-# Função auxiliar
-# -------------------------
-def pandas_to_json_safe(df: pd.DataFrame):
-    """Converte um DataFrame do Pandas para lista de dicionários pronta para JSON"""
-    df = df.replace({np.nan: None, np.inf: None, -np.inf: None})
-    if "nota sobre os dados faltantes" in df.columns:
-        df = df.drop(columns=["nota sobre os dados faltantes"])
+    # -------- Linhas que respondem à busca (posições no snapshot) --------
+    mensagem = None
+    termos = busca.strip().upper().split() if busca else []
+    if not termos:
+        # Se não tem busca, retorna tudo
+        posicoes = np.arange(len(df))
+    else:
+        # Busca direta
+        indice = snap.indice_busca
+        with metricas.etapa("/carros", "busca"):
+            posicoes = indice.buscar_todos(termos)
+
+        if len(posicoes) == 0:
+            # Se não achou → fuzzy match (marca, modelo ou ano)
+            with metricas.etapa("/carros", "fuzzy"):
+                sugestao, score = snap.sugestoes.sugerir(termos)
+                if score >= 70:
+                    posicoes = indice.buscar(sugestao)
+                    mensagem = f"Nenhum carro encontrado com '{busca}', exibindo resultados semelhantes a '{sugestao}'"
+                else:
+                    # Se nem fuzzy achou
+                    mensagem = f"Nenhum carro encontrado com '{busca}'"
+            metricas.registro.incrementar(
+                "smvbr_busca_fuzzy_total", modo="memoria", resultado="sugestao" if score >= 70 else "sem_resultado"
+            )
+
+    total = len(posicoes)
+
+    # -------- Paginação por cursor (keyset pelo codigo do último carro) --------
+    proximo_cursor = None
+    if cursor is not None:
+        pos_cursor = snap.posicao_por_codigo.get(cursor.strip().upper())
+        if pos_cursor is None:
+            raise HTTPException(status_code=400, detail="Cursor inválido")
+        posicoes = posicoes[np.searchsorted(posicoes, pos_cursor, side="right"):]
+    if limite is not None:
+        if len(posicoes) > limite:
+            proximo_cursor = df["codigo"].iat[posicoes[limite - 1]]
+        posicoes = posicoes[:limite]
+
+    return _resposta_carros(mensagem, total, posicoes, snap.json_busca, proximo_cursor, limite, formato)
+
+
+def _resposta_carros(mensagem, total, linhas, linhas_json, proximo_cursor, limite, formato):
+    """Resposta de /carros (JSON ou NDJSON) a partir das linhas já serializadas."""
+    # -------- Streaming NDJSON --------
+    if formato == "ndjson":
+        headers = {"X-Total-Count": str(total)}
+        if proximo_cursor is not None:
+            headers["X-Proximo-Cursor"] = proximo_cursor
+        return StreamingResponse(
+            linhas_ndjson(linhas, linhas_json, TAMANHO_BLOCO_STREAM),
+            media_type="application/x-ndjson", headers=headers,
+        )
 
-    for col in df.select_dtypes(include=["datetime64[ns]", "datetime64[ns, UTC]"]).columns:
-        df[col] = df[col].apply(lambda x: x.isoformat() if x is not None else None)
+    campos = {"carros": None, "total": total}
+    if mensagem:
+        campos = {"mensagem": mensagem, **campos}
+    if limite is not None:
+        campos["proximo_cursor"] = proximo_cursor
+    with metricas.etapa("/carros", "serializacao"):
+        corpo = montar_json(campos, "carros", linhas, linhas_json)
+    return RespostaJSON(corpo)
 
-    return df.to_dict(orient="records")
 
 
+# -------- Aquecimento pelas pesquisas populares (backend/pesquisas.py) --------
+CAMPOS_FILTRO = ("ano", "grupo", "marca", "motor", "transmissao", "ar_condicionado", "direcao_assistida", "combustivel")
 
-#Consulta carros na planilha (versão simplificada e #otimizada)
-#-------------------------
-@app.get("/carros")
-def listar_carros(busca: str = Query(None, description="Pesquisar por marca, modelo ou ano")):
-    caminho = os.path.join(ROOT_DIR, "data", "database.xlsx")
 
-    if not os.path.exists(caminho):
-        raise HTTPException(status_code=404, detail="Arquivo da planilha não encontrado")
+def _versao_catalogo() -> Optional[str]:
+    """Versão do snapshot em memória; None no modo SQL ou antes da primeira carga."""
+    snap = catalogo.snapshot_atual() if MODO_CATALOGO != "sql" and importacao.carregado(catalogo) else None
+    return snap.versao if snap is not None else None
 
-    try:
-        df = pd.read_excel(caminho)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erro ao carregar a planilha: {str(e)}")
 
-    # Normaliza colunas
-    df.columns = [c.strip().lower() for c in df.columns]
+def _repetir_pesquisa(rota: str, parametros: dict):
+    """
+    Refaz uma pesquisa popular pelo próprio handler (página de 1 linha, resposta
+    descartada) só para encher os caches do snapshot: índice de busca, fuzzy e
+    índices de filtro. No modo SQL não há cache de resultado no processo.
+    """
+    if _versao_catalogo() is None:
+        return
+    if rota == "/carros" and parametros.get("busca"):
+        listar_carros(busca=parametros["busca"], cursor=None, limite=1, formato="json", db=None)
+    elif rota == "/filtro-carros":
+        filtro_carros(
+            **{campo: parametros.get(campo) for campo in CAMPOS_FILTRO},
+            pagina=1, limite=1, cursor=None, db=None,
+        )
 
-    if "ano" in df.columns:
-        df["ano"] = df["ano"].apply(
-            lambda x: str(int(x)) if pd.notnull(x) and str(x).replace(".", "", 1).isdigit() else str(x)
-        ).str.strip()
 
-    for col in ["marca", "modelo", "ano", "codigo"]:
-        if col not in df.columns:
-            raise HTTPException(status_code=500, detail=f"Coluna '{col}' ausente na planilha")
-        df[col] = df[col].fillna("").astype(str).str.strip().str.upper()
-
-    # Se não tem busca, retorna tudo
-    if not busca:
-        return {"carros": adicionar_imagem(df), "total": len(df)}
-
-    # Busca direta
-    termos = busca.strip().upper().split()
-    df_filtrado = df.copy()
-    for termo in termos:
-        df_filtrado = df_filtrado[
-            df_filtrado["marca"].str.contains(termo, na=False) |
-            df_filtrado["modelo"].str.contains(termo, na=False) |
-            df_filtrado["ano"].str.contains(termo, na=False)
-        ]
-        if df_filtrado.empty:
-            break
-
-    # Se achou, retorna
-    if not df_filtrado.empty:
-        return {"carros": adicionar_imagem(df_filtrado), "total": len(df_filtrado)}
-
-    # Se não achou → fuzzy match (marca, modelo ou ano)
-    valores_validos = pd.concat([df["marca"], df["modelo"], df["ano"]]).unique()
-    sugestao, score, _ = process.extractOne(termos[0], valores_validos, scorer=fuzz.WRatio)
-
-    if score >= 70:
-        df_sugerido = df[
-            df["marca"].str.contains(sugestao, na=False) |
-            df["modelo"].str.contains(sugestao, na=False) |
-            df["ano"].str.contains(sugestao, na=False)
-        ]
-        return {
-            "mensagem": f"Nenhum carro encontrado com '{busca}', exibindo resultados semelhantes a '{sugestao}'",
-            "carros": adicionar_imagem(df_sugerido),
-            "total": len(df_sugerido)
-        }
+pesquisas.registro.configurar_aquecimento(_repetir_pesquisa, _versao_catalogo)
+pesquisas.registro.banco_pronto = lambda: inicializacao.prontidao.pronto("banco")
 
-    # Se nem fuzzy achou
-    return {"mensagem": f"Nenhum carro encontrado com '{busca}'", "carros": [], "total": 0}
+
+@app.get("/carros/{id}")
+def detalhe_carro(
+    id: str,
+    por: str = Query("codigo", pattern="^(codigo|veiculo_id)$"),
+    db: Session = Depends(get_db),
+):
+    """
+    Detalhe de um carro pelo código da planilha (padrão) ou pelo veiculo_id do banco
+    (?por=veiculo_id). Responde a linha já serializada do snapshot (ou de
+    catalogo_linhas, no modo SQL).
+    """
+    codigo = id.strip()
+    if por == "veiculo_id":
+        try:
+            codigo = favoritos.codigo_do_veiculo(db, int(codigo))
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"veiculo_id inválido: {id}")
+
+    corpo = None
+    if codigo is not None:
+        if MODO_CATALOGO == "sql":
+            corpo = consultas_sql.detalhe(db, str(codigo))
+        else:
+            snap = catalogo_atual()
+            posicao = snap.posicao_por_codigo.get(str(codigo).upper())
+            corpo = snap.json_busca[posicao] if posicao is not None else None
+    if corpo is None:
+        raise HTTPException(status_code=404, detail=f"Nenhum carro encontrado com {por} {id}")
+    return RespostaJSON(corpo)
 
 
 
@@ -506,345 +716,155 @@ def favoritar_veiculo(usuario_id: int, codigo: str = Body(..., embed=True), db:
     Favorita um veículo baseado no código existente na planilha.
     O front envia: { "codigo": "COD12345" }
     """
-
-    # Caminho da planilha
-    ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    caminho = os.path.join(ROOT_DIR, "data", "database.xlsx")
-
-    if not os.path.exists(caminho):
-        raise HTTPException(status_code=404, detail="Arquivo da planilha não encontrado")
-
-    # Lê a planilha
-    df = pd.read_excel(caminho)
-
-    # Normaliza colunas
-    df.columns = [
-        c.strip().lower()
-        .replace(" ", "_")
-        .replace("-", "_")
-        .replace("(", "")
-        .replace(")", "")
-        .replace("ç", "c")
-        .replace("ã", "a")
-        .replace("â", "a")
-        .replace("é", "e")
-        .replace("ê", "e")
-        .replace("í", "i")
-        .replace("ó", "o")
-        .replace("ô", "o")
-        .replace("ú", "u")
-        for c in df.columns
-    ]
-
-    if "codigo" not in df.columns:
-        raise HTTPException(status_code=500, detail="Coluna 'codigo' ausente na planilha")
-
-    df["codigo"] = df["codigo"].astype(str).str.strip()
     codigo = str(codigo).strip()
 
-    carro = df[df["codigo"] == codigo.upper()].to_dict(orient="records")
-    if not carro:
-        raise HTTPException(status_code=404, detail=f"Nenhum carro encontrado com código {codigo}")
-    carro = carro[0]
-
-    # --- IMAGEM ---
-    col_img = next((c for c in df.columns if "imagem" in c.lower() or "foto" in c.lower()), None)
-    imagem_nome = carro.get(col_img) if col_img else None
-    imagem_url = f"/imgs/{imagem_nome}" if imagem_nome else None
-
-    # --- Combustível ---
-    combustivel_tipo = carro.get("combustivel", "N/A")
-    combustivel_tipo = combustivel_tipo.strip().upper() if combustivel_tipo else "N/A"
-
-    combustivel = db.query(Combustivel).filter(Combustivel.tipo == combustivel_tipo).first()
-    if not combustivel:
-        combustivel = Combustivel(tipo=combustivel_tipo)
-        db.add(combustivel)
-        db.commit()
-        db.refresh(combustivel)
-
-    # --- AR CONDICIONADO ---
-    ar_condicionado = carro.get("ar_condicionado", "N")
-    if isinstance(ar_condicionado, str):
-        ar_condicionado = ar_condicionado.strip().lower() in ["sim", "s", "true", "1"]
+    if MODO_CATALOGO == "sql":
+        # sem snapshot, quartis_veiculo fica com os quartis da planilha até o
+        # próximo python -m backend.quartis (a linha vai sem assinatura)
+        carro = carro_banco = consultas_sql.carro(db, codigo)
     else:
-        ar_condicionado = bool(ar_condicionado)
-
-    # --- DIREÇÃO ---
-    direcao_assistida = carro.get("direcao_assistida", "M")
-    if direcao_assistida not in ["H", "E", "H-E", "M"]:
-        direcao_assistida = "M"
-
-    # --- Score final da planilha ---
-    score_final = float(carro.get("pontuacao_final") or 0)
-
-    # --- CRIA OU BUSCA O VEÍCULO ---
-    veiculo = db.query(Veiculo).filter_by(codigo=carro["codigo"]).first()
-    if not veiculo:
-        veiculo = Veiculo(
-            codigo=carro["codigo"],
-            ano=int(carro.get("ano", 0)),
-            categoria=carro.get("categoria"),
-            marca=carro.get("marca"),
-            modelo=carro.get("modelo"),
-            versao=carro.get("versao"),
-            motor=carro.get("motor"),
-            transmissao=carro.get("transmissao"),
-            ar_condicionado=ar_condicionado,
-            direcao_assistida=direcao_assistida,
-            scoreFinal=score_final,
-            imagem_url=imagem_url
-        )
-        db.add(veiculo)
-        db.commit()
-        db.refresh(veiculo)
-
-    # --- EMISSÕES ---
-    emissao_existente = db.query(Emissao).filter_by(
-        veiculo_id=veiculo.veiculo_id, combustivel_id=combustivel.combustivel_id
-    ).first()
-
-    if not emissao_existente:
-        emissao = Emissao(
-            veiculo_id=veiculo.veiculo_id,
-            combustivel_id=combustivel.combustivel_id,
-            nmhc=float(carro.get("emissao_de_nmhc_g/km") or 0),
-            co=float(carro.get("emissao_de_co_g/km") or 0),
-            nox=float(carro.get("emissao_de_nox_g/km") or 0),
-            co2=float(carro.get("emissao_de_co2_g/km") or 0),
-        )
-        db.add(emissao)
-
-    # --- CONSUMO ---
-    consumo_existente = db.query(Consumo).filter_by(
-        veiculo_id=veiculo.veiculo_id, combustivel_id=combustivel.combustivel_id
-    ).first()
-
-    if not consumo_existente:
-        consumo = Consumo(
-            veiculo_id=veiculo.veiculo_id,
-            combustivel_id=combustivel.combustivel_id,
-            rendimento_cidade=float(
-                carro.get("rendimento_da_gasolina_ou_diesel_na_cidade_km/l")
-                or carro.get("rendimento_do_etanol_na_cidade_km/l")
-                or 0
-            ),
-            rendimento_estrada=float(
-                carro.get("rendimento_da_gasolina_ou_diesel_estrada_km/l")
-                or carro.get("rendimento_do_etanol_na_estrada_km/l")
-                or 0
-            ),
-            consumo_energetico=float(carro.get("consumo_energetico_mj/km") or 0)
-        )
-        db.add(consumo)
-
-    # ==========================================================
-    # 🔥 NOVO TRECHO ---> CRIA/ATUALIZA QUARTIS DO VEÍCULO
-    # ==========================================================
-
-    quartil_nmhc = carro.get("quartil_do_nmhc")
-    quartil_co = carro.get("quartil_do_co")
-    quartil_nox = carro.get("quartil_do_nox")
-    quartil_co2 = carro.get("quartil_do_co2")
-    quartil_consumo_energetico = carro.get("quartil_do_consumo_energetico")
-    quartil_score = carro.get("quartil_do_score")
-
-
-    quartil_existente = db.query(QuartilVeiculo).filter_by(
-        veiculo_id=veiculo.veiculo_id
-    ).first()
-
-    if not quartil_existente:
-        quartil = QuartilVeiculo(
-            veiculo_id=veiculo.veiculo_id,
-            quartil_nmhc=quartil_nmhc,
-            quartil_co=quartil_co,
-            quartil_nox=quartil_nox,
-            quartil_co2=quartil_co2,
-            quartil_consumo_energetico=quartil_consumo_energetico,
-            quartil_score=quartil_score
-        )
-        db.add(quartil)
-    else:
-        quartil_existente.quartil_nmhc = quartil_nmhc
-        quartil_existente.quartil_co = quartil_co
-        quartil_existente.quartil_nox = quartil_nox
-        quartil_existente.quartil_co2 = quartil_co2
-        quartil_existente.quartil_consumo_energetico = quartil_consumo_energetico
-        quartil_existente.quartil_score = quartil_score
-
-    # ==========================================================
+        snap = catalogo_atual()
+        df = snap.df_favoritos
 
-    db.commit()
+        if "codigo" not in df.columns:
+            raise HTTPException(status_code=500, detail="Coluna 'codigo' ausente na planilha")
 
-    # --- FAVORITAR / DESFAVORITAR ---
-    favorito_existente = db.query(Favorito).filter_by(
-        usuario_id=usuario_id, veiculo_id=veiculo.veiculo_id
-    ).first()
+        posicao = snap.posicao_por_codigo.get(codigo.upper())
+        carro = carro_banco = None
+        if posicao is not None:
+            carro = df.iloc[posicao].to_dict()
+            # no banco, quartis_veiculo recebe os quartis recalculados
+            carro_banco = {**carro, **snap.quartis_banco.iloc[posicao].to_dict()}
 
-    if favorito_existente:
-        db.delete(favorito_existente)
-        msg = "Veículo removido dos favoritos."
-    else:
-        novo_fav = Favorito(usuario_id=usuario_id, veiculo_id=veiculo.veiculo_id)
-        db.add(novo_fav)
-        msg = "Veículo adicionado aos favoritos."
+    if carro is None:
+        raise HTTPException(status_code=404, detail=f"Nenhum carro encontrado com código {codigo}")
 
+    # --- FAVORITAR / DESFAVORITAR (cria o veículo no banco na primeira vez) ---
     try:
-        db.commit()
+        adicionado, veiculo_id = favoritos.alternar_favorito(db, usuario_id, carro_banco)
     except IntegrityError:
-        db.rollback()
         raise HTTPException(status_code=400, detail="Erro de integridade: este favorito já existe.")
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Erro ao salvar favorito: {str(e)}")
 
+    quartis = etl_catalogo.registro_quartil(carro)
     return {
-        "mensagem": msg,
-        "veiculo_id": veiculo.veiculo_id,
-        "scoreFinal": score_final,
+        "mensagem": "Veículo adicionado aos favoritos." if adicionado else "Veículo removido dos favoritos.",
+        "veiculo_id": veiculo_id,
+        "scoreFinal": numero(carro.get("pontuacao_final")),
         "quartis": {
-            "nmhc": quartil_nmhc,
-            "co": quartil_co,
-            "nox": quartil_nox,
-            "co2": quartil_co2,
-            "consumo_energetico": quartil_consumo_energetico,
-            "score": quartil_score,
+            "nmhc": quartis["quartil_nmhc"],
+            "co": quartis["quartil_co"],
+            "nox": quartis["quartil_nox"],
+            "co2": quartis["quartil_co2"],
+            "consumo_energetico": quartis["quartil_consumo_energetico"],
+            "score": quartis["quartil_score"],
         }
     }
 
 
 
 
-from sqlalchemy.orm import joinedload
-
 @app.get("/veiculos_favoritos/{usuario_id}")
-def get_veiculos_favoritos(usuario_id: int, db: Session = Depends(get_db)):
-    favoritos = (
-        db.query(models.Favorito)
-        .options(
-            joinedload(models.Favorito.veiculo)
-            .joinedload(models.Veiculo.emissoes)
-            .joinedload(models.Emissao.combustivel),
-
-            joinedload(models.Favorito.veiculo)
-            .joinedload(models.Veiculo.consumos)
-            .joinedload(models.Consumo.combustivel),
-
-            # 🔥 Novo: JOIN correto para quartil
-            joinedload(models.Favorito.veiculo)
-            .joinedload(models.Veiculo.quartil)
-        )
-        .filter(models.Favorito.usuario_id == usuario_id)
-        .all()
-    )
+def get_veiculos_favoritos(
+    usuario_id: int,
+    request: Request,
+    limite: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[int] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Lista os favoritos do usuário. Com ``limite`` pagina por cursor (cabeçalho
+    X-Proximo-Cursor). Responde 304 quando o If-None-Match bate com o ETag,
+    que vem do estado dos favoritos no banco (vale entre workers).
+    """
+    respostas = favoritos.respostas
+    etag = respostas.etag(db, usuario_id, limite, cursor)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
 
-    resultado = []
-
-    for fav in favoritos:
-        veiculo = fav.veiculo
-        emissao = veiculo.emissoes[0] if veiculo.emissoes else None
-        consumo = veiculo.consumos[0] if veiculo.consumos else None
-
-        # ✔ pegando um objeto, não lista
-        quartil = veiculo.quartil  
-
-        resultado.append({
-            "veiculo_id": veiculo.veiculo_id,
-            "ano": veiculo.ano,
-            "categoria": veiculo.categoria,
-            "marca": veiculo.marca,
-            "modelo": veiculo.modelo,
-            "versao": veiculo.versao,
-            "motor": veiculo.motor,
-            "transmissao": veiculo.transmissao,
-            "ar_condicionado": veiculo.ar_condicionado,
-            "direcao_assistida": veiculo.direcao_assistida,
-            "imagem_url": veiculo.imagem_url,
-
-            "emissao_nmhc": float(emissao.nmhc) if emissao else None,
-            "emissao_co": float(emissao.co) if emissao else None,
-            "emissao_nox": float(emissao.nox) if emissao else None,
-            "emissao_co2": float(emissao.co2) if emissao else None,
-
-            "rendimento_cidade": float(consumo.rendimento_cidade) if consumo else None,
-            "rendimento_estrada": float(consumo.rendimento_estrada) if consumo else None,
-            "consumo_energetico": float(consumo.consumo_energetico) if consumo else None,
-
-            # pega do banco os quartis
-            "quartis": {
-                "nmhc": quartil.quartil_nmhc if quartil else None,
-                "co": quartil.quartil_co if quartil else None,
-                "nox": quartil.quartil_nox if quartil else None,
-                "co2": quartil.quartil_co2 if quartil else None,
-                "consumo_energetico": quartil.quartil_consumo_energetico if quartil else None,
-                "score": quartil.quartil_score if quartil else None,
-            }
-        })
-
-    return resultado
+    if _etag_confere(request.headers.get("if-none-match"), etag):
+        proximo_cursor = respostas.proximo_cursor(usuario_id, limite, cursor, etag)
+        if proximo_cursor is not None:
+            headers["X-Proximo-Cursor"] = str(proximo_cursor)
+        return Response(status_code=304, headers=headers)
 
+    corpo, proximo_cursor = respostas.obter(db, usuario_id, limite, cursor, etag)
+    if proximo_cursor is not None:
+        headers["X-Proximo-Cursor"] = str(proximo_cursor)
+    return RespostaJSON(corpo, headers=headers)
 
 
-    
-@app.get("/comparar-carros")
-def comparar_carros(id1: int, id2: int, db: Session = Depends(get_db)):
-    # Busca os veículos pelo ID correto (veiculo_id)
-    veiculo1 = db.query(Veiculo).filter(Veiculo.veiculo_id == id1).first()
-    veiculo2 = db.query(Veiculo).filter(Veiculo.veiculo_id == id2).first()
+def _etag_confere(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    If-None-Match: ``*`` ou lista de entity-tags separadas por vírgula,
+    comparadas uma a uma pela comparação fraca (ignora o ``W/``).
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    alvo = etag.removeprefix("W/")
+    return any(tag == alvo for tag in re.findall(r'(?:W/)?("[^"]*")', if_none_match))
 
-    if not veiculo1 or not veiculo2:
-        raise HTTPException(status_code=404, detail="Um ou ambos os veículos não foram encontrados")
 
-    # Busca emissões e consumo associados
-    emissao1 = db.query(Emissao).filter(Emissao.veiculo_id == id1).first()
-    emissao2 = db.query(Emissao).filter(Emissao.veiculo_id == id2).first()
 
-    consumo1 = db.query(Consumo).filter(Consumo.veiculo_id == id1).first()
-    consumo2 = db.query(Consumo).filter(Consumo.veiculo_id == id2).first()
+def _comparacao(funcao, *args):
+    """Chamada a backend/comparacao.py, com pedido inválido virando 400 e veículo sem dados 404."""
+    try:
+        return funcao(*args)
+    except comparacao.ComparacaoInvalida as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except comparacao.VeiculoSemDados as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@app.get("/comparar")
+def comparar_veiculos(
+    ids: List[int] = Query(..., description="veiculo_id de cada carro (?ids=1&ids=2&...)"),
+    combustivel: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """Compara 2 ou mais veículos: valores, deltas para o primeiro, ranks e percentis por métrica."""
+    combustivel_id = None
+    if combustivel:
+        combustivel_id = dimensoes.combustiveis.obter(db, combustivel.strip().upper())
+        if combustivel_id is None:
+            raise HTTPException(status_code=400, detail=f"Combustível desconhecido: {combustivel}")
+    return _comparacao(comparacao.comparar, db, ids, combustivel_id)
 
-    # Verificação de dados ausentes
-    if not emissao1 or not emissao2:
-        raise HTTPException(status_code=404, detail="Faltam dados de emissões para um dos veículos")
-    if not consumo1 or not consumo2:
-        raise HTTPException(status_code=404, detail="Faltam dados de consumo para um dos veículos")
 
-    # Retorna comparação
-    return {
-        "carro1": {
-            "marca": veiculo1.marca,
-            "modelo": veiculo1.modelo,
-            "ano": veiculo1.ano,
-            "versao": veiculo1.versao,
-            "combustivel_id": emissao1.combustivel_id,
-            "nmhc": float(emissao1.nmhc or 0),
-            "co": float(emissao1.co or 0),
-            "nox": float(emissao1.nox or 0),
-            "co2": float(emissao1.co2 or 0),
-            "rendimento_cidade": float(consumo1.rendimento_cidade or 0),
-            "rendimento_estrada": float(consumo1.rendimento_estrada or 0),
-            "consumo_energetico": float(consumo1.consumo_energetico or 0),
-            "imagem_url": veiculo1.imagem_url,
-            "scoreFinal": float(veiculo1.scoreFinal or 0),
-        },
-        "carro2": {
-            "marca": veiculo2.marca,
-            "modelo": veiculo2.modelo,
-            "ano": veiculo2.ano,
-            "versao": veiculo2.versao,
-            "combustivel_id": emissao2.combustivel_id,
-            "nmhc": float(emissao2.nmhc or 0),
-            "co": float(emissao2.co or 0),
-            "nox": float(emissao2.nox or 0),
-            "co2": float(emissao2.co2 or 0),
-            "rendimento_cidade": float(consumo2.rendimento_cidade or 0),
-            "rendimento_estrada": float(consumo2.rendimento_estrada or 0),
-            "consumo_energetico": float(consumo2.consumo_energetico or 0),
-            "imagem_url": veiculo2.imagem_url,
-            "scoreFinal": float(veiculo2.scoreFinal or 0),
+@app.get("/comparar-carros")
+def comparar_carros(id1: int, id2: int, db: Session = Depends(get_db)):
+    # Veículos, emissões e consumo (do mesmo combustível) numa consulta só
+    if id1 == id2:
+        linha = _comparacao(comparacao.carregar, db, [id1])[0]
+        linhas = [linha, linha]
+    else:
+        linhas = _comparacao(comparacao.carregar, db, [id1, id2])
+
+    def carro(l):
+        return {
+            "marca": l["marca"],
+            "modelo": l["modelo"],
+            "ano": l["ano"],
+            "versao": l["versao"],
+            "combustivel_id": l["combustivel_id"],
+            "nmhc": float(l["nmhc"] or 0),
+            "co": float(l["co"] or 0),
+            "nox": float(l["nox"] or 0),
+            "co2": float(l["co2"] or 0),
+            "rendimento_cidade": float(l["rendimento_cidade"] or 0),
+            "rendimento_estrada": float(l["rendimento_estrada"] or 0),
+            "consumo_energetico": float(l["consumo_energetico"] or 0),
+            "imagem_url": l["imagem_url"],
+            "scoreFinal": float(l["scoreFinal"] or 0),
         }
-    }
-   
+
+    # Retorna comparação
+    return {"carro1": carro(linhas[0]), "carro2": carro(linhas[1])}
+
+
 @app.get("/imgs/nan")
 async def imagem_nan_fallback():
     # Redireciona para o ícone padrão
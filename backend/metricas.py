@@ -0,0 +1,157 @@
+# backend/metricas.py
+"""
+Métricas da API no formato texto do Prometheus (GET /metrics).
+
+- histograma de latência por rota/método/status (middleware em main.py);
+- histograma por etapa de /carros e /filtro-carros (carga do catálogo,
+  filtro, ordenação, busca, fuzzy, serialização), medido com ``etapa()``;
+- contadores (ex.: quantas buscas caíram no fuzzy);
+- valores lidos na hora dos componentes (fila de e-mail, pool do banco...):
+  os que só crescem saem como counter (sufixo _total), o resto como gauge.
+
+``registro.pausar()`` desliga o registro só na thread atual (ex.: pesquisas
+refeitas pelo aquecimento não entram nos histogramas das rotas).
+
+Sem dependência do prometheus_client: os histogramas são só contagens por
+faixa protegidas por um lock, baratas o bastante para ficar sempre ligadas.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Limites das faixas dos histogramas, em segundos
+FAIXAS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histograma:
+    def __init__(self, faixas=FAIXAS):
+        self.faixas = faixas
+        self.contagens = [0] * (len(faixas) + 1)  # última = acima da maior faixa
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor: float):
+        self.contagens[bisect_left(self.faixas, valor)] += 1
+        self.soma += valor
+        self.total += 1
+
+
+def _rotulos(rotulos: tuple, extra: str = "") -> str:
+    partes = []
+    for nome, valor in rotulos:
+        valor = str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        partes.append(f'{nome}="{valor}"')
+    if extra:
+        partes.append(extra)
+    return "{" + ",".join(partes) + "}" if partes else ""
+
+
+def _numero(valor) -> str:
+    if isinstance(valor, bool):
+        return "1" if valor else "0"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class Registro:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histogramas = {}  # nome -> {rotulos: Histograma}
+        self._contadores = {}  # nome -> {rotulos: valor}
+        self._ajuda = {}
+        self._pausa = threading.local()
+
+    def descrever(self, nome: str, ajuda: str):
+        self._ajuda[nome] = ajuda
+
+    @contextmanager
+    def pausar(self):
+        """Nada observado/incrementado por esta thread dentro do bloco é registrado."""
+        anterior = getattr(self._pausa, "ativa", False)
+        self._pausa.ativa = True
+        try:
+            yield
+        finally:
+            self._pausa.ativa = anterior
+
+    def _pausado(self) -> bool:
+        return getattr(self._pausa, "ativa", False)
+
+    def observar(self, nome: str, valor: float, **rotulos):
+        if self._pausado():
+            return
+        chave = tuple(sorted(rotulos.items()))
+        with self._lock:
+            serie = self._histogramas.setdefault(nome, {})
+            if chave not in serie:
+                serie[chave] = Histograma()
+            serie[chave].observar(valor)
+
+    def incrementar(self, nome: str, valor: float = 1, **rotulos):
+        if self._pausado():
+            return
+        chave = tuple(sorted(rotulos.items()))
+        with self._lock:
+            serie = self._contadores.setdefault(nome, {})
+            serie[chave] = serie.get(chave, 0) + valor
+
+    def texto(self, medidores: dict = None, contadores: dict = None) -> str:
+        """
+        Exposição no formato do Prometheus. ``medidores`` são gauges lidos na
+        hora: {nome: (ajuda, valor)} ou {nome: (ajuda, {rotulos: valor})}.
+        ``contadores``, no mesmo formato, são contadores mantidos pelos
+        componentes; saem junto com os do registro, com o sufixo _total.
+        """
+        linhas = []
+        series = {}
+        for nome, (ajuda, valor) in (contadores or {}).items():
+            nome = nome if nome.endswith("_total") else f"{nome}_total"
+            series[nome] = (ajuda, valor if isinstance(valor, dict) else {(): valor})
+        with self._lock:
+            for nome, serie in sorted(self._histogramas.items()):
+                linhas.append(f"# HELP {nome} {self._ajuda.get(nome, nome)}")
+                linhas.append(f"# TYPE {nome} histogram")
+                for rotulos, h in sorted(serie.items()):
+                    acumulado = 0
+                    for limite, n in zip(h.faixas, h.contagens):
+                        acumulado += n
+                        le = 'le="%s"' % limite
+                        linhas.append(f"{nome}_bucket{_rotulos(rotulos, le)} {acumulado}")
+                    le = 'le="+Inf"'
+                    linhas.append(f"{nome}_bucket{_rotulos(rotulos, le)} {h.total}")
+                    linhas.append(f"{nome}_sum{_rotulos(rotulos)} {h.soma!r}")
+                    linhas.append(f"{nome}_count{_rotulos(rotulos)} {h.total}")
+            for nome, serie in self._contadores.items():
+                series[nome] = (self._ajuda.get(nome, nome), dict(serie))
+
+        for nome, (ajuda, serie) in sorted(series.items()):
+            linhas.append(f"# HELP {nome} {ajuda}")
+            linhas.append(f"# TYPE {nome} counter")
+            for rotulos, valor in sorted(serie.items()):
+                linhas.append(f"{nome}{_rotulos(rotulos)} {_numero(valor)}")
+
+        for nome, (ajuda, valor) in sorted((medidores or {}).items()):
+            linhas.append(f"# HELP {nome} {ajuda}")
+            linhas.append(f"# TYPE {nome} gauge")
+            if isinstance(valor, dict):
+                for rotulos, v in sorted(valor.items()):
+                    linhas.append(f"{nome}{_rotulos(rotulos)} {_numero(v)}")
+            else:
+                linhas.append(f"{nome} {_numero(valor)}")
+        return "\n".join(linhas) + "\n"
+
+
+registro = Registro()
+registro.descrever("smvbr_http_requisicao_segundos", "Latência das requisições HTTP por rota")
+registro.descrever("smvbr_etapa_segundos", "Tempo de cada etapa de /carros e /filtro-carros")
+registro.descrever("smvbr_busca_fuzzy_total", "Buscas de /carros que caíram no fuzzy (sugestao ou sem_resultado)")
+
+
+@contextmanager
+def etapa(rota: str, nome: str):
+    """Mede o bloco como a etapa ``nome`` da rota ``rota``."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        registro.observar("smvbr_etapa_segundos", time.perf_counter() - inicio, rota=rota, etapa=nome)
@@ -1,6 +1,6 @@
 from sqlalchemy import (
     Column, Integer, String, Boolean, Enum, DECIMAL, ForeignKey,
-    TIMESTAMP, func, UniqueConstraint, JSON
+    TIMESTAMP, func, UniqueConstraint, JSON, Index, Float, LargeBinary
 )
 from sqlalchemy.orm import relationship
 from .database import Base
@@ -16,6 +16,8 @@ class Usuario(Base):
     email = Column(String(150), unique=True, nullable=False, index=True)
     senha = Column(String(255), nullable=False)
     data_cadastro = Column(TIMESTAMP, server_default=func.now())
+    # muda a cada favoritar/desfavoritar (ETag de /veiculos_favoritos)
+    favoritos_versao = Column(Integer)
 
     # relacionamentos
     pesquisas = relationship("Pesquisa", back_populates="usuario")
@@ -55,7 +57,11 @@ class Veiculo(Base):
     direcao_assistida = Column(Enum('H', 'E', 'H-E', 'M'), nullable=False)
     scoreFinal = Column(DECIMAL(10, 6), nullable=False)  
     imagem_url= Column(String(255),nullable=False)
-    
+
+    __table_args__ = (
+        # codigo identifica o carro na planilha (chave do upsert da carga em lote)
+        Index("uq_veiculos_codigo", "codigo", unique=True),
+    )
 
     # relacionamentos
     emissoes = relationship("Emissao", back_populates="veiculo")
@@ -65,6 +71,64 @@ class Veiculo(Base):
 
 
 
+# -------------------------------------------------------
+# TABELA: catalogo_linhas
+# Linhas da planilha como a API as responde (modo CATALOGO_MODO=sql).
+# Texto comparado byte a byte no MySQL: a collation padrão (_ai_ci) juntaria
+# 'médio' e 'medio', e o modo memória diferencia.
+# -------------------------------------------------------
+TextoExato = String(255).with_variant(String(255, collation="utf8mb4_bin"), "mysql")
+
+
+class LinhaCatalogo(Base):
+    __tablename__ = "catalogo_linhas"
+
+    posicao = Column(Integer, primary_key=True, autoincrement=False)  # linha da planilha
+    posicao_ranking = Column(Integer, nullable=False)  # ordem de /filtro-carros
+    codigo = Column(TextoExato)
+
+    # busca de /carros (texto maiúsculo, como em _preparar_busca)
+    marca = Column(TextoExato)
+    modelo = Column(TextoExato)
+    ano = Column(TextoExato)
+
+    # filtros de /filtro-carros (como indices.normalizar_filtro)
+    filtro_ano = Column(Float(53))
+    filtro_grupo = Column(TextoExato)
+    filtro_marca = Column(TextoExato)
+    filtro_motor = Column(TextoExato)
+    filtro_transmissao = Column(TextoExato)
+    filtro_ar_condicionado = Column(TextoExato)
+    filtro_direcao_assistida = Column(TextoExato)
+    filtro_combustivel = Column(TextoExato)
+
+    # JSON pré-renderizado de /filtro-carros e de /carros
+    json_filtro = Column(LargeBinary, nullable=False)
+    json_busca = Column(LargeBinary, nullable=False)
+
+    __table_args__ = (
+        Index("ix_catalogo_linhas_ranking", "posicao_ranking"),
+        Index("ix_catalogo_linhas_codigo", "codigo"),
+        Index("ix_catalogo_linhas_marca", "marca"),
+        Index("ix_catalogo_linhas_modelo", "modelo"),
+        Index("ix_catalogo_linhas_ano", "ano"),
+        Index("ix_catalogo_linhas_ano_marca", "filtro_ano", "filtro_marca"),
+        Index("ix_catalogo_linhas_combustivel", "filtro_combustivel"),
+    )
+
+
+# -------------------------------------------------------
+# TABELA: versoes_dados
+# Versão dos dados gravados por fora da API (carga do catálogo, recalculo dos
+# quartis), para os caches que dependem deles (ETag de /veiculos_favoritos).
+# -------------------------------------------------------
+class VersaoDados(Base):
+    __tablename__ = "versoes_dados"
+
+    nome = Column(String(50), primary_key=True)
+    versao = Column(String(40), nullable=False)
+
+
 # -------------------------------------------------------
 # TABELA: emissoes
 # -------------------------------------------------------
@@ -117,6 +181,9 @@ class Pesquisa(Base):
     parametros = Column(JSON)
     data_pesquisa = Column(TIMESTAMP, server_default=func.now())
 
+    # janela das pesquisas populares (pesquisas.agregar)
+    __table_args__ = (Index("ix_pesquisas_data", "data_pesquisa"),)
+
     # relacionamento
     usuario = relationship("Usuario", back_populates="pesquisas")
 
@@ -132,7 +199,11 @@ class Favorito(Base):
     veiculo_id = Column(Integer, ForeignKey("veiculos.veiculo_id"), nullable=False)
     data_adicionado = Column(TIMESTAMP, server_default=func.now())
 
-    __table_args__ = (UniqueConstraint("usuario_id", "veiculo_id", name="uq_favoritos_usuario_veiculo"),)
+    __table_args__ = (
+        UniqueConstraint("usuario_id", "veiculo_id", name="uq_favoritos_usuario_veiculo"),
+        # favorito_id nunca é reutilizado (o ETag de /veiculos_favoritos depende disso)
+        {"sqlite_autoincrement": True},
+    )
 
     # relacionamentos
     usuario = relationship("Usuario", back_populates="favoritos")
@@ -153,6 +224,8 @@ class QuartilVeiculo(Base):
     quartil_co2 = Column(String(20))
     quartil_consumo_energetico = Column(String(20))
     quartil_score = Column(String(5))  # A, B, C, D
+    # hash dos dados do grupo de onde estes quartis saíram (backend/quartis.py)
+    assinatura = Column(String(40))
 
     # Relacionamento com Veiculo
     veiculo = relationship("Veiculo", back_populates="quartil")
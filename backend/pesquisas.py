@@ -0,0 +1,236 @@
+# backend/pesquisas.py
+"""
+Registro das pesquisas de /carros e /filtro-carros na tabela pesquisas
+(write-behind) e consultas populares para aquecer os caches.
+
+- registrar: o handler só coloca os parâmetros num buffer em memória
+  (put_nowait); buffer cheio descarta e conta, nunca segura a requisição;
+- uma thread grava o buffer em lote (um INSERT com executemany) a cada
+  PESQUISAS_INTERVALO segundos ou quando junta PESQUISAS_LOTE linhas. Se o
+  banco falhar (ou ainda não estiver pronto no startup), as linhas esperam
+  no buffer (até caber);
+- cada linha guarda, além dos parâmetros, a ``consulta`` já normalizada
+  (rota + parâmetros sem paginação). A cada PESQUISAS_AGREGACAO segundos a
+  mesma thread pede ao banco as PESQUISAS_TOP consultas mais frequentes das
+  últimas PESQUISAS_JANELA horas: GROUP BY na consulta, pelo índice de
+  data_pesquisa, e só o top volta para o processo. Elas são refeitas pelo
+  ``aquecedor`` registrado em main.py depois de cada agregação e sempre que o
+  catálogo muda de versão, para os caches do snapshot novo não começarem
+  frios. As consultas refeitas não entram nas métricas nem no registro.
+"""
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from sqlalchemy import func, insert, literal_column, select
+
+from backend import metricas
+from backend.modelo import Pesquisa
+
+CAPACIDADE = int(os.getenv("PESQUISAS_BUFFER", "10000"))
+TAMANHO_LOTE = int(os.getenv("PESQUISAS_LOTE", "500"))
+INTERVALO = float(os.getenv("PESQUISAS_INTERVALO", "2"))
+INTERVALO_AGREGACAO = float(os.getenv("PESQUISAS_AGREGACAO", "300"))
+JANELA_HORAS = float(os.getenv("PESQUISAS_JANELA", "24"))
+TOP = int(os.getenv("PESQUISAS_TOP", "20"))
+
+# Não mudam o resultado da consulta, só a página: ficam fora da chave de agregação
+CAMPOS_PAGINACAO = {"pagina", "limite", "cursor", "formato"}
+
+
+def consulta(parametros: dict) -> dict:
+    """Parâmetros da consulta normalizados (sem paginação, chaves em ordem), usados para agrupar."""
+    normalizados = {}
+    for nome, valor in sorted(parametros.items()):
+        if nome in CAMPOS_PAGINACAO or valor is None:
+            continue
+        if isinstance(valor, str):
+            valor = " ".join(valor.split()).lower()
+            if not valor:
+                continue
+        normalizados[nome] = valor
+    return normalizados
+
+
+class RegistroPesquisas:
+    def __init__(self, engine=None, capacidade: int = CAPACIDADE):
+        self._engine = engine
+        self.buffer = queue.Queue(maxsize=capacidade)
+        self._thread: Optional[threading.Thread] = None
+        self._parar = threading.Event()
+        self._cheio = threading.Event()
+        self._lock = threading.Lock()
+        self._refazendo = threading.local()
+        self.contadores = {
+            "registradas": 0, "gravadas": 0, "descartadas": 0, "lotes": 0, "falhas": 0,
+            "aquecimentos": 0, "falhas_aquecimento": 0,
+        }
+        self.populares = []  # [{"rota", "parametros", "total"}], mais frequente primeiro
+        self.aquecedor: Optional[Callable[[str, dict], None]] = None
+        self.versao_catalogo: Optional[Callable[[], Optional[str]]] = None
+        self.banco_pronto: Callable[[], bool] = lambda: True  # main.py liga à prontidão do startup
+        self._versao_aquecida = None
+        self._proxima_agregacao = 0.0
+
+    def _contar(self, nome: str, n: int = 1):
+        with self._lock:
+            self.contadores[nome] += n
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            from backend.database import engine
+            self._engine = engine
+        return self._engine
+
+    def configurar_aquecimento(self, aquecedor: Callable[[str, dict], None], versao_catalogo: Callable[[], Optional[str]]):
+        """``aquecedor(rota, parametros)`` refaz uma consulta; ``versao_catalogo()`` diz quando refazer todas."""
+        self.aquecedor = aquecedor
+        self.versao_catalogo = versao_catalogo
+
+    # ---------- produtor (handlers) ----------
+    def registrar(self, rota: str, parametros: dict, usuario_id: Optional[int] = None):
+        if getattr(self._refazendo, "ativo", False):
+            return  # consulta refeita pelo aquecimento, não é pesquisa de usuário
+        linha = {
+            "usuario_id": usuario_id,
+            "parametros": {
+                "rota": rota,
+                **{k: v for k, v in parametros.items() if v is not None},
+                "consulta": {"rota": rota, **consulta(parametros)},  # chave do GROUP BY de agregar()
+            },
+            "data_pesquisa": datetime.now(),
+        }
+        try:
+            self.buffer.put_nowait(linha)
+        except queue.Full:
+            self._contar("descartadas")
+            return
+        self._contar("registradas")
+        if self.buffer.qsize() >= TAMANHO_LOTE:
+            self._cheio.set()
+
+    def metricas(self) -> dict:
+        return {
+            "buffer": self.buffer.qsize(),
+            "capacidade": self.buffer.maxsize,
+            "populares": len(self.populares),
+            **self.contadores,
+        }
+
+    # ---------- consumidor ----------
+    def iniciar(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._loop, name="registro-pesquisas", daemon=True)
+        self._thread.start()
+
+    def parar(self, timeout: float = 10.0):
+        """Para a thread depois de gravar o que está no buffer."""
+        self._parar.set()
+        self._cheio.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _loop(self):
+        while not self._parar.is_set():
+            self._cheio.wait(INTERVALO)
+            self._cheio.clear()
+            if not self.banco_pronto():
+                continue  # tabelas ainda sendo criadas: as linhas esperam no buffer
+            self.gravar()
+            if time.monotonic() >= self._proxima_agregacao:
+                self._proxima_agregacao = time.monotonic() + INTERVALO_AGREGACAO
+                try:
+                    self.agregar()
+                except Exception as e:
+                    # banco ainda subindo: tenta de novo antes do próximo ciclo completo
+                    self._proxima_agregacao = time.monotonic() + min(30.0, INTERVALO_AGREGACAO)
+                    print(f"⚠️ Falha ao agregar pesquisas populares: {e}")
+                    continue
+                self.aquecer()
+            elif self.versao_catalogo is not None and self.versao_catalogo() != self._versao_aquecida:
+                self.aquecer()
+        self.gravar()
+
+    def gravar(self) -> int:
+        """Grava o buffer no banco, em lotes de TAMANHO_LOTE. Retorna quantas linhas gravou."""
+        total = 0
+        while True:
+            lote = []
+            while len(lote) < TAMANHO_LOTE:
+                try:
+                    lote.append(self.buffer.get_nowait())
+                except queue.Empty:
+                    break
+            if not lote:
+                return total
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(insert(Pesquisa), lote)
+            except Exception as e:
+                self._contar("falhas")
+                print(f"⚠️ Falha ao gravar {len(lote)} pesquisas (ficam no buffer): {e}")
+                for linha in lote:
+                    try:
+                        self.buffer.put_nowait(linha)
+                    except queue.Full:
+                        self._contar("descartadas")
+                return total
+            total += len(lote)
+            self._contar("gravadas", len(lote))
+            self._contar("lotes")
+
+    def agregar(self, janela_horas: float = JANELA_HORAS, top: int = TOP) -> list:
+        """Consultas mais frequentes da janela, agrupadas no banco (empate: a que apareceu primeiro)."""
+        desde = datetime.now() - timedelta(hours=janela_horas)
+        # caminho literal: SELECT e GROUP BY com o mesmo texto (ONLY_FULL_GROUP_BY do MySQL)
+        chave = func.json_extract(Pesquisa.parametros, literal_column("'$.consulta'"))
+        total = func.count()
+        stmt = (
+            select(chave, total)
+            .where(Pesquisa.data_pesquisa >= desde, chave.is_not(None))
+            .group_by(chave)
+            .order_by(total.desc(), func.min(Pesquisa.pesquisa_id))
+            .limit(top)
+        )
+        with self.engine.connect() as conn:
+            rows = conn.execute(stmt).all()
+
+        populares = []
+        for valor, n in rows:
+            parametros = json.loads(valor) if isinstance(valor, str) else dict(valor)
+            populares.append({"rota": parametros.pop("rota"), "parametros": parametros, "total": n})
+        self.populares = populares
+        return populares
+
+    def aquecer(self):
+        """Refaz as consultas populares no catálogo atual (via ``aquecedor``), fora das métricas."""
+        versao = self.versao_catalogo() if self.versao_catalogo is not None else None
+        if self.aquecedor is None or versao is None:
+            return  # catálogo ainda não carregado: aquece quando a versão aparecer
+        self._refazendo.ativo = True
+        try:
+            self._refazer_populares()
+        finally:
+            self._refazendo.ativo = False
+        self._versao_aquecida = versao
+        self._contar("aquecimentos")
+
+    def _refazer_populares(self):
+        with metricas.registro.pausar():
+            for item in self.populares:
+                try:
+                    self.aquecedor(item["rota"], item["parametros"])
+                except Exception as e:
+                    # uma consulta que falha não impede as outras, mas aparece no log e em /metrics
+                    self._contar("falhas_aquecimento")
+                    print(f"⚠️ Falha ao refazer a pesquisa popular {item['rota']} {item['parametros']}: {e!r}")
+
+
+registro = RegistroPesquisas()
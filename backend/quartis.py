@@ -0,0 +1,339 @@
+# backend/quartis.py
+"""
+Recalcula os quartis ("Intervalo 1".."Intervalo 4"), as pontuações e a nota
+(A-D) do catálogo com NumPy, sem depender das colunas já calculadas na
+planilha.
+
+Regras (as da planilha):
+- cada métrica (NMHC, CO, NOx, CO2, consumo energético) é dividida em quartis
+  dentro do grupo (padrão: ano); menor valor = Intervalo 1, e o valor igual
+  ao limite fica no intervalo de baixo (quantil linear, como QUARTIL do Excel);
+- cada intervalo vale uma pontuação que depende do ano e da métrica; essa
+  tabela é aprendida das linhas da própria planilha;
+- pontuacao_final = pontuações de grupo, motor e transmissão (da planilha)
+  + pontuações dos quartis;
+- a nota é o quartil da pontuação final no grupo (maior = A).
+
+O resultado vai só para quartis_veiculo: as respostas da API (/carros,
+/filtro-carros, /favoritar, /comparar) e veiculos.scoreFinal continuam com
+os valores publicados na planilha. A carga do catálogo e o /favoritar gravam
+em quartis_veiculo o mesmo ``para_banco`` deste módulo. O agrupamento vem de
+QUARTIS_AGRUPAMENTO, o mesmo para a carga, o /favoritar e este comando.
+
+Modo incremental: cada linha de quartis_veiculo guarda a assinatura (hash)
+dos dados do grupo de onde saiu. Este comando só regrava os veículos cuja
+assinatura no banco é diferente da atual; como a carga e o /favoritar gravam
+a mesma assinatura, o que eles já gravaram não é refeito.
+
+Uso:
+    python -m backend.quartis                          # incremental
+    QUARTIS_AGRUPAMENTO=categoria_ano python -m backend.quartis --completo
+    python -m backend.quartis --url sqlite:///smvbr.db --sem-banco
+"""
+import argparse
+import hashlib
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, select
+
+from backend import cache_colunar
+from backend.modelo import QuartilVeiculo, Veiculo
+
+# métrica -> (coluna do valor, coluna do quartil, coluna da pontuação)
+METRICAS = {
+    "nmhc": ("emissao_de_nmhc_g/km", "quartil_do_nmhc", "pontuacao_quartil_nmhc"),
+    "co": ("emissao_de_co_g/km", "quartil_do_co", "pontuacao_quartil_co"),
+    "nox": ("emissao_de_nox_g/km", "quartil_do_nox", "pontuacao_quartil_nox"),
+    "co2": ("emissao_de_co2_g/km", "quartil_do_co2", "pontuacao_quartil_co2"),
+    "consumo_energetico": ("consumo_energetico_mj/km", "quartil_do_consumo_energetico", "pontuacao_consumo_energetico"),
+}
+OUTRAS_PONTUACOES = ["pontuacao_grupo", "pontuacao_motor", "pontuacao_transmissao"]
+AGRUPAMENTOS = {"global": [], "ano": ["ano"], "categoria_ano": ["categoria", "ano"]}
+AGRUPAMENTO = os.getenv("QUARTIS_AGRUPAMENTO", "ano")
+
+ROTULOS = np.array([None, "Intervalo 1", "Intervalo 2", "Intervalo 3", "Intervalo 4"], dtype=object)
+NOTAS = np.array(["D", "C", "B", "A"], dtype=object)
+PONTOS_QUARTIS = (0.25, 0.5, 0.75)
+TAMANHO_LOTE = 1000
+
+
+def _numeros(serie: pd.Series) -> np.ndarray:
+    return pd.to_numeric(serie, errors="coerce").to_numpy(dtype=np.float64)
+
+
+def aplicavel(df: pd.DataFrame) -> bool:
+    """True se ``df`` (visão normalizada) tem as colunas que o recalculo usa."""
+    colunas = ["codigo", "ano"] + [c for trio in METRICAS.values() for c in trio] + AGRUPAMENTOS[AGRUPAMENTO]
+    return all(c in df.columns for c in colunas)
+
+
+def linhas_validas(df: pd.DataFrame) -> np.ndarray:
+    """Máscara das linhas que etl_catalogo.linha_valida aceita (com código, ano e marca)."""
+    return (df["codigo"].notna() & df["ano"].notna() & df["marca"].notna()).to_numpy()
+
+
+def _codigos_grupo(df: pd.DataFrame, agrupamento: str) -> tuple:
+    """(código inteiro do grupo de cada linha, chaves dos grupos)."""
+    colunas = AGRUPAMENTOS[agrupamento]
+    if not colunas:
+        return np.zeros(len(df), dtype=np.int64), ["todos"]
+    if df.empty:
+        return np.zeros(0, dtype=np.int64), []
+    chaves = df[colunas].astype(str).agg("|".join, axis=1)
+    codigos, unicos = pd.factorize(chaves)
+    return codigos.astype(np.int64), list(unicos)
+
+
+# -------------------------
+# Quartis vetorizados (todos os grupos de uma vez)
+# -------------------------
+def limites_por_grupo(valores: np.ndarray, grupos: np.ndarray, n_grupos: int) -> np.ndarray:
+    """Quartis (Q1, Q2, Q3) de cada grupo, interpolação linear; NaN em grupos sem valores."""
+    ok = ~np.isnan(valores)
+    g, v = grupos[ok], valores[ok]
+    ordem = np.lexsort((v, g))
+    g, v = g[ordem], v[ordem]
+
+    n = np.bincount(g, minlength=n_grupos)
+    inicio = np.concatenate(([0], np.cumsum(n)[:-1]))
+    limites = np.full((n_grupos, len(PONTOS_QUARTIS)), np.nan)
+    tem = n > 0
+    for j, p in enumerate(PONTOS_QUARTIS):
+        pos = p * (n[tem] - 1)
+        baixo = np.floor(pos).astype(np.int64)
+        alto = np.minimum(baixo + 1, n[tem] - 1)
+        fracao = pos - baixo
+        v_baixo = v[inicio[tem] + baixo]
+        v_alto = v[inicio[tem] + alto]
+        limites[tem, j] = v_baixo + (v_alto - v_baixo) * fracao
+    return limites
+
+
+def faixas(valores: np.ndarray, grupos: np.ndarray, n_grupos: int) -> np.ndarray:
+    """Intervalo 1..4 de cada valor dentro do seu grupo (0 = sem valor)."""
+    limites = limites_por_grupo(valores, grupos, n_grupos)[grupos]
+    faixa = 1 + (valores[:, None] > limites).sum(axis=1)
+    return np.where(np.isnan(valores), 0, faixa)
+
+
+# -------------------------
+# Tabela de pontuação por (ano, métrica, intervalo)
+# -------------------------
+def tabela_pontos(df: pd.DataFrame) -> dict:
+    """
+    {metrica: {ano: array[5]}} com a pontuação de cada intervalo (posição 0 =
+    sem valor), tirada das linhas da planilha que já têm quartil e pontuação.
+    """
+    anos = _numeros(df["ano"])
+    tabela = {}
+    for metrica, (_, col_quartil, col_pontos) in METRICAS.items():
+        faixa = pd.to_numeric(df[col_quartil].astype(str).str.extract(r"(\d)$")[0], errors="coerce")
+        pontos = pd.DataFrame({"ano": anos, "faixa": faixa, "pontos": _numeros(df[col_pontos])}).dropna()
+        moda = pontos.groupby(["ano", "faixa"])["pontos"].agg(lambda s: s.mode().iloc[0])
+        tabela[metrica] = {}
+        for (ano, f), valor in moda.items():
+            tabela[metrica].setdefault(ano, np.zeros(len(ROTULOS)))[int(f)] = valor
+    return tabela
+
+
+def _pontos(tabela_metrica: dict, anos: np.ndarray, faixa: np.ndarray) -> np.ndarray:
+    """Pontuação de cada linha; anos sem tabela usam a do ano conhecido mais recente."""
+    conhecidos = np.array(sorted(tabela_metrica))
+    if not len(conhecidos):
+        return np.zeros(len(anos))
+    matriz = np.stack([tabela_metrica[a] for a in conhecidos])  # anos x 5
+    idx = np.searchsorted(conhecidos, anos)
+    exato = (idx < len(conhecidos)) & (conhecidos[np.minimum(idx, len(conhecidos) - 1)] == anos)
+    idx = np.where(exato, idx, len(conhecidos) - 1)
+    return matriz[idx, faixa]
+
+
+# -------------------------
+# Recalculo
+# -------------------------
+def recalcular(df: pd.DataFrame, agrupamento: str = AGRUPAMENTO, tabela: dict = None) -> pd.DataFrame:
+    """
+    Quartis, pontuações, pontuação final e nota de cada linha de ``df``
+    (visão normalizada da planilha, como df_favoritos).
+    """
+    grupos, chaves = _codigos_grupo(df, agrupamento)
+    tabela = tabela if tabela is not None else tabela_pontos(df)
+    anos = _numeros(df["ano"])
+
+    resultado = {"codigo": df["codigo"].astype(str).str.strip().to_numpy()}
+    total = np.zeros(len(df))
+    for col in OUTRAS_PONTUACOES:
+        if col in df.columns:
+            total += np.nan_to_num(_numeros(df[col]))
+
+    for metrica, (col_valor, col_quartil, col_pontos) in METRICAS.items():
+        faixa = faixas(_numeros(df[col_valor]), grupos, len(chaves))
+        pontos = _pontos(tabela[metrica], anos, faixa)
+        resultado[col_quartil] = ROTULOS[faixa]
+        resultado[col_pontos] = pontos
+        total += pontos
+
+    # nota: quartil da pontuação final no grupo, maior = A
+    nota = faixas(total, grupos, len(chaves)) - 1
+    resultado["pontuacao_final"] = total
+    resultado["quartil_do_score"] = NOTAS[nota]
+    return pd.DataFrame(resultado, index=df.index)
+
+
+def concordancia(df: pd.DataFrame, resultado: pd.DataFrame) -> dict:
+    """Fração das linhas em que o recalculo bate com o que está na planilha."""
+    colunas = [c for _, c, _ in METRICAS.values()] + ["quartil_do_score"]
+    return {c: round(float((df[c].astype(str) == resultado[c].astype(str)).mean()), 4) for c in colunas if c in df.columns}
+
+
+# -------------------------
+# Incremental
+# -------------------------
+def _digest_tabela(tabela: dict) -> bytes:
+    itens = sorted((m, float(a), v.tolist()) for m, por_ano in tabela.items() for a, v in por_ano.items())
+    return hashlib.sha1(repr(itens).encode()).digest()
+
+
+def assinaturas(df: pd.DataFrame, agrupamento: str = AGRUPAMENTO, tabela: dict = None) -> np.ndarray:
+    """
+    Assinatura (hash) do grupo de cada linha: dados de entrada do grupo,
+    agrupamento e tabela de pontos. Muda quando qualquer coisa que entra no
+    resultado do grupo muda.
+    """
+    tabela = tabela if tabela is not None else tabela_pontos(df)
+    grupos, chaves = _codigos_grupo(df, agrupamento)
+    entrada = ["codigo", "ano"] + [v for v, _, _ in METRICAS.values()] + [c for c in OUTRAS_PONTUACOES if c in df.columns]
+    linhas = pd.util.hash_pandas_object(df[entrada].astype(str), index=False).to_numpy()
+    comum = agrupamento.encode() + _digest_tabela(tabela)
+    por_grupo = np.array(
+        [hashlib.sha1(comum + np.sort(linhas[grupos == i]).tobytes()).hexdigest() for i in range(len(chaves))],
+        dtype=object,
+    )
+    return por_grupo[grupos] if len(chaves) else np.empty(0, dtype=object)
+
+
+# -------------------------
+# Banco
+# -------------------------
+COLUNAS_QUARTIL = {
+    "quartil_nmhc": "quartil_do_nmhc",
+    "quartil_co": "quartil_do_co",
+    "quartil_nox": "quartil_do_nox",
+    "quartil_co2": "quartil_do_co2",
+    "quartil_consumo_energetico": "quartil_do_consumo_energetico",
+    "quartil_score": "quartil_do_score",
+}
+
+
+def para_banco(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Colunas de quartis_veiculo de cada linha de ``df`` (visão normalizada):
+    os quartis recalculados e ``assinatura_quartis``. Linhas que o recalculo
+    não cobre (inválidas, ou planilha sem as colunas) ficam com os quartis da
+    planilha e sem assinatura.
+    """
+    colunas = list(COLUNAS_QUARTIL.values())
+    banco = pd.DataFrame({c: df[c].astype(object) if c in df.columns else None for c in colunas}, index=df.index)
+    banco["assinatura_quartis"] = None
+    if not aplicavel(df):
+        return banco
+
+    validas = linhas_validas(df)
+    tabela = tabela_pontos(df[validas])
+    resultado = recalcular(df[validas], tabela=tabela)
+    banco.loc[validas, colunas] = resultado[colunas].to_numpy()
+    banco.loc[validas, "assinatura_quartis"] = assinaturas(df[validas], tabela=tabela)
+    return banco
+
+
+def gravar(engine, resultado: pd.DataFrame, assinatura: np.ndarray, completo: bool = False,
+           tamanho_lote: int = TAMANHO_LOTE) -> tuple:
+    """
+    Atualiza quartis_veiculo (com a assinatura) dos veículos já cadastrados
+    cuja assinatura no banco é outra (todos, se ``completo``). Retorna
+    ``(veículos regravados, grupos regravados)``.
+    """
+    from backend.etl_catalogo import marcar_versao, upsert  # etl_catalogo -> catalogo -> quartis
+
+    with engine.begin() as conn:
+        atuais = {
+            str(codigo): (veiculo_id, gravada)
+            for codigo, veiculo_id, gravada in conn.execute(
+                select(Veiculo.codigo, Veiculo.veiculo_id, QuartilVeiculo.assinatura)
+                .outerjoin(QuartilVeiculo, QuartilVeiculo.veiculo_id == Veiculo.veiculo_id)
+            )
+        }
+
+        quartis, grupos = [], set()
+        for linha, nova in zip(resultado.to_dict(orient="records"), assinatura):
+            atual = atuais.get(linha["codigo"])
+            if atual is None or (atual[1] == nova and not completo):
+                continue  # veículo ainda não está no banco, ou o grupo dele não mudou
+            veiculo_id = atual[0]
+            quartis.append({"veiculo_id": veiculo_id, **{c: linha[o] for c, o in COLUNAS_QUARTIL.items()}, "assinatura": nova})
+            grupos.add(nova)
+
+        for i in range(0, len(quartis), tamanho_lote):
+            upsert(conn, QuartilVeiculo.__table__, quartis[i:i + tamanho_lote], ["veiculo_id"])
+        if quartis:
+            marcar_versao(conn)
+    return len(quartis), len(grupos)
+
+
+def executar(engine=None, caminho: str = None, completo: bool = False) -> dict:
+    """Recalcula o catálogo e, com ``engine``, regrava os veículos dos grupos que mudaram."""
+    from backend import catalogo, etl_catalogo  # os dois importam este módulo
+
+    inicio = time.perf_counter()
+    caminho = caminho or catalogo.CAMINHO_PLANILHA
+    df = catalogo.preparar_favoritos(cache_colunar.ler_planilha(caminho, catalogo.hash_arquivo(caminho)))
+    df = df[linhas_validas(df)]
+
+    tabela = tabela_pontos(df)
+    resultado = recalcular(df, AGRUPAMENTO, tabela)
+    assinatura = assinaturas(df, AGRUPAMENTO, tabela)
+
+    alterados = grupos_regravados = 0
+    if engine is not None:
+        etl_catalogo.garantir_colunas(engine)
+        alterados, grupos_regravados = gravar(engine, resultado, assinatura, completo)
+
+    return {
+        "grupos": len(set(assinatura)),
+        "grupos_regravados": grupos_regravados,
+        "linhas_recalculadas": len(resultado),
+        "veiculos_alterados": alterados,
+        "concordancia_planilha": concordancia(df, resultado) if len(resultado) else {},
+        "segundos": round(time.perf_counter() - inicio, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recalcula quartis e pontuações do catálogo")
+    parser.add_argument("--url", help="URL do banco (padrão: a de backend/database.py)")
+    parser.add_argument("--planilha", help="padrão: a planilha do catálogo (catalogo.CAMINHO_PLANILHA)")
+    parser.add_argument("--completo", action="store_true", help="regrava todos os veículos")
+    parser.add_argument("--sem-banco", action="store_true", help="só recalcula e mostra o relatório")
+    args = parser.parse_args()
+
+    engine = None
+    if not args.sem_banco:
+        if args.url:
+            engine = create_engine(args.url)
+        else:
+            from backend.database import engine
+
+    stats = executar(engine, args.planilha, args.completo)
+    print(
+        f"{stats['linhas_recalculadas']} linhas recalculadas ({stats['grupos']} grupos, agrupamento {AGRUPAMENTO}) "
+        f"em {stats['segundos']}s; {stats['veiculos_alterados']} veículos de {stats['grupos_regravados']} grupos "
+        f"regravados no banco"
+    )
+    for coluna, fracao in stats["concordancia_planilha"].items():
+        print(f"  {coluna}: {fracao:.1%} igual à planilha")
+
+if __name__ == "__main__":
+    main()
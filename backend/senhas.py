@@ -0,0 +1,298 @@
+# backend/senhas.py
+"""
+Hash de senhas (/cadastro, /login, /usuario/senha, /usuario/nome e
+/recuperar-senha) num pool de processos limitado.
+
+O KDF é caro de propósito; rodando dentro dos handlers ele seguraria as
+threads do servidor nos horários de pico de login. Aqui cada hash/verificação
+vai para um ProcessPoolExecutor e o handler só espera o resultado (await).
+Quando já há SENHA_FILA_MAX operações em andamento, a próxima é recusada com
+FilaCheia (o endpoint responde 503) em vez de acumular.
+
+Algoritmo (SENHA_ALGORITMO): argon2 (argon2-cffi) ou bcrypt, se instalados;
+senão scrypt do hashlib (ou pbkdf2-sha256, se o OpenSSL não tiver scrypt).
+SENHA_CUSTO ajusta o custo: tempo do argon2, rounds do bcrypt, log2(N) do
+scrypt ou iterações do pbkdf2. O hash guardado diz algoritmo e custo, então
+mudar a configuração não invalida senhas antigas.
+
+Migração: linhas antigas têm a senha em texto puro. No login a comparação é
+feita em tempo constante e, se bater, a senha é regravada com hash; hashes
+com algoritmo/custo diferentes do atual também são refeitos no login. Um
+valor com prefixo de hash que não é um hash válido (senha antiga que por acaso
+começa com "$2b$", "$argon2"...) também é conferido como texto puro. Um hash
+cujo algoritmo não está instalado neste servidor não confere (credenciais
+inválidas, com aviso no log), em vez de derrubar o /login.
+"""
+import asyncio
+import base64
+import hashlib
+import hmac
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Tuple
+
+from backend import metricas
+
+try:
+    import argon2
+except ImportError:  # opcional
+    argon2 = None
+
+try:
+    import bcrypt
+except ImportError:  # opcional
+    bcrypt = None
+
+
+def _algoritmo_padrao() -> str:
+    if argon2 is not None:
+        return "argon2"
+    if bcrypt is not None:
+        return "bcrypt"
+    return "scrypt" if hasattr(hashlib, "scrypt") else "pbkdf2"
+
+
+ALGORITMO = os.getenv("SENHA_ALGORITMO") or _algoritmo_padrao()
+CUSTO_PADRAO = {"argon2": 3, "bcrypt": 12, "scrypt": 15, "pbkdf2": 600000}
+CUSTO = int(os.getenv("SENHA_CUSTO", "0")) or CUSTO_PADRAO[ALGORITMO]
+ARGON2_MEMORIA_KIB = int(os.getenv("SENHA_ARGON2_MEMORIA_KIB", "65536"))
+PROCESSOS = int(os.getenv("SENHA_PROCESSOS", "0")) or min(4, os.cpu_count() or 1)
+FILA_MAX = int(os.getenv("SENHA_FILA_MAX", "64"))
+
+PREFIXOS = {"$argon2": "argon2", "$2a$": "bcrypt", "$2b$": "bcrypt", "$2y$": "bcrypt",
+            "$scrypt$": "scrypt", "$pbkdf2-sha256$": "pbkdf2"}
+
+
+class FilaCheia(Exception):
+    pass
+
+
+# -------------------------
+# KDFs (rodam nos processos do pool)
+# -------------------------
+def _b64(dados: bytes) -> str:
+    return base64.b64encode(dados).decode("ascii")
+
+
+def algoritmo_do_hash(armazenado: str) -> Optional[str]:
+    """Algoritmo de um hash guardado; None para senha antiga em texto puro."""
+    for prefixo, algoritmo in PREFIXOS.items():
+        if armazenado.startswith(prefixo):
+            return algoritmo
+    return None
+
+
+def _hasher_argon2(custo: int):
+    return argon2.PasswordHasher(time_cost=custo, memory_cost=ARGON2_MEMORIA_KIB, parallelism=1)
+
+
+def _scrypt(senha: str, sal: bytes, ln: int, r: int = 8, p: int = 1) -> bytes:
+    n = 1 << ln
+    return hashlib.scrypt(senha.encode("utf-8"), salt=sal, n=n, r=r, p=p, maxmem=256 * r * n, dklen=32)
+
+
+def gerar_hash(senha: str, algoritmo: str = ALGORITMO, custo: int = CUSTO) -> str:
+    if algoritmo == "argon2":
+        return _hasher_argon2(custo).hash(senha)
+    if algoritmo == "bcrypt":
+        # bcrypt só considera os primeiros 72 bytes
+        return bcrypt.hashpw(senha.encode("utf-8")[:72], bcrypt.gensalt(rounds=custo)).decode("ascii")
+    sal = os.urandom(16)
+    if algoritmo == "scrypt":
+        return f"$scrypt$ln={custo},r=8,p=1${_b64(sal)}${_b64(_scrypt(senha, sal, custo))}"
+    if algoritmo == "pbkdf2":
+        chave = hashlib.pbkdf2_hmac("sha256", senha.encode("utf-8"), sal, custo)
+        return f"$pbkdf2-sha256${custo}${_b64(sal)}${_b64(chave)}"
+    raise ValueError(f"Algoritmo de senha desconhecido: {algoritmo}")
+
+
+def _disponivel(algoritmo: str) -> bool:
+    return {"argon2": argon2, "bcrypt": bcrypt}.get(algoritmo, hashlib) is not None
+
+
+def _conferir_hash(senha: str, armazenado: str, algoritmo: str) -> bool:
+    """Confere contra um hash; ValueError/KeyError quando ``armazenado`` não é um hash válido."""
+    if algoritmo == "argon2":
+        try:
+            return argon2.PasswordHasher().verify(armazenado, senha)
+        except argon2.exceptions.VerificationError:
+            return False
+    if algoritmo == "bcrypt":
+        return bcrypt.checkpw(senha.encode("utf-8")[:72], armazenado.encode("ascii"))
+
+    _, _, parametros, sal, esperado = armazenado.split("$")
+    sal, esperado = base64.b64decode(sal), base64.b64decode(esperado)
+    if algoritmo == "scrypt":
+        p = dict(item.split("=") for item in parametros.split(","))
+        calculado = _scrypt(senha, sal, int(p["ln"]), int(p["r"]), int(p["p"]))
+    else:
+        calculado = hashlib.pbkdf2_hmac("sha256", senha.encode("utf-8"), sal, int(parametros))
+    return hmac.compare_digest(calculado, esperado)
+
+
+def _conferir(senha: str, armazenado: str) -> Tuple[bool, bool]:
+    """``(confere?, comparado como texto puro?)``."""
+    algoritmo = algoritmo_do_hash(armazenado)
+    if algoritmo is not None:
+        if not _disponivel(algoritmo):
+            print(f"⚠️ Senha guardada com {algoritmo}, que não está instalado: login recusado.")
+            return False, False
+        try:
+            return _conferir_hash(senha, armazenado, algoritmo), False
+        except (ValueError, KeyError):
+            pass  # não é um hash: senha antiga em texto puro com cara de prefixo
+    return hmac.compare_digest(senha.encode("utf-8"), armazenado.encode("utf-8")), True
+
+
+def conferir(senha: str, armazenado: str) -> bool:
+    return _conferir(senha, armazenado)[0]
+
+
+def precisa_rehash(armazenado: str, algoritmo: str = ALGORITMO, custo: int = CUSTO) -> bool:
+    """True para texto puro e para hashes com algoritmo ou custo diferentes dos atuais."""
+    if algoritmo_do_hash(armazenado) != algoritmo:
+        return True
+    if algoritmo == "argon2":
+        return _hasher_argon2(custo).check_needs_rehash(armazenado)
+    if algoritmo == "bcrypt":
+        return armazenado.split("$")[2] != f"{custo:02d}"
+    if algoritmo == "scrypt":
+        return not armazenado.startswith(f"$scrypt$ln={custo},r=8,p=1$")
+    return armazenado.split("$")[2] != str(custo)
+
+
+def _tarefa_vazia():
+    return None
+
+
+def _tarefa_hash(senha: str, algoritmo: str, custo: int):
+    inicio = time.time()
+    return gerar_hash(senha, algoritmo, custo), inicio, time.time()
+
+
+def _tarefa_verificar(senha: str, armazenado: str, algoritmo: str, custo: int):
+    """Confere e, se bateu e o hash está desatualizado, já devolve o novo (um job só por login)."""
+    inicio = time.time()
+    ok, texto_puro = _conferir(senha, armazenado)
+    refazer = ok and (texto_puro or precisa_rehash(armazenado, algoritmo, custo))
+    novo = gerar_hash(senha, algoritmo, custo) if refazer else None
+    return (ok, novo), inicio, time.time()
+
+
+# -------------------------
+# Serviço (processo da API)
+# -------------------------
+class ServicoSenhas:
+    def __init__(
+        self,
+        algoritmo: str = ALGORITMO,
+        custo: int = CUSTO,
+        processos: int = PROCESSOS,
+        fila_max: int = FILA_MAX,
+    ):
+        self.algoritmo = algoritmo
+        self.custo = custo
+        self.processos = processos
+        self.fila_max = fila_max
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.em_andamento = 0
+        self.contadores = {"hashes": 0, "verificacoes": 0, "migradas": 0, "recusadas_fila_cheia": 0}
+        self.espera_total = 0.0
+        self.espera_max = 0.0
+        self.execucao_total = 0.0
+
+    def _obter_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: os processos não herdam as threads (monitor, fila de e-mail) do servidor
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.processos, mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def aquecer(self):
+        """Sobe os processos do pool sem esperar (evita o custo do spawn no primeiro login)."""
+        executor = self._obter_executor()
+        for _ in range(self.processos):
+            executor.submit(_tarefa_vazia)
+
+    def encerrar(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    async def _executar(self, operacao: str, funcao, *args):
+        with self._lock:
+            if self.em_andamento >= self.fila_max:
+                self.contadores["recusadas_fila_cheia"] += 1
+                raise FilaCheia()
+            self.em_andamento += 1
+        enviado = time.time()
+        executor = self._obter_executor()
+        try:
+            resultado, inicio, fim = await asyncio.wrap_future(executor.submit(funcao, *args))
+        except BrokenProcessPool:
+            # um processo morreu (ex.: falta de memória): a próxima chamada cria um pool novo
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            raise
+        finally:
+            with self._lock:
+                self.em_andamento -= 1
+
+        espera, execucao = max(inicio - enviado, 0.0), fim - inicio
+        with self._lock:
+            self.espera_total += espera
+            self.espera_max = max(self.espera_max, espera)
+            self.execucao_total += execucao
+        metricas.registro.observar("smvbr_senha_espera_segundos", espera, operacao=operacao)
+        metricas.registro.observar("smvbr_senha_execucao_segundos", execucao, operacao=operacao)
+        return resultado
+
+    async def gerar_hash(self, senha: str) -> str:
+        resultado = await self._executar("hash", _tarefa_hash, senha, self.algoritmo, self.custo)
+        self._contar("hashes")
+        return resultado
+
+    async def verificar(self, senha: str, armazenado: Optional[str]) -> Tuple[bool, Optional[str]]:
+        """(senha confere?, hash novo para gravar ou None)."""
+        if not armazenado:
+            return False, None
+        ok, novo = await self._executar(
+            "verificar", _tarefa_verificar, senha, armazenado, self.algoritmo, self.custo,
+        )
+        self._contar("verificacoes")
+        if novo is not None and algoritmo_do_hash(armazenado) is None:
+            self._contar("migradas")
+        return ok, novo
+
+    def _contar(self, nome: str):
+        with self._lock:
+            self.contadores[nome] += 1
+
+    def metricas(self) -> dict:
+        with self._lock:
+            operacoes = self.contadores["hashes"] + self.contadores["verificacoes"]
+            return {
+                "algoritmo": self.algoritmo,
+                "custo": self.custo,
+                "processos": self.processos,
+                "em_andamento": self.em_andamento,
+                "fila_max": self.fila_max,
+                **self.contadores,
+                "espera_media_ms": round(self.espera_total / operacoes * 1000, 3) if operacoes else 0.0,
+                "espera_max_ms": round(self.espera_max * 1000, 3),
+                "execucao_media_ms": round(self.execucao_total / operacoes * 1000, 3) if operacoes else 0.0,
+            }
+
+
+servico = ServicoSenhas()
+metricas.registro.descrever("smvbr_senha_espera_segundos", "Tempo na fila do pool de hash de senhas")
+metricas.registro.descrever("smvbr_senha_execucao_segundos", "Tempo do KDF de senha no processo do pool")
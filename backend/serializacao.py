@@ -0,0 +1,133 @@
+# backend/serializacao.py
+"""
+Conversão das linhas do catálogo para JSON.
+
+Cada snapshot do catálogo guarda o JSON (bytes) de cada linha já pronto; as
+respostas só juntam os pedaços da página pedida.
+"""
+import json
+import math
+
+from fastapi.responses import Response
+
+from backend.importacao import ModuloPreguicoso
+
+# Só as funções de pré-renderização usam; o import fica para o aquecimento do catálogo
+np = ModuloPreguicoso("numpy")
+pd = ModuloPreguicoso("pandas")
+
+try:
+    import orjson
+except ImportError:  # sem orjson usa o json da biblioteca padrão
+    orjson = None
+
+
+def dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+# -------------------------
+# Valores de uma linha da planilha
+# -------------------------
+def vazio(valor) -> bool:
+    """None ou NaN (célula vazia da planilha)."""
+    return valor is None or (isinstance(valor, float) and math.isnan(valor))
+
+
+def numero(*valores) -> float:
+    """Primeiro valor numérico não vazio/zero (como ``a or b or 0``), ignorando textos como 'ND'."""
+    for valor in valores:
+        if vazio(valor):
+            continue
+        try:
+            n = float(valor)
+        except (TypeError, ValueError):
+            continue
+        if n and not math.isnan(n):
+            return n
+    return 0.0
+
+
+# -------------------------
+# DataFrame -> registros
+# -------------------------
+def pandas_to_json_safe(df: "pd.DataFrame"):
+    """Converte um DataFrame do Pandas para lista de dicionários pronta para JSON"""
+    df = df.replace({np.nan: None, np.inf: None, -np.inf: None})
+    if "nota sobre os dados faltantes" in df.columns:
+        df = df.drop(columns=["nota sobre os dados faltantes"])
+
+    for col in df.select_dtypes(include=["datetime64[ns]", "datetime64[ns, UTC]"]).columns:
+        df[col] = df[col].apply(lambda x: x.isoformat() if x is not None else None)
+
+    return df.to_dict(orient="records")
+
+
+def adicionar_imagem(df_in):
+    col_img = None
+    for c in df_in.columns:
+        if "imagem" in c.lower() or "foto" in c.lower():
+            col_img = c
+            break
+
+    resultados = pandas_to_json_safe(df_in)
+
+    if col_img:
+        for item in resultados:
+            filename = item.get(col_img)
+            if filename:
+                item["imagem_url"] = f"/imgs/{filename}"  # URL dinâmica
+            else:
+                item["imagem_url"] = None
+    return resultados
+
+
+BLOCO_PRE_RENDER = 10000
+
+
+def pre_renderizar(df: "pd.DataFrame") -> list:
+    """JSON (bytes) de cada linha do DataFrame, na mesma ordem, já com imagem_url."""
+    # Em blocos, para não ter os dicts de todas as linhas na memória ao mesmo tempo.
+    # bytes(memoryview(...)) copia para um objeto do tamanho exato: o buffer que o
+    # orjson devolve fica com ~3x o tamanho do JSON, e aqui ele vive o snapshot inteiro.
+    jsons = []
+    for i in range(0, len(df), BLOCO_PRE_RENDER):
+        jsons.extend(bytes(memoryview(dumps(item))) for item in adicionar_imagem(df.iloc[i:i + BLOCO_PRE_RENDER]))
+    return jsons
+
+
+# -------------------------
+# Resposta montada por concatenação
+# -------------------------
+class RespostaJSON(Response):
+    """Resposta cujo corpo já vem serializado (bytes) ou é serializado com orjson."""
+
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
+
+
+def montar_json(campos: dict, chave_lista: str, linhas, linhas_json) -> bytes:
+    """
+    Monta ``{..campos, chave_lista: [linhas...]}`` sem reserializar as linhas.
+    A lista entra na posição em que ``chave_lista`` aparece em ``campos``.
+    """
+    partes = []
+    for chave, valor in campos.items():
+        if chave == chave_lista:
+            corpo = b",".join(linhas_json[i] for i in linhas)
+            partes.append(dumps(chave) + b":[" + corpo + b"]")
+        else:
+            partes.append(dumps(chave) + b":" + dumps(valor))
+    return b"{" + b",".join(partes) + b"}"
+
+
+def linhas_ndjson(linhas, linhas_json, tamanho_bloco: int = 500):
+    """Gera o NDJSON das linhas pedidas, um bloco de cada vez."""
+    for i in range(0, len(linhas), tamanho_bloco):
+        yield b"".join(linhas_json[p] + b"\n" for p in linhas[i:i + tamanho_bloco])
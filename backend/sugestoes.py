@@ -0,0 +1,62 @@
+# backend/sugestoes.py
+"""
+"Você quis dizer" da busca de /carros.
+
+O vocabulário (valores distintos de marca, modelo e ano) é montado uma vez por
+versão do catálogo. Todos os termos da busca são comparados de uma vez com
+``process.cdist`` e o resultado fica num LRU, então o mesmo erro de digitação
+repetido não volta a percorrer o vocabulário.
+
+O ``cdist`` roda na thread do request (SUGESTOES_WORKERS, padrão 1): com
+vários workers do uvicorn, espalhar cada busca por todos os núcleos só faz
+os requests disputarem CPU entre si.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from rapidfuzz import fuzz, process
+
+# Quantas consultas (lista de termos) -> sugestão ficam guardadas
+MAX_CACHE_SUGESTOES = 2048
+# Threads do process.cdist por consulta
+WORKERS = int(os.getenv("SUGESTOES_WORKERS", "1"))
+
+
+class Sugestoes:
+    def __init__(self, df: pd.DataFrame, colunas, max_cache: int = MAX_CACHE_SUGESTOES):
+        # Mesma ordem do pd.concat(...).unique() antigo: em empate vence o primeiro valor
+        self.vocabulario = pd.concat([df[c] for c in colunas]).unique().tolist()
+        self.max_cache = max_cache
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def sugerir(self, termos) -> tuple:
+        """
+        Retorna ``(sugestao, score)`` do valor do vocabulário mais parecido com
+        qualquer um dos termos (``fuzz.WRatio``). Em empate vence o termo que
+        aparece primeiro na busca.
+        """
+        chave = tuple(termos)
+        with self._lock:
+            if chave in self._cache:
+                self._cache.move_to_end(chave)
+                return self._cache[chave]
+
+        if not chave or not self.vocabulario:
+            resultado = (None, 0.0)
+        else:
+            scores = process.cdist(list(chave), self.vocabulario, scorer=fuzz.WRatio, dtype=np.float64, workers=WORKERS)
+            melhores = scores.argmax(axis=1)
+            termo = int(np.argmax(scores[np.arange(len(chave)), melhores]))
+            coluna = int(melhores[termo])
+            resultado = (self.vocabulario[coluna], float(scores[termo, coluna]))
+
+        with self._lock:
+            self._cache[chave] = resultado
+            self._cache.move_to_end(chave)
+            if len(self._cache) > self.max_cache:
+                self._cache.popitem(last=False)
+        return resultado
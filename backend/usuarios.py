@@ -0,0 +1,78 @@
+# backend/usuarios.py
+"""
+Listagem e exportação de usuários (GET /usuarios) sem carregar a tabela inteira.
+
+- página: keyset em usuario_id (usuario_id > cursor ORDER BY usuario_id LIMIT n),
+  só com as colunas da resposta, sem objetos do ORM;
+- exportação (JSON sem limite, NDJSON ou CSV): uma consulta com yield_per
+  (cursor do lado do servidor no MySQL) escrita na resposta em blocos de
+  TAMANHO_LOTE linhas, então a memória não cresce com o número de usuários.
+  Usa uma conexão própria: a sessão da requisição já foi fechada quando o
+  corpo de uma StreamingResponse começa a ser enviado.
+"""
+import csv
+import io
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from backend.database import engine
+from backend.modelo import Usuario
+from backend.serializacao import dumps
+
+TAMANHO_LOTE = 1000
+COLUNAS = (Usuario.usuario_id, Usuario.nome, Usuario.email)
+CAMPOS = [c.key for c in COLUNAS]
+
+
+def _consulta(cursor: Optional[int] = None, limite: Optional[int] = None):
+    stmt = select(*COLUNAS).order_by(Usuario.usuario_id)
+    if cursor is not None:
+        stmt = stmt.where(Usuario.usuario_id > cursor)
+    if limite is not None:
+        stmt = stmt.limit(limite)
+    return stmt
+
+
+def pagina(db: Session, limite: int, cursor: Optional[int] = None):
+    """(usuários da página, próximo cursor ou None)."""
+    linhas = db.execute(_consulta(cursor, limite + 1)).mappings().all()
+    proximo = linhas[limite - 1]["usuario_id"] if len(linhas) > limite else None
+    return [dict(l) for l in linhas[:limite]], proximo
+
+
+def _lotes(cursor: Optional[int] = None, limite: Optional[int] = None):
+    with engine.connect() as conn:
+        resultado = conn.execution_options(yield_per=TAMANHO_LOTE).execute(_consulta(cursor, limite))
+        for lote in resultado.mappings().partitions():
+            yield lote
+
+
+def exportar_json(cursor: Optional[int] = None):
+    """Array JSON (o mesmo corpo da listagem completa), escrito lote a lote."""
+    yield b"["
+    primeiro = True
+    for lote in _lotes(cursor):
+        corpo = b",".join(dumps(dict(l)) for l in lote)
+        yield corpo if primeiro else b"," + corpo
+        primeiro = False
+    yield b"]"
+
+
+def exportar_ndjson(cursor: Optional[int] = None, limite: Optional[int] = None):
+    for lote in _lotes(cursor, limite):
+        yield b"".join(dumps(dict(l)) + b"\n" for l in lote)
+
+
+def exportar_csv(cursor: Optional[int] = None, limite: Optional[int] = None):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(CAMPOS)
+    for lote in _lotes(cursor, limite):
+        escritor.writerows([l[c] for c in CAMPOS] for l in lote)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():  # tabela vazia: só o cabeçalho
+        yield buffer.getvalue().encode("utf-8")
@@ -0,0 +1,198 @@
+# backend/verificacao_email.py
+"""
+Verificação de e-mail do /cadastro na API rapid-email-verifier.
+
+- um único httpx.AsyncClient (conexões reaproveitadas entre cadastros);
+- cache com validade (TTL) do resultado por endereço;
+- cache negativo por domínio: quando a API diz que o problema é o domínio
+  (não existe, sem MX, descartável), os outros endereços dele são recusados
+  sem nova chamada até o TTL vencer;
+- disjuntor (circuit breaker): depois de algumas falhas/lentidões seguidas a
+  API deixa de ser chamada por um tempo e o cadastro segue sem verificação,
+  como já acontecia quando a chamada falhava.
+
+A URL vem de EMAIL_VERIFIER_URL, então dá para apontar para um servidor
+stub local nos testes.
+"""
+import asyncio
+import os
+import time
+from typing import Optional
+
+from backend.importacao import ModuloPreguicoso
+
+httpx = ModuloPreguicoso("httpx")  # importado no aquecimento do startup ou no primeiro uso
+
+VERIFICADOR_URL = os.getenv("EMAIL_VERIFIER_URL", "https://rapid-email-verifier.fly.dev/api/verify")
+TIMEOUT = float(os.getenv("EMAIL_VERIFIER_TIMEOUT", "2"))
+# Chamadas mais lentas que isso contam como falha para o disjuntor
+LIMIAR_LENTIDAO = float(os.getenv("EMAIL_VERIFIER_LIMIAR_LENTIDAO", "1"))
+TTL_CACHE = float(os.getenv("EMAIL_VERIFIER_TTL", "3600"))
+MAX_CACHE = 10000
+FALHAS_PARA_ABRIR = int(os.getenv("EMAIL_VERIFIER_FALHAS", "3"))
+TEMPO_ABERTO = float(os.getenv("EMAIL_VERIFIER_TEMPO_ABERTO", "30"))
+# Respostas da API que condenam o domínio inteiro, não só o endereço
+STATUS_DOMINIO_INVALIDO = {"INVALID_DOMAIN", "NO_MX_RECORDS", "DISPOSABLE"}
+
+
+class Disjuntor:
+    """Circuit breaker simples: fechado -> aberto (após N falhas) -> meio-aberto (1 tentativa)."""
+
+    def __init__(self, falhas_para_abrir: int = FALHAS_PARA_ABRIR, tempo_aberto: float = TEMPO_ABERTO):
+        self.falhas_para_abrir = falhas_para_abrir
+        self.tempo_aberto = tempo_aberto
+        self.falhas = 0
+        self.aberto_ate = 0.0
+        self._tentativa_em_andamento = False
+
+    @property
+    def estado(self) -> str:
+        if self.falhas < self.falhas_para_abrir:
+            return "fechado"
+        if time.monotonic() < self.aberto_ate:
+            return "aberto"
+        return "meio-aberto"
+
+    def permite(self) -> bool:
+        estado = self.estado
+        if estado == "fechado":
+            return True
+        if estado == "meio-aberto" and not self._tentativa_em_andamento:
+            self._tentativa_em_andamento = True
+            return True
+        return False
+
+    def sucesso(self):
+        self.falhas = 0
+        self._tentativa_em_andamento = False
+
+    def falha(self):
+        self.falhas += 1
+        self._tentativa_em_andamento = False
+        if self.falhas >= self.falhas_para_abrir:
+            self.aberto_ate = time.monotonic() + self.tempo_aberto
+
+
+class VerificadorEmail:
+    def __init__(
+        self,
+        url: str = VERIFICADOR_URL,
+        timeout: float = TIMEOUT,
+        limiar_lentidao: float = LIMIAR_LENTIDAO,
+        ttl: float = TTL_CACHE,
+        disjuntor: Optional[Disjuntor] = None,
+    ):
+        self.url = url
+        self.timeout = timeout
+        self.limiar_lentidao = limiar_lentidao
+        self.ttl = ttl
+        self.disjuntor = disjuntor or Disjuntor()
+        self._cache = {}  # email ou "@dominio" (cache negativo) -> (valido, expira_em)
+        self._client: Optional["httpx.AsyncClient"] = None
+        self._em_andamento = {}  # email -> Future (cadastros simultâneos do mesmo e-mail fazem 1 chamada)
+
+    def _obter_client(self) -> "httpx.AsyncClient":
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+            )
+        return self._client
+
+    async def fechar(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _do_cache(self, email: str):
+        item = self._cache.get(email)
+        if item and item[1] > time.monotonic():
+            return item
+        return None
+
+    def _guardar(self, email: str, valido: bool):
+        if len(self._cache) >= MAX_CACHE:
+            agora = time.monotonic()
+            self._cache = {k: v for k, v in self._cache.items() if v[1] > agora}
+            if len(self._cache) >= MAX_CACHE:
+                self._cache.clear()
+        self._cache[email] = (valido, time.monotonic() + self.ttl)
+
+    async def verificar(self, email: str) -> Optional[bool]:
+        """
+        True/False conforme a API; None quando não deu para verificar
+        (API fora, lenta, resposta inválida ou disjuntor aberto).
+        """
+        email = email.strip().lower()
+        item = self._do_cache(email) or self._do_cache(_dominio(email))
+        if item:
+            return item[0]
+
+        if email in self._em_andamento:
+            return await asyncio.shield(self._em_andamento[email])
+
+        if not self.disjuntor.permite():
+            return None
+
+        futuro = asyncio.get_running_loop().create_future()
+        self._em_andamento[email] = futuro
+        try:
+            resultado = await self._consultar(email)
+            futuro.set_result(resultado)
+            return resultado
+        finally:
+            if not futuro.done():
+                futuro.set_result(None)
+            del self._em_andamento[email]
+
+    async def _consultar(self, email: str) -> Optional[bool]:
+        inicio = time.monotonic()
+        registrado = False
+        try:
+            try:
+                response = await self._obter_client().get(self.url, params={"email": email})
+                response.raise_for_status()
+                data = response.json()
+                if not isinstance(data, dict):
+                    raise ValueError(f"resposta inesperada ({type(data).__name__})")
+            except (httpx.HTTPError, ValueError) as e:
+                self.disjuntor.falha()
+                registrado = True
+                print(f"⚠️ Falha na API de verificação para {email} ({type(e).__name__}). Cadastro continuará.")
+                return None
+
+            if time.monotonic() - inicio > self.limiar_lentidao:
+                self.disjuntor.falha()
+            else:
+                self.disjuntor.sucesso()
+            registrado = True
+
+            valido = bool(data.get("valid", True))
+            self._guardar(email, valido)
+            if not valido and _falha_de_dominio(data):
+                self._guardar(_dominio(email), False)
+            return valido
+        finally:
+            # Erro não previsto (ou cancelamento) também conta como falha: senão a
+            # tentativa do meio-aberto nunca é liberada e o disjuntor não fecha mais
+            if not registrado:
+                self.disjuntor.falha()
+
+
+def _dominio(email: str) -> str:
+    """Chave do cache negativo do domínio ("@exemplo.com"; nenhum endereço começa com "@")."""
+    return "@" + email.rpartition("@")[2]
+
+
+def _falha_de_dominio(data: dict) -> bool:
+    validacoes = data.get("validations")
+    if isinstance(validacoes, dict) and (
+        validacoes.get("domain_exists") is False
+        or validacoes.get("mx_records") is False
+        or validacoes.get("is_disposable") is True
+    ):
+        return True
+    return data.get("status") in STATUS_DOMINIO_INVALIDO
+
+
+verificador = VerificadorEmail()
@@ -0,0 +1,75 @@
+# benchmarks/busca_carros.py
+"""
+Compara a busca livre de /carros: varredura com str.contains (como era) x índice de n-gramas.
+
+O catálogo é replicado 1x, 4x e 16x (cada cópia com o ano deslocado) para
+mostrar como o custo por consulta cresce com o tamanho.
+
+Uso:
+    python -m benchmarks.busca_carros
+"""
+import time
+
+import pandas as pd
+
+from backend.catalogo import obter_catalogo
+from backend.indices import IndiceNgramas
+
+CONSULTAS = [["FIAT", "UNO"], ["GOL"], ["ONIX", "2019"], ["CIVIC"], ["HB20"], ["TOYOTA", "COROLLA", "2020"], ["SANDERO"]]
+FATORES = [1, 4, 16]
+REPETICOES = 20
+
+
+def replicar(df: pd.DataFrame, fator: int) -> pd.DataFrame:
+    copias = []
+    for i in range(fator):
+        copia = df.copy()
+        copia["ano"] = (pd.to_numeric(copia["ano"], errors="coerce") + 10 * i).astype("Int64").astype(str).str.upper()
+        copias.append(copia)
+    return pd.concat(copias, ignore_index=True)
+
+
+def busca_varredura(df: pd.DataFrame, termos) -> int:
+    df_filtrado = df
+    for termo in termos:
+        df_filtrado = df_filtrado[
+            df_filtrado["marca"].str.contains(termo, na=False) |
+            df_filtrado["modelo"].str.contains(termo, na=False) |
+            df_filtrado["ano"].str.contains(termo, na=False)
+        ]
+        if df_filtrado.empty:
+            break
+    return len(df_filtrado)
+
+
+def cronometrar(funcao) -> float:
+    """Tempo médio por consulta, em ms."""
+    inicio = time.perf_counter()
+    for _ in range(REPETICOES):
+        for termos in CONSULTAS:
+            funcao(termos)
+    return (time.perf_counter() - inicio) * 1000 / (REPETICOES * len(CONSULTAS))
+
+
+def main():
+    base = obter_catalogo().df_busca[["marca", "modelo", "ano"]]
+    print(f"{'linhas':>8} {'varredura (ms)':>15} {'índice frio (ms)':>17} {'índice (ms)':>12} {'montagem (ms)':>14}")
+    for fator in FATORES:
+        df = replicar(base, fator)
+
+        inicio = time.perf_counter()
+        indice = IndiceNgramas(df, ["marca", "modelo", "ano"])
+        montagem = (time.perf_counter() - inicio) * 1000
+
+        for termos in CONSULTAS:
+            assert busca_varredura(df, termos) == len(indice.buscar_todos(termos)), termos
+
+        varredura = cronometrar(lambda t: busca_varredura(df, t))
+        # "frio": sem o cache de termos, mede só as interseções de n-gramas
+        frio = cronometrar(lambda t: (indice.limpar_cache(), indice.buscar_todos(t)))
+        quente = cronometrar(indice.buscar_todos)
+        print(f"{len(df):>8} {varredura:>15.3f} {frio:>17.3f} {quente:>12.4f} {montagem:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
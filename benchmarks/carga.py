@@ -0,0 +1,329 @@
+# benchmarks/carga.py
+"""
+Teste de carga reprodutível da API com o catálogo sintético
+(benchmarks/catalogo_sintetico.py) em 1x, 10x e 100x o tamanho da planilha.
+
+Para cada fator, num processo novo:
+- um SQLite temporário (DATABASE_URL) recebe o catálogo inteiro pelo ETL e
+  alguns usuários;
+- o app roda no próprio processo (TestClient) com o snapshot sintético no
+  lugar da planilha e o monitor de recarga parado; as medições só começam
+  quando GET /pronto responde 200;
+- cada endpoint recebe ``--requisicoes`` chamadas (sorteadas com semente fixa)
+  de ``--concorrencia`` threads, depois de um aquecimento que não é medido.
+
+Saída: requisições/s e latência p50/p95/p99/máx por endpoint, num JSON com o
+commit atual (benchmarks/resultados/ por padrão). Com ``--comparar`` mostra a
+diferença para um JSON anterior, ex. de outro commit. As latências incluem o
+TestClient (sem rede), então servem para comparar versões, não como números
+absolutos de produção.
+
+Uso:
+    python -m benchmarks.carga [--fatores 1 10 100] [--requisicoes 300] [--concorrencia 4]
+    python -m benchmarks.carga --fatores 1 --comparar benchmarks/resultados/carga-<commit>.json
+    python -m benchmarks.carga --modo sql    # /carros e /filtro-carros no banco (CATALOGO_MODO=sql)
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASTA_RESULTADOS = os.path.join(RAIZ, "benchmarks", "resultados")
+
+FATORES = [1, 10, 100]
+REQUISICOES = 300
+CONCORRENCIA = 4
+AQUECIMENTO = 20
+USUARIOS = 50
+SEMENTE = 2024
+
+
+# -------------------------
+# Requisições de cada endpoint
+# -------------------------
+def _sem_letra(rng, palavra: str) -> str:
+    if len(palavra) < 4:
+        return palavra
+    i = int(rng.integers(1, len(palavra) - 1))
+    return palavra[:i] + palavra[i + 1:]
+
+
+def montar_cenarios(snap, veiculo_ids: list, usuarios: list) -> dict:
+    """
+    nome -> função(rng) que devolve (método, url, corpo). Os valores saem do
+    próprio catálogo, para que as buscas e filtros tenham resultado.
+    """
+    df = snap.df_busca
+    marcas = df["marca"].dropna().unique().tolist()
+    modelos = df["modelo"].dropna().astype(str).unique().tolist()
+    anos = sorted(pd.to_numeric(df["ano"], errors="coerce").dropna().astype(int).unique().tolist())
+    codigos = df["codigo"].tolist()
+    combustiveis = snap.df_favoritos["combustivel"].dropna().unique().tolist()
+
+    def escolher(rng, valores):
+        return valores[int(rng.integers(0, len(valores)))]
+
+    def carros(rng):
+        termos = [escolher(rng, modelos)]
+        if rng.random() < 0.5:
+            termos.append(str(escolher(rng, anos)))
+        return "GET", "/carros", {"busca": " ".join(termos), "limite": 50}
+
+    def carros_fuzzy(rng):
+        return "GET", "/carros", {"busca": _sem_letra(rng, escolher(rng, modelos)), "limite": 50}
+
+    def filtro(rng):
+        params = {"limite": 20, "pagina": int(rng.integers(1, 4))}
+        params["marca"] = escolher(rng, marcas)
+        if rng.random() < 0.5:
+            params["ano"] = escolher(rng, anos)
+        if rng.random() < 0.3:
+            params["combustivel"] = escolher(rng, combustiveis)
+        return "GET", "/filtro-carros", params
+
+    def detalhe(rng):
+        return "GET", f"/carros/{escolher(rng, codigos)}", {"por": "codigo"}
+
+    def favoritar(rng):
+        return "POST", f"/favoritar/{escolher(rng, usuarios)}", {"codigo": escolher(rng, codigos)}
+
+    def favoritos(rng):
+        return "GET", f"/veiculos_favoritos/{escolher(rng, usuarios)}", None
+
+    def comparar_carros(rng):
+        return "GET", "/comparar-carros", {"id1": escolher(rng, veiculo_ids), "id2": escolher(rng, veiculo_ids)}
+
+    def comparar(rng):
+        ids = rng.choice(veiculo_ids, size=5, replace=False).tolist()
+        return "GET", "/comparar", {"ids": ids}
+
+    return {
+        "/carros": carros,
+        "/carros (fuzzy)": carros_fuzzy,
+        "/filtro-carros": filtro,
+        "/carros/{id}": detalhe,
+        "/favoritar": favoritar,
+        "/veiculos_favoritos": favoritos,
+        "/comparar-carros": comparar_carros,
+        "/comparar": comparar,
+    }
+
+
+def _chamar(cliente, metodo: str, url: str, dados):
+    if metodo == "POST":
+        return cliente.post(url, json=dados)
+    return cliente.get(url, params=dados)
+
+
+def medir(cliente, gerar, requisicoes: int, concorrencia: int, semente: int) -> dict:
+    rng = np.random.default_rng(semente)
+    chamadas = [gerar(rng) for _ in range(requisicoes)]
+    for metodo, url, dados in chamadas[:AQUECIMENTO]:
+        _chamar(cliente, metodo, url, dados)
+
+    latencias = np.zeros(requisicoes)
+    status = [0] * requisicoes
+    proxima = iter(range(requisicoes))
+    lock = threading.Lock()
+
+    def trabalhador():
+        while True:
+            with lock:
+                i = next(proxima, None)
+            if i is None:
+                return
+            metodo, url, dados = chamadas[i]
+            inicio = time.perf_counter()
+            resposta = _chamar(cliente, metodo, url, dados)
+            latencias[i] = time.perf_counter() - inicio
+            status[i] = resposta.status_code
+
+    inicio = time.perf_counter()
+    threads = [threading.Thread(target=trabalhador) for _ in range(concorrencia)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    duracao = time.perf_counter() - inicio
+
+    p50, p95, p99 = np.percentile(latencias, [50, 95, 99]) * 1000
+    contagem = {}
+    for s in status:
+        contagem[str(s)] = contagem.get(str(s), 0) + 1
+    return {
+        "requisicoes": requisicoes,
+        "req_por_s": round(requisicoes / duracao, 1),
+        "p50_ms": round(p50, 3),
+        "p95_ms": round(p95, 3),
+        "p99_ms": round(p99, 3),
+        "max_ms": round(latencias.max() * 1000, 3),
+        "erros": sum(n for s, n in contagem.items() if not s.startswith(("2", "3"))),
+        "status": contagem,
+    }
+
+
+# -------------------------
+# Um fator (roda num processo próprio)
+# -------------------------
+def executar_fator(fator: int, args, pasta: str) -> dict:
+    # Antes de importar o backend: database.py e main.py leem estas variáveis no import
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(pasta, 'carga.db')}"
+    os.environ["CATALOGO_MODO"] = args.modo
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import select
+
+    from backend import catalogo
+    from backend.database import Base, SessionLocal, engine
+    from backend.etl_catalogo import carregar_dataframe
+    from backend.main import app
+    from backend.modelo import Consumo, Usuario
+    from benchmarks import catalogo_sintetico
+
+    inicio = time.perf_counter()
+    df = catalogo_sintetico.gerar(fator, args.semente)
+    snap = catalogo_sintetico.snapshot(df, fator, args.semente)
+    catalogo.usar_snapshot(snap)  # o monitor não troca o sintético pela planilha
+    segundos_snapshot = time.perf_counter() - inicio
+
+    Base.metadata.create_all(bind=engine)
+    carga = carregar_dataframe(engine, df, snap=snap)
+    del df
+
+    with SessionLocal() as db:
+        db.add_all([
+            Usuario(nome=f"Carga {i}", email=f"carga{i}@exemplo.com", senha="x") for i in range(args.usuarios)
+        ])
+        db.commit()
+        usuarios = db.scalars(select(Usuario.usuario_id)).all()
+        veiculo_ids = db.scalars(select(Consumo.veiculo_id).distinct()).all()
+
+    cenarios = montar_cenarios(snap, veiculo_ids, usuarios)
+    resultados = {}
+    with TestClient(app) as cliente:
+        while cliente.get("/pronto").status_code != 200:
+            time.sleep(0.05)
+        for i, (nome, gerar) in enumerate(cenarios.items()):
+            if args.endpoints and nome not in args.endpoints:
+                continue
+            resultados[nome] = medir(cliente, gerar, args.requisicoes, args.concorrencia, args.semente + i)
+            print(f"  {fator}x {nome:<22} {resultados[nome]['req_por_s']:>9.1f} req/s", file=sys.stderr)
+    engine.dispose()
+
+    return {
+        "linhas": len(snap),
+        "snapshot_s": round(segundos_snapshot, 3),
+        "carga_banco_s": carga["segundos"],
+        "endpoints": resultados,
+    }
+
+
+# -------------------------
+# Relatório
+# -------------------------
+def commit_atual() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconhecido"
+
+
+def imprimir(resultado: dict, anterior: dict = None):
+    cabecalho = f"{'fator':>6} {'endpoint':<22} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'erros':>6}"
+    if anterior:
+        cabecalho += f" {'Δp50':>8} {'Δp95':>8} {'Δreq/s':>8}"
+    print(cabecalho)
+    for fator, dados in resultado["fatores"].items():
+        antes = (anterior or {}).get("fatores", {}).get(fator, {}).get("endpoints", {})
+        for nome, m in dados["endpoints"].items():
+            linha = (
+                f"{fator + 'x':>6} {nome:<22} {m['req_por_s']:>9.1f} {m['p50_ms']:>9.2f} "
+                f"{m['p95_ms']:>9.2f} {m['p99_ms']:>9.2f} {m['erros']:>6}"
+            )
+            a = antes.get(nome)
+            if a:
+                linha += "".join(
+                    f" {(m[k] - a[k]) / a[k] * 100:>+7.1f}%" if a[k] else f" {'-':>8}"
+                    for k in ("p50_ms", "p95_ms", "req_por_s")
+                )
+            print(linha)
+        print(f"{'':>6} ({dados['linhas']} linhas; snapshot {dados['snapshot_s']}s; banco {dados['carga_banco_s']}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga da API com catálogo sintético")
+    parser.add_argument("--fatores", type=int, nargs="+", default=FATORES)
+    parser.add_argument("--requisicoes", type=int, default=REQUISICOES, help="por endpoint e fator")
+    parser.add_argument("--concorrencia", type=int, default=CONCORRENCIA)
+    parser.add_argument("--usuarios", type=int, default=USUARIOS)
+    parser.add_argument("--semente", type=int, default=SEMENTE)
+    parser.add_argument("--modo", choices=["memoria", "sql"], default="memoria")
+    parser.add_argument("--endpoints", nargs="+", help="só estes cenários (ex.: /carros /favoritar)")
+    parser.add_argument("--saida", help="JSON de resultados (padrão: benchmarks/resultados/carga-<commit>-<data>.json)")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior")
+    parser.add_argument("--fator-unico", type=int, help=argparse.SUPPRESS)  # uso interno: processo filho
+    args = parser.parse_args()
+
+    if args.fator_unico is not None:
+        with tempfile.TemporaryDirectory(prefix="smvbr-carga-") as pasta:
+            json.dump(executar_fator(args.fator_unico, args, pasta), sys.stdout)
+        return
+
+    # Um processo por fator: banco, caches e memória começam do zero em cada um
+    repassados = [
+        "--requisicoes", str(args.requisicoes), "--concorrencia", str(args.concorrencia),
+        "--usuarios", str(args.usuarios), "--semente", str(args.semente), "--modo", args.modo,
+    ]
+    if args.endpoints:
+        repassados += ["--endpoints", *args.endpoints]
+
+    resultado = {
+        "commit": commit_atual(),
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "parametros": {
+            "requisicoes": args.requisicoes, "concorrencia": args.concorrencia,
+            "usuarios": args.usuarios, "semente": args.semente, "modo": args.modo,
+        },
+        "fatores": {},
+    }
+    for fator in args.fatores:
+        print(f"fator {fator}x...", file=sys.stderr)
+        filho = subprocess.run(
+            [sys.executable, "-m", "benchmarks.carga", "--fator-unico", str(fator), *repassados],
+            cwd=RAIZ, stdout=subprocess.PIPE, text=True, check=True,
+        )
+        # o app também imprime no stdout; o JSON é a última linha
+        resultado["fatores"][str(fator)] = json.loads(filho.stdout.strip().splitlines()[-1])
+
+    anterior = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            anterior = json.load(f)
+        print(f"comparando com {anterior.get('commit')} ({anterior.get('data')})")
+    imprimir(resultado, anterior)
+
+    saida = args.saida or os.path.join(
+        PASTA_RESULTADOS, f"carga-{resultado['commit']}-{datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    with open(saida, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=2)
+    print(f"resultados em {saida}")
+
+
+if __name__ == "__main__":
+    main()
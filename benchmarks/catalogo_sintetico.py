@@ -0,0 +1,84 @@
+# benchmarks/catalogo_sintetico.py
+"""
+Catálogo sintético com o formato da planilha do PBEV (mesmas colunas que os
+endpoints leem), para medir a API com 1x, 10x, 100x... o tamanho real.
+
+A cópia 0 é a planilha original. As demais reamostram linhas dela (com
+reposição, semente fixa) e:
+- multiplicam emissões, rendimentos e consumo por um ruído log-normal;
+- acrescentam " S<n>" à versão, para as linhas não serem idênticas;
+- recebem códigos novos, únicos, depois do maior código da planilha.
+Anos, marcas, modelos, combustíveis e quartis continuam com a distribuição
+real, então um filtro por ano/marca devolve ~fator vezes mais linhas.
+
+Uso:
+    python -m benchmarks.catalogo_sintetico --fator 10 --saida /tmp/pbev-10x.xlsx
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from backend import cache_colunar
+from backend.catalogo import CAMINHO_PLANILHA, CatalogoSnapshot, hash_arquivo
+
+SEMENTE = 2024
+RUIDO = 0.05  # desvio do log do fator multiplicativo (~5%)
+
+
+def _colunas_metricas(df: pd.DataFrame) -> list:
+    return [
+        c for c in df.columns
+        if c.startswith(("Emissão de", "Rendimento", "Consumo Energético"))
+    ]
+
+
+def gerar(fator: int, semente: int = SEMENTE, caminho: str = CAMINHO_PLANILHA) -> pd.DataFrame:
+    """DataFrame com as colunas originais da planilha e ``fator`` x o número de linhas."""
+    base = cache_colunar.ler_planilha(caminho, hash_arquivo(caminho))
+    if fator <= 1:
+        return base.copy()
+
+    rng = np.random.default_rng(semente)
+    n = len(base) * (fator - 1)
+    extra = base.iloc[rng.integers(0, len(base), n)].reset_index(drop=True)
+
+    for coluna in _colunas_metricas(base):
+        valores = pd.to_numeric(extra[coluna], errors="coerce")
+        ruidoso = (valores * rng.lognormal(0.0, RUIDO, n)).round(3)
+        # NMHC tem textos ("-", "NA") misturados: só troca o que era número
+        extra[coluna] = ruidoso.where(valores.notna(), extra[coluna])
+
+    copia = np.repeat(np.arange(1, fator), len(base))
+    extra["VERSAO"] = extra["VERSAO"].fillna("").astype(str) + " S" + pd.Series(copia).astype(str)
+
+    inicio = int(pd.to_numeric(base["codigo"], errors="coerce").max()) + 1
+    extra["codigo"] = np.arange(inicio, inicio + n)
+
+    return pd.concat([base, extra], ignore_index=True)
+
+
+def snapshot(df: pd.DataFrame, fator: int, semente: int = SEMENTE) -> CatalogoSnapshot:
+    """Snapshot do catálogo montado direto do DataFrame (sem arquivo em disco)."""
+    return CatalogoSnapshot(df, f"<sintetico {fator}x>", 0.0, f"sintetico-{fator}x-{semente}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera um catálogo sintético no formato da planilha do PBEV")
+    parser.add_argument("--fator", type=int, default=10)
+    parser.add_argument("--semente", type=int, default=SEMENTE)
+    parser.add_argument("--saida", required=True, help="arquivo .xlsx (lento para fatores grandes) ou .csv")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    df = gerar(args.fator, args.semente)
+    if args.saida.endswith(".csv"):
+        df.to_csv(args.saida, index=False)
+    else:
+        df.to_excel(args.saida, index=False)
+    print(f"{len(df)} linhas gravadas em {args.saida} ({time.perf_counter() - inicio:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# benchmarks/favoritar.py
+"""
+Carga em /favoritar: comandos SQL e commits por toggle, e tempo por toggle,
+usando backend.favoritos contra um SQLite temporário.
+
+Fases:
+- "cria veículo": primeiro favorito de veículos que ainda não estão no banco;
+- "toggle": desfavoritar/favoritar veículos já conhecidos, em várias threads.
+
+Uso:
+    python -m benchmarks.favoritar [--veiculos 200] [--threads 4] [--rodadas 10]
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from backend import favoritos
+from backend.catalogo import carregar_snapshot
+from backend.database import Base
+
+
+class Contador:
+    def __init__(self, engine):
+        self.comandos = 0
+        self.commits = 0
+        self._lock = threading.Lock()
+        event.listen(engine, "before_cursor_execute", self._comando)
+        event.listen(engine, "commit", self._commit)
+
+    def _comando(self, *args):
+        with self._lock:
+            self.comandos += 1
+
+    def _commit(self, *args):
+        with self._lock:
+            self.commits += 1
+
+    def zerar(self):
+        self.comandos = self.commits = 0
+
+
+def rodar(Sessao, usuario_id: int, carros: list, rodadas: int = 1):
+    db = Sessao()
+    try:
+        for _ in range(rodadas):
+            for carro in carros:
+                favoritos.alternar_favorito(db, usuario_id, carro)
+    finally:
+        db.close()
+
+
+def relatorio(fase: str, toggles: int, segundos: float, contador: Contador):
+    print(
+        f"{fase:<14} {toggles:>8} {contador.comandos / toggles:>12.2f} "
+        f"{contador.commits / toggles:>9.2f} {segundos * 1000 / toggles:>10.3f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de /favoritar")
+    parser.add_argument("--veiculos", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--rodadas", type=int, default=10)
+    args = parser.parse_args()
+
+    snap = carregar_snapshot()
+    carros = snap.df_favoritos.head(args.veiculos).to_dict(orient="records")
+
+    with tempfile.TemporaryDirectory() as pasta:
+        engine = create_engine(f"sqlite:///{os.path.join(pasta, 'favoritos.db')}", connect_args={"timeout": 30})
+        Base.metadata.create_all(bind=engine)
+        Sessao = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        contador = Contador(engine)
+
+        print(f"{'fase':<14} {'toggles':>8} {'comandos/op':>12} {'commits/op':>9} {'ms/op':>10}")
+
+        inicio = time.perf_counter()
+        rodar(Sessao, 1, carros)
+        relatorio("cria veículo", len(carros), time.perf_counter() - inicio, contador)
+
+        contador.zerar()
+        threads = [
+            threading.Thread(target=rodar, args=(Sessao, usuario_id, carros, args.rodadas))
+            for usuario_id in range(1, args.threads + 1)
+        ]
+        inicio = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        relatorio("toggle", len(carros) * args.rodadas * args.threads, time.perf_counter() - inicio, contador)
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
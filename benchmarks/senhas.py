@@ -0,0 +1,137 @@
+# benchmarks/senhas.py
+"""
+Logins por segundo com hash de senha no pool de processos (backend/senhas.py).
+
+O app roda no próprio processo (TestClient) contra um SQLite temporário com
+``--usuarios`` contas já com hash. Para cada custo de ``--custos``, dispara
+``--logins`` POST /login de ``--concorrencia`` threads e, ao mesmo tempo, uma
+thread chamando GET /pronto, para mostrar que as outras rotas continuam
+respondendo enquanto o KDF ocupa os processos do pool.
+
+Uso:
+    python -m benchmarks.senhas [--custos 14 15 16] [--logins 200] [--concorrencia 8] [--processos 2]
+    SENHA_ALGORITMO=pbkdf2 python -m benchmarks.senhas --custos 200000 600000
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+USUARIOS = 20
+LOGINS = 200
+CONCORRENCIA = 8
+
+
+def medir_logins(cliente, usuarios: int, logins: int, concorrencia: int) -> tuple:
+    latencias = np.zeros(logins)
+    status = [0] * logins
+    proxima = iter(range(logins))
+    lock = threading.Lock()
+
+    def trabalhador():
+        while True:
+            with lock:
+                i = next(proxima, None)
+            if i is None:
+                return
+            n = i % usuarios
+            inicio = time.perf_counter()
+            r = cliente.post("/login", json={"email": f"login{n}@exemplo.com.br", "senha": f"senha-{n}"})
+            latencias[i] = time.perf_counter() - inicio
+            status[i] = r.status_code
+
+    outras = []
+    parar = threading.Event()
+
+    def sonda():
+        while not parar.is_set():
+            inicio = time.perf_counter()
+            cliente.get("/pronto")
+            outras.append(time.perf_counter() - inicio)
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=trabalhador) for _ in range(concorrencia)]
+    t_sonda = threading.Thread(target=sonda)
+    inicio = time.perf_counter()
+    t_sonda.start()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    duracao = time.perf_counter() - inicio
+    parar.set()
+    t_sonda.join()
+    return latencias, status, duracao, np.array(outras)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de /login com hash de senha no pool de processos")
+    parser.add_argument("--custos", type=int, nargs="+", help="padrão: o custo configurado (SENHA_CUSTO)")
+    parser.add_argument("--usuarios", type=int, default=USUARIOS)
+    parser.add_argument("--logins", type=int, default=LOGINS)
+    parser.add_argument("--concorrencia", type=int, default=CONCORRENCIA)
+    parser.add_argument("--processos", type=int, help="processos do pool (padrão: SENHA_PROCESSOS)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        # Antes de importar o backend: database.py lê a URL no import
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(pasta, 'senhas.db')}"
+
+        from fastapi.testclient import TestClient
+
+        from backend import main as api
+        from backend import senhas
+        from backend.database import Base, SessionLocal, engine
+        from backend.modelo import Usuario
+
+        Base.metadata.create_all(bind=engine)
+        custos = args.custos or [senhas.CUSTO]
+        processos = args.processos or senhas.PROCESSOS
+        print(f"algoritmo {senhas.ALGORITMO}, {processos} processo(s), {os.cpu_count()} CPU(s)")
+        print(
+            f"{'custo':>8} {'hash ms':>8} {'logins/s':>9} {'p50 ms':>8} {'p95 ms':>8} "
+            f"{'fila ms':>8} {'/pronto p95 ms':>15} {'erros':>6}"
+        )
+
+        for custo in custos:
+            with SessionLocal() as db:
+                db.query(Usuario).delete()
+                db.add_all([
+                    Usuario(
+                        nome=f"Login {n}", email=f"login{n}@exemplo.com.br",
+                        senha=senhas.gerar_hash(f"senha-{n}", senhas.ALGORITMO, custo),
+                    )
+                    for n in range(args.usuarios)
+                ])
+                db.commit()
+
+            senhas.servico = senhas.ServicoSenhas(custo=custo, processos=processos, fila_max=args.concorrencia * 2)
+            with TestClient(api.app) as cliente:
+                while cliente.get("/pronto").status_code != 200:
+                    time.sleep(0.05)
+                for n in range(min(processos, args.usuarios)):  # processos do pool já de pé
+                    cliente.post("/login", json={"email": f"login{n}@exemplo.com.br", "senha": f"senha-{n}"})
+                m0 = senhas.servico.metricas()
+
+                latencias, status, duracao, outras = medir_logins(
+                    cliente, args.usuarios, args.logins, args.concorrencia,
+                )
+                m = senhas.servico.metricas()
+
+            ops = m["verificacoes"] - m0["verificacoes"]
+            p50, p95 = np.percentile(latencias, [50, 95]) * 1000
+            sonda_p95 = np.percentile(outras, 95) * 1000 if len(outras) else float("nan")
+            erros = sum(1 for s in status if s != 200)
+            print(
+                f"{custo:>8} {m['execucao_media_ms']:>8.1f} {args.logins / duracao:>9.1f} {p50:>8.1f} {p95:>8.1f} "
+                f"{m['espera_media_ms']:>8.1f} {sonda_p95:>15.2f} {erros:>6}"
+            )
+            if ops != args.logins:
+                print(f"         (atenção: {ops} verificações para {args.logins} logins)")
+
+
+if __name__ == "__main__":
+    main()
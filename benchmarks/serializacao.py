@@ -0,0 +1,52 @@
+# benchmarks/serializacao.py
+"""
+Compara a montagem das respostas de /filtro-carros e /carros:
+adicionar_imagem + JSONResponse (como era) x JSON das linhas pré-renderizado
+no snapshot + concatenação.
+
+Uso:
+    python -m benchmarks.serializacao
+"""
+import time
+
+from fastapi.responses import JSONResponse
+
+from backend.catalogo import carregar_snapshot
+from backend.serializacao import adicionar_imagem, montar_json
+
+TAMANHOS = [20, 200, None]  # None = catálogo inteiro (GET /carros sem busca)
+REPETICOES = 20
+
+
+def cronometrar(funcao, repeticoes=REPETICOES) -> float:
+    """Tempo médio por chamada, em ms."""
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        funcao()
+    return (time.perf_counter() - inicio) * 1000 / repeticoes
+
+
+def main():
+    inicio = time.perf_counter()
+    snap = carregar_snapshot()
+    print(f"snapshot montado em {(time.perf_counter() - inicio) * 1000:.0f} ms ({len(snap)} linhas)\n")
+
+    print(f"{'linhas':>8} {'antes (ms)':>11} {'pré-renderizado (ms)':>21} {'ganho':>7}")
+    for tamanho in TAMANHOS:
+        linhas = snap.ordem_ranking[:tamanho]
+        page = snap.df.iloc[linhas]
+
+        def antes():
+            return JSONResponse({"total": len(snap), "resultados": adicionar_imagem(page)}).body
+
+        def depois():
+            return montar_json({"total": len(snap), "resultados": None}, "resultados", linhas, snap.json_filtro)
+
+        repeticoes = REPETICOES if tamanho else 3
+        t_antes = cronometrar(antes, repeticoes)
+        t_depois = cronometrar(depois, repeticoes)
+        print(f"{len(linhas):>8} {t_antes:>11.2f} {t_depois:>21.3f} {t_antes / t_depois:>6.0f}x")
+
+
+if __name__ == "__main__":
+    main()
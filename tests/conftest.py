@@ -0,0 +1,7 @@
+# tests/conftest.py
+import os
+import sys
+
+# A raiz do repositório tem __init__.py, então o pytest não a coloca no
+# sys.path sozinho; os testes importam "backend.xxx" como a API.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
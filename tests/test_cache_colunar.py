@@ -0,0 +1,40 @@
+# tests/test_cache_colunar.py
+"""Cache colunar: mesmo DataFrame do xlsx e só a versão atual de cada planilha fica em disco."""
+import os
+
+import pandas as pd
+import pytest
+
+from backend import cache_colunar
+from backend.catalogo import hash_arquivo
+
+pytest.importorskip("pyarrow")
+
+
+@pytest.fixture
+def pasta(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_colunar, "CACHE_DIR", str(tmp_path / "cache"))
+    return tmp_path
+
+
+def _planilha(pasta, nome, linhas) -> str:
+    caminho = str(pasta / nome)
+    pd.DataFrame({"MARCA": ["FIAT", "VW", "GM"][:linhas], "MODELO": ["Uno", 500, "Onix"][:linhas], "ANO": range(linhas)}).to_excel(caminho, index=False)
+    return caminho
+
+
+def test_versao_nova_apaga_a_antiga(pasta):
+    caminho = _planilha(pasta, "catalogo.xlsx", 2)
+    outra = _planilha(pasta, "catalogo 2.xlsx", 2)
+    cache_colunar.ler_planilha(caminho, hash_arquivo(caminho))
+    cache_colunar.ler_planilha(outra, hash_arquivo(outra))
+
+    _planilha(pasta, "catalogo.xlsx", 3)
+    df = cache_colunar.ler_planilha(caminho, hash_arquivo(caminho))
+
+    assert sorted(os.listdir(cache_colunar.CACHE_DIR)) == sorted([
+        os.path.basename(cache_colunar.caminho_cache(caminho, hash_arquivo(caminho))),
+        os.path.basename(cache_colunar.caminho_cache(outra, hash_arquivo(outra))),
+    ])
+    pd.testing.assert_frame_equal(cache_colunar.ler_planilha(caminho, hash_arquivo(caminho)), df)
+    pd.testing.assert_frame_equal(df, pd.read_excel(caminho))
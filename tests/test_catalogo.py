@@ -0,0 +1,96 @@
+# tests/test_catalogo.py
+"""Snapshot do catálogo: recarga quando o conteúdo da planilha muda, e só nesse caso."""
+import os
+
+import pandas as pd
+import pytest
+
+from backend import cache_colunar, catalogo
+from backend.catalogo import CAMINHO_PLANILHA, hash_arquivo
+
+
+@pytest.fixture(scope="module")
+def planilha_real():
+    return cache_colunar.ler_planilha(CAMINHO_PLANILHA, hash_arquivo(CAMINHO_PLANILHA))
+
+
+@pytest.fixture
+def planilha(tmp_path, monkeypatch, planilha_real):
+    monkeypatch.setattr(cache_colunar, "CACHE_DIR", str(tmp_path / "cache"))
+    catalogo.reiniciar()
+    caminho = str(tmp_path / "catalogo.xlsx")
+    planilha_real.head(50).to_excel(caminho, index=False)
+    yield caminho
+    catalogo.reiniciar()
+
+
+def _mudar_mtime(caminho: str):
+    mtime = os.path.getmtime(caminho) + 10
+    os.utime(caminho, (mtime, mtime))
+
+
+def _busca_antiga(caminho: str) -> pd.DataFrame:
+    """Preparação que /carros fazia a cada request, lendo o xlsx."""
+    df = pd.read_excel(caminho)
+    df.columns = [c.strip().lower() for c in df.columns]
+    df["ano"] = df["ano"].apply(
+        lambda x: str(int(x)) if pd.notnull(x) and str(x).replace(".", "", 1).isdigit() else str(x)
+    ).str.strip()
+    for col in ["marca", "modelo", "ano", "codigo"]:
+        df[col] = df[col].fillna("").astype(str).str.strip().str.upper()
+    return df[["marca", "modelo", "ano", "codigo"]]
+
+
+def test_primeira_carga_e_visao_de_busca(planilha):
+    assert catalogo.recarregar_se_mudou(planilha)
+    snap = catalogo.snapshot_atual()
+
+    assert snap.hash == hash_arquivo(planilha) and len(snap) == 50
+    pd.testing.assert_frame_equal(snap.df_busca[["marca", "modelo", "ano", "codigo"]], _busca_antiga(planilha))
+
+
+def test_so_o_mtime_mudou_nao_recarrega(planilha):
+    catalogo.recarregar_se_mudou(planilha)
+    snap = catalogo.snapshot_atual()
+
+    _mudar_mtime(planilha)
+    assert not catalogo.recarregar_se_mudou(planilha)
+    assert catalogo.snapshot_atual() is snap and snap.mtime == os.path.getmtime(planilha)
+
+
+def test_conteudo_novo_troca_o_snapshot(planilha, planilha_real):
+    catalogo.recarregar_se_mudou(planilha)
+    antigo = catalogo.snapshot_atual()
+
+    planilha_real.head(60).to_excel(planilha, index=False)
+    _mudar_mtime(planilha)
+    assert catalogo.recarregar_se_mudou(planilha)
+
+    novo = catalogo.snapshot_atual()
+    assert novo is not antigo and len(novo) == 60 and novo.versao != antigo.versao
+    assert len(antigo) == 50 and len(antigo.json_filtro) == 50  # quem já tinha o antigo continua com ele inteiro
+    pd.testing.assert_frame_equal(novo.df_busca[["marca", "modelo", "ano", "codigo"]], _busca_antiga(planilha))
+
+
+def test_planilha_corrompida_mantem_o_snapshot(planilha):
+    catalogo.recarregar_se_mudou(planilha)
+    snap = catalogo.snapshot_atual()
+
+    with open(planilha, "wb") as f:
+        f.write(b"isto nao e um xlsx")
+    _mudar_mtime(planilha)
+    with pytest.raises(Exception):
+        catalogo.recarregar_se_mudou(planilha)
+    assert catalogo.snapshot_atual() is snap
+
+
+
+def test_snapshot_fixo_nao_recarrega(planilha, planilha_real):
+    catalogo.recarregar_se_mudou(planilha)
+    fixo = catalogo.CatalogoSnapshot(planilha_real.head(10), "<teste>", 0.0, "fixo")
+    catalogo.usar_snapshot(fixo)
+
+    planilha_real.head(20).to_excel(planilha, index=False)
+    _mudar_mtime(planilha)
+    assert not catalogo.recarregar_se_mudou(planilha)
+    assert catalogo.snapshot_atual() is fixo
@@ -0,0 +1,178 @@
+# tests/test_comparacao.py
+"""GET /comparar: deltas, ranks e percentis do NumPy conferidos à mão, com o catálogo carregado pelo ETL."""
+import threading
+import time
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+from backend import cache_colunar, comparacao, etl_catalogo
+from backend.catalogo import CAMINHO_PLANILHA, hash_arquivo
+from backend.database import Base
+from backend.main import app, get_db
+from backend.modelo import Veiculo
+
+
+@pytest.fixture(scope="module")
+def engine(tmp_path_factory):
+    df = cache_colunar.ler_planilha(CAMINHO_PLANILHA, hash_arquivo(CAMINHO_PLANILHA)).head(200)
+    engine = create_engine(f"sqlite:///{tmp_path_factory.mktemp('comparacao') / 'comparacao.db'}")
+    Base.metadata.create_all(bind=engine)
+    etl_catalogo.carregar_dataframe(engine, df, tamanho_lote=64)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    comparacao.limpar_cache()
+    with Session(engine) as sessao:
+        yield sessao
+
+
+def _linhas_manuais(veiculo, combustivel_id=None) -> list:
+    """(emissão, consumo do mesmo combustível) de cada emissão do veículo, como o outer join da consulta."""
+    emissoes = sorted(veiculo.emissoes, key=lambda e: e.emissao_id)
+    if combustivel_id is not None:
+        emissoes = [e for e in emissoes if e.combustivel_id == combustivel_id]
+    consumos = {c.combustivel_id: c for c in veiculo.consumos}
+    return [(e, consumos.get(e.combustivel_id)) for e in emissoes] or [(None, None)]
+
+
+def _valores(veiculo, emissao, consumo) -> list:
+    fontes = {"nmhc": emissao, "co": emissao, "nox": emissao, "co2": emissao, "rendimento_cidade": consumo,
+              "rendimento_estrada": consumo, "consumo_energetico": consumo, "scoreFinal": veiculo}
+    valores = []
+    for nome in comparacao.NOMES:
+        valor = getattr(fontes[nome], nome, None) if fontes[nome] is not None else None
+        valores.append(float("nan") if valor is None else float(valor))
+    return valores
+
+
+def _escolhida(veiculo, combustivel_id=None):
+    """Linha usada na comparação: a primeira emissão que tem consumo (senão a primeira)."""
+    linhas = _linhas_manuais(veiculo, combustivel_id)
+    return next((l for l in linhas if l[1] is not None), linhas[0])
+
+
+def _esperado(db, ids, combustivel_id=None) -> dict:
+    veiculos = {v.veiculo_id: v for v in db.scalars(select(Veiculo))}
+    comparados = [_valores(veiculos[i], *_escolhida(veiculos[i], combustivel_id)) for i in ids]
+    catalogo = [_valores(v, e, c) for v in veiculos.values() for e, c in _linhas_manuais(v, combustivel_id)]
+
+    esperado = {}
+    for j, nome in enumerate(comparacao.NOMES):
+        sinal = 1 if comparacao.METRICAS[nome][1] else -1
+        valores = [linha[j] for linha in comparados]
+        distribuicao = [sinal * linha[j] for linha in catalogo if not np.isnan(linha[j])]
+        validos = [v for v in valores if not np.isnan(v)]
+        esperado[nome] = {
+            "valores": valores,
+            "delta": [v - valores[0] for v in valores],
+            "delta_percentual": [(v - valores[0]) / abs(valores[0]) * 100 if valores[0] else float("nan") for v in valores],
+            "rank": [
+                1 + sum(sinal * o > sinal * v for o in validos) if not np.isnan(v) else len(validos) + 1
+                for v in valores
+            ],
+            "percentil": [
+                sum(d <= sinal * v for d in distribuicao) / len(distribuicao) * 100 if not np.isnan(v) else float("nan")
+                for v in valores
+            ],
+        }
+    return esperado
+
+
+def _ids_com_dados(db, quantidade, combustivel_id=None) -> list:
+    ids = []
+    for veiculo in db.scalars(select(Veiculo).order_by(Veiculo.veiculo_id)):
+        emissao, consumo = _escolhida(veiculo, combustivel_id)
+        if emissao is not None and consumo is not None:
+            ids.append(veiculo.veiculo_id)
+    return ids[::max(1, len(ids) // quantidade)][:quantidade]
+
+
+def _confere(resultado, esperado):
+    for nome, metrica in resultado["metricas"].items():
+        for campo, casas in [("valores", 6), ("delta", 6), ("delta_percentual", 2), ("percentil", 2)]:
+            obtido = [float("nan") if v is None else v for v in metrica[campo]]
+            assert obtido == pytest.approx(esperado[nome][campo], abs=10 ** -casas, nan_ok=True), (nome, campo)
+        assert metrica["rank"] == esperado[nome]["rank"], nome
+
+
+def test_comparacao_de_varios_veiculos(db):
+    ids = _ids_com_dados(db, 6)
+    assert len(ids) == 6
+
+    resultado = comparacao.comparar(db, ids)
+    assert [v["veiculo_id"] for v in resultado["veiculos"]] == ids
+    _confere(resultado, _esperado(db, ids))
+
+
+def test_comparacao_de_um_combustivel(db):
+    combustivel_id = db.scalars(select(Veiculo).order_by(Veiculo.veiculo_id)).first().emissoes[0].combustivel_id
+    ids = _ids_com_dados(db, 4, combustivel_id)
+
+    resultado = comparacao.comparar(db, ids, combustivel_id)
+    assert {v["combustivel_id"] for v in resultado["veiculos"]} == {combustivel_id}
+    _confere(resultado, _esperado(db, ids, combustivel_id))
+
+
+def test_pedido_invalido_e_veiculo_inexistente(db, engine):
+    inexistente = db.scalar(select(func.max(Veiculo.veiculo_id))) + 1
+    primeiro = db.scalar(select(func.min(Veiculo.veiculo_id)))
+    with pytest.raises(comparacao.ComparacaoInvalida):
+        comparacao.comparar(db, [primeiro, primeiro])
+    with pytest.raises(comparacao.VeiculoSemDados):
+        comparacao.comparar(db, [primeiro, inexistente])
+
+    def sessao():
+        with Session(engine) as s:
+            yield s
+
+    app.dependency_overrides[get_db] = sessao
+    try:
+        cliente = TestClient(app)
+        assert cliente.get("/comparar", params={"ids": [primeiro]}).status_code == 400
+        resposta = cliente.get("/comparar", params={"ids": [primeiro, inexistente]})
+        assert resposta.status_code == 404 and str(inexistente) in resposta.json()["detail"]
+        assert cliente.get("/comparar-carros", params={"id1": inexistente, "id2": primeiro}).status_code == 404
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+
+
+class _BancoLento:
+    """Só o que distribuicao usa de uma Session: conta as consultas e demora ``atraso`` em cada uma."""
+
+    def __init__(self, atraso: float):
+        self.atraso = atraso
+        self.consultas = 0
+
+    def execute(self, stmt):
+        self.consultas += 1
+        time.sleep(self.atraso)
+        return self
+
+    def mappings(self):
+        return self
+
+    def all(self):
+        return []
+
+
+def test_distribuicao_nao_bloqueia_outro_combustivel(db):
+    lento = _BancoLento(0.5)
+    threads = [threading.Thread(target=comparacao.distribuicao, args=(lento, 1)) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+
+    inicio = time.perf_counter()
+    comparacao.distribuicao(_BancoLento(0), 2)
+    assert time.perf_counter() - inicio < 0.25  # não esperou o recálculo do combustível 1
+
+    for thread in threads:
+        thread.join()
+    assert lento.consultas == 1  # as três chamadas do combustível 1 fizeram uma consulta só
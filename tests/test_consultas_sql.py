@@ -0,0 +1,112 @@
+# tests/test_consultas_sql.py
+"""Modo CATALOGO_MODO=sql responde as mesmas linhas que o snapshot em memória."""
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from backend import cache_colunar, consultas_sql, etl_catalogo, indices
+from backend.catalogo import CAMINHO_PLANILHA, CatalogoSnapshot, hash_arquivo
+from backend.database import Base
+
+
+@pytest.fixture(scope="module")
+def snap():
+    df = cache_colunar.ler_planilha(CAMINHO_PLANILHA, hash_arquivo(CAMINHO_PLANILHA)).head(300)
+    return CatalogoSnapshot(df, CAMINHO_PLANILHA, 0.0, "teste")
+
+
+@pytest.fixture
+def db(tmp_path, snap):
+    consultas_sql.limpar_cache()  # cache é por processo, não por banco
+    engine = create_engine(f"sqlite:///{tmp_path / 'sql.db'}")
+    Base.metadata.create_all(bind=engine)
+    etl_catalogo.carregar_linhas_catalogo(engine, snap, tamanho_lote=64)
+    with Session(engine) as sessao:
+        yield sessao
+    engine.dispose()
+
+
+def _filtrar_memoria(snap, filtros: dict, limite: int) -> list:
+    listas = [snap.indices_filtro[nome].contem(valor) for nome, valor in filtros.items()]
+    return [snap.json_filtro[i] for i in indices.pagina_por_rank(indices.intersectar(listas), snap.rank, 0, limite)]
+
+
+@pytest.mark.parametrize("filtros", [
+    {"grupo": "pequeno", "motor": "1"},
+    {"marca": "fia", "transmissao": "auto"},
+    {"combustivel": "f", "ar_condicionado": "s", "direcao_assistida": "h"},
+    {"marca": "nada disso"},
+])
+def test_filtros_como_no_snapshot(db, snap, filtros):
+    resultado = consultas_sql.filtrar(db, filtros, pagina=1, limite=50)
+
+    esperado = _filtrar_memoria(snap, filtros, 50)
+    assert resultado["linhas"] == esperado
+    assert resultado["total"] == len(indices.intersectar(
+        [snap.indices_filtro[nome].contem(valor) for nome, valor in filtros.items()]
+    ))
+
+
+def test_busca_e_cursor_na_ordem_da_planilha(db, snap):
+    posicoes = snap.indice_busca.buscar_todos(["FIAT"])
+    primeira = consultas_sql.buscar(db, "fiat", limite=5)
+    segunda = consultas_sql.buscar(db, "fiat", limite=5, cursor=primeira["proximo_cursor"])
+
+    assert primeira["total"] == segunda["total"] == len(posicoes)
+    assert primeira["linhas"] + segunda["linhas"] == [snap.json_busca[i] for i in posicoes[:10]]
+    assert primeira["mensagem"] is None
+
+
+def test_busca_sem_resultado_sugere(db, snap):
+    sugestao, _ = snap.sugestoes.sugerir(["FIATT"])
+    resultado = consultas_sql.buscar(db, "fiatt")
+
+    assert sugestao in resultado["mensagem"]
+    assert resultado["linhas"] == [snap.json_busca[i] for i in snap.indice_busca.buscar(sugestao)]
+
+
+def test_detalhe_pelo_codigo(db, snap):
+    codigo = snap.df_busca["codigo"].iat[10]
+    assert consultas_sql.detalhe(db, f" {codigo.lower()} ") == snap.json_busca[snap.posicao_por_codigo[codigo]]
+    assert consultas_sql.detalhe(db, "não existe") is None
+
+
+def test_carro_como_na_visao_de_favoritos(db, snap):
+    codigo = snap.df_favoritos["codigo"].iat[10]
+    esperado = snap.df_favoritos.iloc[snap.posicao_por_codigo[codigo.upper()]].to_dict()
+    carro = consultas_sql.carro(db, codigo)
+
+    for registro in [etl_catalogo.registro_veiculo, etl_catalogo.registro_emissao, etl_catalogo.registro_consumo,
+                     etl_catalogo.registro_quartil]:
+        assert registro(carro) == registro(esperado)
+    assert etl_catalogo.tipo_combustivel(carro) == etl_catalogo.tipo_combustivel(esperado)
+    assert consultas_sql.carro(db, "não existe") is None
+
+
+@pytest.mark.parametrize("busca", ["A", "O", "^[A-F]", "C3|C4|GOL"])
+def test_termo_com_muitos_valores(db, snap, monkeypatch, busca):
+    monkeypatch.setattr(consultas_sql, "MAX_VALORES_IN", 3)  # LIKE / NOT IN em vez da lista IN inteira
+
+    resultado = consultas_sql.buscar(db, busca)
+    assert resultado["linhas"] == [snap.json_busca[i] for i in snap.indice_busca.buscar_todos(busca.split())]
+    filtrado = consultas_sql.filtrar(db, {"marca": busca.lower()}, pagina=1, limite=50)
+    assert filtrado["linhas"] == _filtrar_memoria(snap, {"marca": busca.lower()}, 50)
+
+
+def test_cursor_invalido(db):
+    with pytest.raises(consultas_sql.CursorInvalido):
+        consultas_sql.filtrar(db, {}, 1, 10, "abc")
+    with pytest.raises(consultas_sql.CursorInvalido):
+        consultas_sql.buscar(db, "fiat", 10, "não existe")
+
+
+def test_recarga_apaga_as_linhas_que_sobraram(tmp_path, snap):
+    engine = create_engine(f"sqlite:///{tmp_path / 'recarga.db'}")
+    Base.metadata.create_all(bind=engine)
+    etl_catalogo.carregar_linhas_catalogo(engine, snap)
+    menor = CatalogoSnapshot(snap.df.head(20), CAMINHO_PLANILHA, 0.0, "menor")
+
+    assert etl_catalogo.carregar_linhas_catalogo(engine, menor) == 20
+    with Session(engine) as sessao:
+        assert consultas_sql.filtrar(sessao, {}, pagina=1, limite=50)["total"] == 20
+    engine.dispose()
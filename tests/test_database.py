@@ -0,0 +1,67 @@
+# tests/test_database.py
+"""PoolMedido: espera no checkout com o pool esgotado (pool_size=1) e o que /db/pool mostra."""
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+
+from backend import database
+from backend.database import PoolMedido, metricas_checkout
+from backend.main import app
+
+SEGURA = 0.3  # segundos que a primeira conexão fica presa
+
+
+def _engine(caminho, timeout: float):
+    return create_engine(
+        f"sqlite:///{caminho}", poolclass=PoolMedido, pool_size=1, max_overflow=0, pool_timeout=timeout,
+        connect_args={"check_same_thread": False},
+    )
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    engine = _engine(tmp_path / "pool.db", timeout=5)
+    monkeypatch.setattr(database, "engine", engine)  # o que /db/pool descreve
+    metricas_checkout.zerar()
+    yield engine
+    metricas_checkout.zerar()
+    engine.dispose()
+
+
+def test_segundo_checkout_espera_a_conexao(engine):
+    esperas = []
+
+    def segundo():
+        inicio = time.perf_counter()
+        with engine.connect():
+            esperas.append(time.perf_counter() - inicio)
+
+    primeira = engine.connect()
+    thread = threading.Thread(target=segundo)
+    thread.start()
+    time.sleep(SEGURA)
+    assert database.metricas_pool()["em_uso"] == 1 and not esperas  # a thread ainda está esperando
+    primeira.close()
+    thread.join()
+
+    pool = TestClient(app).get("/db/pool").json()
+    assert esperas[0] >= SEGURA * 0.9
+    assert (pool["classe"], pool["tamanho"], pool["em_uso"], pool["checkouts"], pool["timeouts"]) == ("PoolMedido", 1, 0, 2, 0)
+    assert pool["espera_max_ms"] >= SEGURA * 900
+    assert pool["espera_media_ms"] == pytest.approx(pool["espera_max_ms"] / 2, rel=0.1)  # a primeira não esperou
+
+
+def test_checkout_que_estoura_o_timeout(engine, tmp_path):
+    curto = _engine(tmp_path / "curto.db", timeout=0.1)
+    with curto.connect():
+        with pytest.raises(PoolTimeout):
+            curto.connect()
+    curto.dispose()
+
+    pool = TestClient(app).get("/db/pool").json()
+    assert (pool["checkouts"], pool["timeouts"]) == (1, 1)
+    assert pool["espera_max_ms"] >= 90
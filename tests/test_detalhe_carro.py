@@ -0,0 +1,80 @@
+# tests/test_detalhe_carro.py
+"""GET /carros/{id}: pelo código (modo memória e SQL), por veiculo_id e 404."""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from backend import cache_colunar, catalogo, consultas_sql, etl_catalogo, favoritos, main
+from backend.catalogo import CAMINHO_PLANILHA, CatalogoSnapshot, hash_arquivo
+from backend.database import Base
+from backend.main import app, get_db
+from backend.modelo import Veiculo
+
+
+@pytest.fixture(scope="module")
+def planilha():
+    return cache_colunar.ler_planilha(CAMINHO_PLANILHA, hash_arquivo(CAMINHO_PLANILHA)).head(100)
+
+
+@pytest.fixture(scope="module")
+def snap(planilha):
+    return CatalogoSnapshot(planilha, CAMINHO_PLANILHA, 0.0, "teste")
+
+
+@pytest.fixture
+def engine(tmp_path, planilha, snap):
+    engine = create_engine(f"sqlite:///{tmp_path / 'detalhe.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    etl_catalogo.carregar_dataframe(engine, planilha, snap=snap)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def cliente(engine, snap):
+    def sessao():
+        with Session(engine) as db:
+            yield db
+
+    favoritos.limpar_cache()
+    consultas_sql.limpar_cache()
+    catalogo.usar_snapshot(snap)
+    app.dependency_overrides[get_db] = sessao
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_db, None)
+    catalogo.reiniciar()
+
+
+def _veiculo_id(engine, codigo: str) -> int:
+    with engine.connect() as conn:
+        return conn.execute(select(Veiculo.veiculo_id).where(Veiculo.codigo == int(codigo))).scalar_one()
+
+
+@pytest.mark.parametrize("modo", ["memoria", "sql"])
+def test_pelo_codigo(cliente, snap, monkeypatch, modo):
+    monkeypatch.setattr(main, "MODO_CATALOGO", modo)
+    codigo = snap.df_busca["codigo"].iat[42]
+
+    resposta = cliente.get(f"/carros/{codigo.lower()} ")
+    assert resposta.status_code == 200
+    assert resposta.content == snap.json_busca[snap.posicao_por_codigo[codigo]]
+
+
+@pytest.mark.parametrize("modo", ["memoria", "sql"])
+def test_por_veiculo_id(cliente, snap, engine, monkeypatch, modo):
+    monkeypatch.setattr(main, "MODO_CATALOGO", modo)
+    codigo = snap.df_busca["codigo"].iat[7]
+
+    resposta = cliente.get(f"/carros/{_veiculo_id(engine, codigo)}", params={"por": "veiculo_id"})
+    assert resposta.status_code == 200
+    assert resposta.content == snap.json_busca[snap.posicao_por_codigo[codigo]]
+
+
+def test_inexistente_e_invalido(cliente, engine, snap):
+    maior = max(_veiculo_id(engine, c) for c in snap.df_busca["codigo"] if c.isdigit())
+
+    assert cliente.get("/carros/NAO-EXISTE").status_code == 404
+    assert cliente.get(f"/carros/{maior + 1}", params={"por": "veiculo_id"}).status_code == 404
+    assert cliente.get("/carros/abc", params={"por": "veiculo_id"}).status_code == 400
+    assert cliente.get("/carros/1", params={"por": "outro"}).status_code == 422
@@ -0,0 +1,69 @@
+# tests/test_dimensoes.py
+"""CacheDimensao: get-or-create concorrente e invalidação pela carga do catálogo."""
+import threading
+
+import pytest
+from sqlalchemy import create_engine, delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from backend import cache_colunar, dimensoes, etl_catalogo
+from backend.catalogo import CAMINHO_PLANILHA, hash_arquivo, preparar_favoritos
+from backend.database import Base
+from backend.dimensoes import CacheDimensao
+from backend.modelo import Combustivel, Consumo, Emissao
+
+THREADS = 8
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'dimensoes.db'}", connect_args={"timeout": 30})
+    Base.metadata.create_all(bind=engine)
+    dimensoes.combustiveis.invalidar()
+    yield engine
+    dimensoes.combustiveis.invalidar()
+    engine.dispose()
+
+
+def test_criar_ao_mesmo_tempo_da_um_id_so(engine):
+    cache = CacheDimensao(Combustivel, "tipo", "combustivel_id")
+    largada = threading.Barrier(THREADS)
+    ids = []
+
+    def criar():
+        with Session(engine) as db:
+            largada.wait()
+            ids.append(cache.obter_ou_criar(db, "HIDROGÊNIO"))
+
+    threads = [threading.Thread(target=criar) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with engine.connect() as conn:
+        linhas = conn.execute(select(Combustivel.combustivel_id).where(Combustivel.tipo == "HIDROGÊNIO")).all()
+    assert len(ids) == THREADS and len(linhas) == 1
+    assert set(ids) == {linhas[0][0]}
+
+
+def test_carga_do_catalogo_invalida_o_cache(engine):
+    df = cache_colunar.ler_planilha(CAMINHO_PLANILHA, hash_arquivo(CAMINHO_PLANILHA)).head(20)
+    etl_catalogo.carregar_dataframe(engine, df)
+    tipo = etl_catalogo.tipo_combustivel(preparar_favoritos(df).iloc[0].to_dict())
+    with Session(engine) as db:
+        antigo = dimensoes.combustiveis.obter(db, tipo)
+
+    # tabela refeita por fora (ex.: banco restaurado): os ids mudam
+    with engine.begin() as conn:
+        conn.execute(delete(Emissao))
+        conn.execute(delete(Consumo))
+        conn.execute(delete(Combustivel))
+        conn.execute(insert(Combustivel), [{"tipo": f"OUTRO {i}"} for i in range(5)])
+    etl_catalogo.carregar_dataframe(engine, df)
+
+    with Session(engine) as db:
+        novo = db.scalar(select(Combustivel.combustivel_id).where(Combustivel.tipo == tipo))
+        assert novo != antigo
+        assert dimensoes.combustiveis.obter(db, tipo) == novo
+        assert db.scalar(select(func.count()).select_from(Combustivel).where(Combustivel.tipo == tipo)) == 1
@@ -0,0 +1,101 @@
+# tests/test_etl_catalogo.py
+"""Carga do catálogo num SQLite temporário: idempotência e o índice único de veiculos.codigo."""
+import pytest
+from sqlalchemy import create_engine, create_mock_engine, func, select, text
+
+from backend import cache_colunar, catalogo, etl_catalogo
+from backend.catalogo import CAMINHO_PLANILHA, hash_arquivo
+from backend.database import Base
+from backend.modelo import Emissao, LinhaCatalogo, Veiculo
+
+
+@pytest.fixture(scope="module")
+def planilha():
+    return cache_colunar.ler_planilha(CAMINHO_PLANILHA, hash_arquivo(CAMINHO_PLANILHA)).head(200)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'etl.db'}")
+    yield engine
+    engine.dispose()
+
+
+def _contar(engine, modelo) -> int:
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(modelo)).scalar()
+
+
+def test_carga_idempotente(engine, planilha):
+    Base.metadata.create_all(bind=engine)
+
+    primeira = etl_catalogo.carregar_dataframe(engine, planilha, tamanho_lote=64)
+    veiculos, emissoes = _contar(engine, Veiculo), _contar(engine, Emissao)
+    segunda = etl_catalogo.carregar_dataframe(engine, planilha, tamanho_lote=64)
+
+    assert primeira["veiculos"] == segunda["veiculos"] == veiculos > 0
+    assert (_contar(engine, Veiculo), _contar(engine, Emissao)) == (veiculos, emissoes)
+
+
+def test_carga_sem_montar_o_snapshot(engine, planilha, monkeypatch):
+    snap = catalogo.CatalogoSnapshot(planilha, CAMINHO_PLANILHA, 0.0, "teste")
+
+    def proibido(*args, **kwargs):
+        raise AssertionError("a carga não deveria montar índices nem sugestões")
+
+    monkeypatch.setattr(catalogo.CatalogoSnapshot, "__init__", proibido)
+    Base.metadata.create_all(bind=engine)
+    etl_catalogo.carregar_dataframe(engine, planilha, tamanho_lote=64)
+
+    colunas = list(etl_catalogo.registro_veiculo(snap.df_favoritos.iloc[0].to_dict()))
+    with engine.connect() as conn:
+        veiculos = [dict(l) for l in conn.execute(select(*[Veiculo.__table__.c[c] for c in colunas])).mappings()]
+        jsons = conn.execute(select(LinhaCatalogo.json_filtro, LinhaCatalogo.json_busca).order_by(LinhaCatalogo.posicao)).all()
+    esperado = [
+        etl_catalogo.registro_veiculo(c) for c in snap.df_favoritos.to_dict(orient="records") if etl_catalogo.linha_valida(c)
+    ]
+    for v in veiculos + esperado:
+        v["scoreFinal"] = round(float(v["scoreFinal"]), 6)  # Numeric no banco
+    assert sorted(veiculos, key=lambda v: v["codigo"]) == sorted(esperado, key=lambda v: v["codigo"])
+    assert jsons == list(zip(snap.json_filtro, snap.json_busca))
+
+
+def test_banco_antigo_ganha_o_indice(engine, planilha):
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX uq_veiculos_codigo"))
+
+    assert "uq_veiculos_codigo" in etl_catalogo.garantir_indices(engine)
+    etl_catalogo.verificar_banco(engine)
+
+
+def test_banco_antigo_ganha_a_coluna(engine, planilha):
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE quartis_veiculo DROP COLUMN assinatura"))
+
+    assert etl_catalogo.garantir_colunas(engine) == ["quartis_veiculo.assinatura"]
+    etl_catalogo.carregar_dataframe(engine, planilha.head(20))
+    assert etl_catalogo.garantir_colunas(engine) == []
+
+
+def test_sem_indice_unico_recusa_a_carga(engine, planilha):
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX uq_veiculos_codigo"))
+        for _ in range(2):  # código repetido: o índice não pode ser recriado
+            conn.execute(text(
+                "INSERT INTO veiculos (codigo, ano, marca, modelo, ar_condicionado, direcao_assistida, scoreFinal, imagem_url) "
+                "VALUES (1, 2020, 'X', 'Y', 0, 'M', 0, '')"
+            ))
+
+    with pytest.raises(RuntimeError, match="uq_veiculos_codigo"):
+        etl_catalogo.carregar_dataframe(engine, planilha)
+    assert _contar(engine, Veiculo) == 2
+
+
+def test_dialeto_sem_upsert():
+    engine = create_mock_engine("postgresql://", lambda *args, **kwargs: None)  # só o dialeto, sem driver
+
+    with pytest.raises(RuntimeError, match="não suportado"):
+        etl_catalogo.verificar_banco(engine)
@@ -0,0 +1,92 @@
+# tests/test_favoritos.py
+"""ETag de /veiculos_favoritos: vem do banco, então vale entre workers."""
+import pytest
+from sqlalchemy import create_engine, delete, insert, select
+from sqlalchemy.orm import Session
+
+from backend import cache_colunar, etl_catalogo, favoritos
+from backend.catalogo import CAMINHO_PLANILHA, hash_arquivo, preparar_favoritos
+from backend.database import Base
+from backend.modelo import Favorito, Usuario
+
+
+@pytest.fixture(scope="module")
+def carros():
+    df = cache_colunar.ler_planilha(CAMINHO_PLANILHA, hash_arquivo(CAMINHO_PLANILHA)).head(5)
+    return preparar_favoritos(df).to_dict(orient="records")
+
+
+@pytest.fixture
+def db(tmp_path):
+    favoritos.limpar_cache()  # ids em cache de outro banco não valem aqui
+    engine = create_engine(f"sqlite:///{tmp_path / 'favoritos.db'}")
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as sessao:
+        sessao.add(Usuario(usuario_id=1, nome="Teste", email="teste@exemplo.com", senha="x"))
+        sessao.commit()
+        yield sessao
+    engine.dispose()
+
+
+def test_etag_muda_em_todos_os_workers(db, carros):
+    worker_a, worker_b = favoritos.CacheRespostas(), favoritos.CacheRespostas()
+    favoritos.alternar_favorito(db, 1, carros[0])
+
+    etag = worker_b.etag(db, 1)
+    corpo, _ = worker_b.obter(db, 1, etag=etag)
+    assert worker_a.etag(db, 1) == etag
+
+    favoritos.alternar_favorito(db, 1, carros[1])  # "no worker A": B não recebe invalidar()
+    novo = worker_b.etag(db, 1)
+    assert novo != etag
+    novo_corpo, _ = worker_b.obter(db, 1, etag=novo)
+    assert novo_corpo != corpo and len(favoritos.listar_favoritos(db, 1)[0]) == 2
+
+
+def test_trocar_o_ultimo_favorito_muda_o_etag(db, carros):
+    respostas = favoritos.CacheRespostas()
+    favoritos.alternar_favorito(db, 1, carros[0])
+    favoritos.alternar_favorito(db, 1, carros[1])
+    antes = respostas.etag(db, 1)
+
+    favoritos.alternar_favorito(db, 1, carros[1])
+    favoritos.alternar_favorito(db, 1, carros[2])  # mesma quantidade; o favorito_id não é reaproveitado
+    assert respostas.etag(db, 1) != antes
+
+
+def test_id_reaproveitado_muda_o_etag(db, carros):
+    """MySQL < 8 reaproveita o AUTO_INCREMENT depois de reiniciar: mesma quantidade e mesmo maior id."""
+    respostas = favoritos.CacheRespostas()
+    favoritos.alternar_favorito(db, 1, carros[0])
+    _, segundo = favoritos.alternar_favorito(db, 1, carros[1])
+    antes = respostas.etag(db, 1)
+
+    favorito_id = db.scalar(select(Favorito.favorito_id).where(Favorito.veiculo_id == segundo))
+    db.execute(delete(Favorito).where(Favorito.favorito_id == favorito_id))
+    db.commit()
+    _, terceiro = favoritos.alternar_favorito(db, 1, carros[2])
+    db.execute(delete(Favorito).where(Favorito.veiculo_id == terceiro))
+    db.execute(insert(Favorito).values(favorito_id=favorito_id, usuario_id=1, veiculo_id=terceiro))
+    db.commit()
+    assert respostas.etag(db, 1) != antes
+
+
+def test_carga_do_catalogo_muda_o_etag(db, carros):
+    respostas = favoritos.CacheRespostas()
+    favoritos.alternar_favorito(db, 1, carros[0])
+    antes = respostas.etag(db, 1)
+
+    with db.get_bind().begin() as conn:
+        etl_catalogo.marcar_versao(conn)
+    assert respostas.etag(db, 1) != antes
+
+
+def test_pagina_tem_etag_propria(db, carros):
+    respostas = favoritos.CacheRespostas()
+    for carro in carros[:3]:
+        favoritos.alternar_favorito(db, 1, carro)
+
+    etag = respostas.etag(db, 1, limite=2)
+    assert etag != respostas.etag(db, 1)
+    _, proximo = respostas.obter(db, 1, limite=2, etag=etag)
+    assert respostas.proximo_cursor(1, limite=2, etag=etag) == proximo is not None
@@ -0,0 +1,134 @@
+# tests/test_fila_email.py
+"""DespachanteEmail contra um servidor SMTP local (aiosmtpd), e /recuperar-senha com a fila cheia."""
+import socket
+
+import pytest
+from aiosmtpd.controller import Controller
+from aiosmtpd.handlers import Sink
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from backend import fila_email, senhas
+from backend.database import Base
+from backend.fila_email import DespachanteEmail, EnvioDesativado, FilaCheia
+from backend.main import app, get_db
+from backend.modelo import Usuario
+
+
+class Caixa(Sink):
+    """Guarda as mensagens recebidas e quantas sessões SMTP foram abertas."""
+
+    def __init__(self):
+        self.mensagens = []
+        self.sessoes = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.sessoes += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        self.mensagens.append((envelope.rcpt_tos, envelope.content.decode("utf-8", "replace")))
+        return "250 OK"
+
+
+def _porta_livre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture(autouse=True)
+def ocioso_curto(monkeypatch):
+    # parar() espera a thread sair do get(timeout=TEMPO_OCIOSO)
+    monkeypatch.setattr(fila_email, "TEMPO_OCIOSO", 0.2)
+
+
+@pytest.fixture
+def smtp():
+    caixa = Caixa()
+    controller = Controller(caixa, hostname="127.0.0.1", port=_porta_livre())
+    controller.start()
+    yield controller.port, caixa
+    controller.stop()
+
+
+def _despachante(porta: int, **kwargs) -> DespachanteEmail:
+    return DespachanteEmail(host="127.0.0.1", porta=porta, ssl=False, usuario="", senha="",
+                            remetente="teste@smvbr.local", **kwargs)
+
+
+def test_envia_em_uma_sessao(smtp):
+    porta, caixa = smtp
+    despachante = _despachante(porta)
+    for n in range(5):
+        despachante.enfileirar(f"pessoa{n}@exemplo.com", "Assunto", f"corpo {n}")
+    despachante.fila.join()
+    despachante.parar()
+
+    assert sorted(rcpt[0] for rcpt, _ in caixa.mensagens) == [f"pessoa{n}@exemplo.com" for n in range(5)]
+    assert caixa.sessoes == 1
+    m = despachante.metricas()
+    assert (m["enviados"], m["falhas"], m["conexoes_abertas"], m["profundidade"]) == (5, 0, 1, 0)
+
+
+def test_falha_tenta_de_novo_e_desiste(monkeypatch, capsys):
+    monkeypatch.setattr(fila_email, "BACKOFF_INICIAL", 0.01)
+    monkeypatch.setattr(fila_email, "MAX_TENTATIVAS", 3)
+    despachante = _despachante(_porta_livre())  # ninguém escutando
+
+    despachante.enfileirar("pessoa@exemplo.com", "Assunto", "senha temporária: Xy7kQ2")
+    despachante.fila.join()
+    despachante.parar()
+
+    m = despachante.metricas()
+    assert (m["enviados"], m["falhas"], m["tentativas_extras"]) == (0, 1, 2)
+    saida = capsys.readouterr().out
+    assert "pessoa@exemplo.com" in saida
+    assert "Xy7kQ2" not in saida  # o corpo (com a senha) nunca vai para o log
+
+
+def test_sem_senha_nao_envia():
+    despachante = DespachanteEmail(host="smtp.exemplo.com", usuario="alguem@exemplo.com", senha="")
+
+    assert not despachante.habilitado
+    with pytest.raises(EnvioDesativado):
+        despachante.enfileirar("pessoa@exemplo.com", "Assunto", "corpo")
+    assert despachante._thread is None
+
+
+class _EnchePelaOutraRequest(DespachanteEmail):
+    """Passa na conferência de cheia() e recusa ao enfileirar: outra request ocupou a última vaga."""
+
+    def enfileirar(self, destinatario: str, assunto: str, corpo: str, espera: float = 2.0):
+        self._contar("recusados_fila_cheia")
+        raise FilaCheia()
+
+
+def test_recuperar_senha_com_fila_cheia_mantem_a_senha(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'usuarios.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        db.add(Usuario(nome="Pessoa", email="pessoa@exemplo.com", senha="hash-anterior"))
+        db.commit()
+
+    def sessao():
+        with Session(engine) as db:
+            yield db
+
+    servico = senhas.ServicoSenhas(algoritmo="pbkdf2", custo=1000, processos=1)
+    monkeypatch.setattr(senhas, "servico", servico)
+    monkeypatch.setattr(fila_email, "despachante", _EnchePelaOutraRequest(host="127.0.0.1", usuario="", senha=""))
+    app.dependency_overrides[get_db] = sessao
+    try:
+        resposta = TestClient(app).post("/recuperar-senha", json={"email": "pessoa@exemplo.com"})
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        servico.encerrar()
+
+    assert resposta.status_code == 503
+    assert fila_email.despachante.metricas()["recusados_fila_cheia"] == 1
+    with Session(engine) as db:
+        assert db.scalar(select(Usuario.senha)) == "hash-anterior"
+    engine.dispose()
@@ -0,0 +1,123 @@
+# tests/test_indices.py
+"""Índices do snapshot respondem as mesmas linhas que o str.contains antigo, na planilha inteira."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend import cache_colunar
+from backend.catalogo import (
+    CAMINHO_PLANILHA, COLUNA_RANKING, COLUNAS_BUSCA, COLUNAS_FILTRO, FILTROS_NUMERICOS, CatalogoSnapshot, achar_coluna,
+    hash_arquivo,
+)
+from backend.indices import IndiceNgramas, intersectar, pagina_por_rank
+
+# termos curtos, longos, números, sem resultado e com caracteres de regex
+TERMOS_BUSCA = [
+    ["FIAT", "UNO"], ["GOL"], ["ONIX", "2019"], ["A"], ["20"], ["TOYOTA", "COROLLA", "2020"],
+    ["HB20"], ["NAO EXISTE"], ["X.Z"], ["UP!"], ["C3|C4"], ["GOL", "NAO EXISTE"], [],
+]
+
+# além de prefixos dos valores da própria planilha (ver _termos_filtro)
+TERMOS_FILTRO = ["nada disso", ".", "e|h", "automática", "MANUAL"]
+
+
+@pytest.fixture(scope="module")
+def snap():
+    df = cache_colunar.ler_planilha(CAMINHO_PLANILHA, hash_arquivo(CAMINHO_PLANILHA))
+    return CatalogoSnapshot(df, CAMINHO_PLANILHA, 0.0, "teste")
+
+
+def _busca_antiga(df, termos) -> np.ndarray:
+    """Varredura de /carros antes dos índices."""
+    df_filtrado = df
+    for termo in termos:
+        df_filtrado = df_filtrado[
+            df_filtrado["marca"].str.contains(termo, na=False) |
+            df_filtrado["modelo"].str.contains(termo, na=False) |
+            df_filtrado["ano"].str.contains(termo, na=False)
+        ]
+        if df_filtrado.empty:
+            break
+    return df_filtrado.index.to_numpy() if termos else np.array([], dtype=np.int64)
+
+
+def _filtro_antigo(df, col: str, valor) -> np.ndarray:
+    """Máscara de /filtro-carros antes dos índices."""
+    if isinstance(valor, int):
+        mascara = pd.to_numeric(df[col], errors="coerce") == valor
+    else:
+        mascara = df[col].astype(str).str.lower().str.contains(valor.lower(), na=False)
+    return np.flatnonzero(mascara.to_numpy())
+
+
+def _termos_filtro(df, col: str) -> list:
+    valores = df[col].dropna().astype(str).str.lower().unique()[:8]
+    return TERMOS_FILTRO + sorted({v[:2] for v in valores} | set(valores))
+
+
+@pytest.mark.parametrize("filtro", [f for f in COLUNAS_FILTRO if f not in FILTROS_NUMERICOS])
+def test_filtro_invertido_como_str_contains(snap, filtro):
+    col = achar_coluna(snap.df, COLUNAS_FILTRO[filtro])
+    indice = snap.indices_filtro[filtro]
+
+    for termo in _termos_filtro(snap.df, col):
+        np.testing.assert_array_equal(indice.contem(termo), _filtro_antigo(snap.df, col, termo), err_msg=termo)
+        np.testing.assert_array_equal(indice.contem(termo), _filtro_antigo(snap.df, col, termo))  # do cache
+
+
+def test_filtro_de_ano_e_combinacao(snap):
+    col_ano = achar_coluna(snap.df, COLUNAS_FILTRO["ano"])
+    for ano in [2013, 2019, 1900]:
+        np.testing.assert_array_equal(snap.indices_filtro["ano"].igual(ano), _filtro_antigo(snap.df, col_ano, ano))
+
+    col_marca = achar_coluna(snap.df, COLUNAS_FILTRO["marca"])
+    esperado = np.intersect1d(_filtro_antigo(snap.df, col_ano, 2019), _filtro_antigo(snap.df, col_marca, "fiat"))
+    obtido = intersectar([snap.indices_filtro["ano"].igual(2019), snap.indices_filtro["marca"].contem("fiat")])
+    assert len(esperado) > 0
+    np.testing.assert_array_equal(obtido, esperado)
+
+
+@pytest.mark.parametrize("termos", TERMOS_BUSCA)
+def test_ngramas_como_str_contains(snap, termos):
+    df = snap.df_busca.reset_index(drop=True)
+    indice = IndiceNgramas(df, COLUNAS_BUSCA)
+
+    np.testing.assert_array_equal(indice.buscar_todos(termos), _busca_antiga(df, termos))
+    np.testing.assert_array_equal(snap.indice_busca.buscar_todos(termos), _busca_antiga(df, termos))
+
+
+def test_cache_de_termos_nao_muda_o_resultado(snap):
+    indice = IndiceNgramas(snap.df_busca, COLUNAS_BUSCA)
+    quente = [indice.buscar_todos(t).copy() for t in TERMOS_BUSCA for _ in range(2)]
+
+    indice.limpar_cache()
+    frio = [indice.buscar_todos(t) for t in TERMOS_BUSCA for _ in range(2)]
+    for a, b in zip(quente, frio):
+        np.testing.assert_array_equal(a, b)
+
+
+def _ordenacao_antiga(snap, posicoes, kind="quicksort") -> pd.Series:
+    """Pontuação das linhas filtradas na ordem do sort_values antigo (a página inteira ordenada)."""
+    col = achar_coluna(snap.df, COLUNA_RANKING)
+    return pd.to_numeric(snap.df[col].iloc[posicoes], errors="coerce").sort_values(ascending=False, kind=kind)
+
+
+@pytest.mark.parametrize("filtros", [{"marca": "fiat"}, {"combustivel": "f", "transmissao": "auto"}, {"grupo": "luxo"}])
+@pytest.mark.parametrize("inicio,fim", [(0, 20), (20, 40), (37, 137), (0, 100000), (100000, 100020)])
+def test_pagina_por_rank_como_sort_values(snap, filtros, inicio, fim):
+    posicoes = intersectar([snap.indices_filtro[nome].contem(valor) for nome, valor in filtros.items()])
+    pagina = pagina_por_rank(posicoes, snap.rank, inicio, fim)
+
+    # empates ficam na ordem da planilha (o sort_values antigo, quicksort, não garantia ordem nenhuma)
+    estavel = _ordenacao_antiga(snap, posicoes, kind="stable")
+    np.testing.assert_array_equal(pagina, estavel.index.to_numpy()[inicio:fim])
+    col = achar_coluna(snap.df, COLUNA_RANKING)
+    np.testing.assert_array_equal(
+        snap.df[col].to_numpy(dtype=float)[pagina], _ordenacao_antiga(snap, posicoes).to_numpy()[inicio:fim],
+    )
+
+
+def test_ordem_sem_filtro_como_sort_values(snap):
+    todas = np.arange(len(snap))
+    np.testing.assert_array_equal(snap.ordem_ranking, _ordenacao_antiga(snap, todas, kind="stable").index.to_numpy())
+    np.testing.assert_array_equal(pagina_por_rank(todas, snap.rank, 50, 70), snap.ordem_ranking[50:70])
@@ -0,0 +1,54 @@
+# tests/test_inicializacao.py
+"""Aquecimento do startup: /pronto só responde 200 depois dele, e módulos adiados importados no primeiro uso."""
+import asyncio
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+
+from backend import cache_colunar, dimensoes, etl_catalogo, importacao, inicializacao
+from backend.catalogo import CAMINHO_PLANILHA, VisoesCatalogo, hash_arquivo
+from backend.database import Base
+from backend.main import app
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pronto.db'}")
+    Base.metadata.create_all(bind=engine)
+    df = cache_colunar.ler_planilha(CAMINHO_PLANILHA, hash_arquivo(CAMINHO_PLANILHA)).head(20)
+    etl_catalogo.carregar_linhas_catalogo(engine, VisoesCatalogo(df))
+    yield engine
+    inicializacao.prontidao.reiniciar()
+    dimensoes.combustiveis.invalidar()
+    engine.dispose()
+
+
+def test_pronto_so_depois_do_aquecimento(engine):
+    cliente = TestClient(app)  # sem o lifespan: o aquecimento roda aqui embaixo
+    inicializacao.prontidao.reiniciar()
+
+    antes = cliente.get("/pronto")
+    assert antes.status_code == 503
+    assert {c["estado"] for c in antes.json()["componentes"].values()} == {"pendente"}
+
+    asyncio.run(inicializacao.aquecer(engine, "sql"))
+
+    depois = cliente.get("/pronto")
+    assert depois.status_code == 200 and depois.json()["pronto"]
+    assert {c["estado"] for c in depois.json()["componentes"].values()} == {"pronto"}
+
+
+def test_modulo_preguicoso_importa_no_primeiro_acesso(tmp_path, monkeypatch):
+    (tmp_path / "modulo_adiado_teste.py").write_text("VALOR = 42\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, "modulo_adiado_teste", raising=False)
+
+    modulo = importacao.ModuloPreguicoso("modulo_adiado_teste")
+    assert not importacao.carregado(modulo) and "modulo_adiado_teste" not in sys.modules
+
+    assert modulo.VALOR == 42
+    assert importacao.carregado(modulo) and "modulo_adiado_teste" in sys.modules
+    assert importacao.carregar(modulo) is sys.modules["modulo_adiado_teste"]
+    monkeypatch.delitem(sys.modules, "modulo_adiado_teste")
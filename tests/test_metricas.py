@@ -0,0 +1,32 @@
+"""/metrics: o que os componentes contam sai como counter (_total), o resto como gauge."""
+import re
+
+from fastapi.testclient import TestClient
+
+from backend import metricas
+from backend.main import app
+
+
+def _tipos(texto: str) -> dict:
+    return dict(re.findall(r"^# TYPE (\S+) (\S+)$", texto, re.MULTILINE))
+
+
+def test_contadores_dos_componentes():
+    tipos = _tipos(TestClient(app).get("/metrics").text)
+
+    for nome in ("smvbr_fila_email_enviados", "smvbr_pesquisas_gravadas", "smvbr_senhas_hashes", "smvbr_db_pool_checkouts"):
+        assert tipos[f"{nome}_total"] == "counter"
+        assert nome not in tipos
+    for nome in ("smvbr_fila_email_profundidade", "smvbr_pesquisas_buffer", "smvbr_senhas_em_andamento", "smvbr_pronto"):
+        assert tipos[nome] == "gauge"
+
+
+def test_contador_externo_com_rotulos():
+    texto = metricas.Registro().texto(contadores={
+        "smvbr_teste": ("Teste", {(("rota", "/carros"),): 3}),
+        "smvbr_outro_total": ("Outro", 1),
+    })
+
+    assert 'smvbr_teste_total{rota="/carros"} 3' in texto
+    assert "smvbr_outro_total 1" in texto
+    assert _tipos(texto) == {"smvbr_outro_total": "counter", "smvbr_teste_total": "counter"}
@@ -0,0 +1,49 @@
+# tests/test_pesquisas.py
+"""Pesquisas populares: agrupadas no banco e refeitas fora das métricas."""
+import pytest
+from sqlalchemy import create_engine
+
+from backend import metricas
+from backend.database import Base
+from backend.pesquisas import RegistroPesquisas
+
+
+@pytest.fixture
+def registro(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pesquisas.db'}")
+    Base.metadata.create_all(bind=engine)
+    yield RegistroPesquisas(engine)
+    engine.dispose()
+
+
+def test_agrega_consultas_normalizadas(registro):
+    for pagina in range(1, 4):
+        registro.registrar("/filtro-carros", {"marca": "Toyota ", "pagina": pagina, "grupo": None})
+    for limite in (5, 10):
+        registro.registrar("/carros", {"busca": "fiat  UNO", "limite": limite})
+    registro.registrar("/carros", {"busca": "gol"})
+    registro.gravar()
+
+    assert registro.agregar(top=2) == [
+        {"rota": "/filtro-carros", "parametros": {"marca": "toyota"}, "total": 3},
+        {"rota": "/carros", "parametros": {"busca": "fiat uno"}, "total": 2},
+    ]
+
+
+def test_aquecimento_conta_falhas_e_nao_mede(registro):
+    def aquecedor(rota, parametros):
+        metricas.registro.incrementar("teste_aquecimento_total")
+        registro.registrar(rota, parametros)  # handler refeito: não vira pesquisa nova
+        if parametros["busca"] == "ruim":
+            raise ValueError("consulta inválida")
+
+    registro.configurar_aquecimento(aquecedor, lambda: "v1")
+    registro.populares = [
+        {"rota": "/carros", "parametros": {"busca": "ruim"}, "total": 2},
+        {"rota": "/carros", "parametros": {"busca": "boa"}, "total": 1},
+    ]
+    registro.aquecer()
+
+    m = registro.metricas()
+    assert (m["aquecimentos"], m["falhas_aquecimento"], m["registradas"]) == (1, 1, 0)
+    assert "teste_aquecimento_total" not in metricas.registro.texto()
@@ -0,0 +1,103 @@
+"""Quartis recalculados: só em quartis_veiculo, os mesmos na carga do catálogo, no /favoritar e no backend.quartis."""
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, select, update
+from sqlalchemy.orm import Session
+
+from backend import cache_colunar, catalogo, etl_catalogo, favoritos, quartis
+from backend.catalogo import CAMINHO_PLANILHA, hash_arquivo
+from backend.database import Base
+from backend.modelo import QuartilVeiculo, Usuario, Veiculo
+
+
+@pytest.fixture(scope="module")
+def planilha(tmp_path_factory):
+    """Planilha pequena num arquivo próprio: a carga e o backend.quartis leem o mesmo conteúdo."""
+    pasta = tmp_path_factory.mktemp("quartis")
+    df = cache_colunar.ler_planilha(CAMINHO_PLANILHA, hash_arquivo(CAMINHO_PLANILHA)).head(300)
+    df.to_excel(pasta / "catalogo.xlsx", index=False)
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(cache_colunar, "CACHE_DIR", str(pasta / "cache"))  # o cache desta planilha não vai para data/cache
+        yield str(pasta / "catalogo.xlsx")
+
+
+@pytest.fixture
+def engine(tmp_path):
+    favoritos.limpar_cache()
+    engine = create_engine(f"sqlite:///{tmp_path / 'quartis.db'}")
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+def _no_banco(engine) -> dict:
+    with engine.connect() as conn:
+        linhas = conn.execute(
+            select(Veiculo.codigo, Veiculo.scoreFinal, QuartilVeiculo.quartil_score, QuartilVeiculo.quartil_nmhc)
+            .join(QuartilVeiculo, QuartilVeiculo.veiculo_id == Veiculo.veiculo_id)
+        ).all()
+    return {str(c): (round(float(s), 6), q, n) for c, s, q, n in linhas}
+
+
+def _esperado(snap) -> dict:
+    """scoreFinal da planilha e quartis recalculados, como a carga e o /favoritar gravam."""
+    validas = quartis.linhas_validas(snap.df_favoritos)
+    df, banco = snap.df_favoritos[validas], snap.quartis_banco[validas]
+    return {
+        c: (round(float(s), 6), q, n)
+        for c, s, q, n in zip(df["codigo"], df["pontuacao_final"], banco["quartil_do_score"], banco["quartil_do_nmhc"])
+    }
+
+
+def test_respostas_mostram_a_planilha(planilha):
+    bruto = cache_colunar.ler_planilha(planilha, hash_arquivo(planilha))
+    snap = catalogo.carregar_snapshot(planilha)
+
+    # linhas em que o recalculo discorda da planilha
+    diferentes = np.flatnonzero(
+        snap.df_favoritos["quartil_do_score"].astype(str) != snap.quartis_banco["quartil_do_score"].astype(str)
+    )[:5]
+    assert len(diferentes)
+    for i in diferentes:
+        filtro, busca = json.loads(snap.json_filtro[i]), json.loads(snap.json_busca[i])
+        assert filtro["QUARTIL do score"] == busca["quartil do score"] == bruto["QUARTIL do score"].iat[i]
+        assert filtro["Pontuação Final"] == busca["pontuação final"] == pytest.approx(bruto["Pontuação Final"].iat[i])
+        assert filtro["QUARTIL do NMHC"] == bruto["QUARTIL do NMHC "].iat[i]
+
+    # o ranking de /filtro-carros segue a pontuação da planilha
+    pontuacao = pd.to_numeric(bruto["Pontuação Final"], errors="coerce")
+    np.testing.assert_array_equal(snap.ordem_ranking, pontuacao.sort_values(ascending=False, kind="stable").index)
+
+
+def test_carga_grava_o_recalculo_e_nao_e_refeita(engine, planilha):
+    etl_catalogo.carregar_catalogo(engine, planilha)
+
+    assert _no_banco(engine) == _esperado(catalogo.carregar_snapshot(planilha))
+    stats = quartis.executar(engine, planilha)
+    assert (stats["veiculos_alterados"], stats["grupos_regravados"]) == (0, 0)
+
+
+def test_grupo_desatualizado_e_regravado(engine, planilha):
+    etl_catalogo.carregar_catalogo(engine, planilha)
+    with engine.begin() as conn:
+        conn.execute(update(QuartilVeiculo).where(QuartilVeiculo.veiculo_id <= 3).values(assinatura="velha"))
+
+    stats = quartis.executar(engine, planilha)
+    assert 0 < stats["veiculos_alterados"] < len(_no_banco(engine))
+    assert stats["grupos_regravados"] == 1
+    assert quartis.executar(engine, planilha, completo=True)["veiculos_alterados"] == len(_no_banco(engine))
+
+
+def test_favoritar_grava_o_recalculo(engine, planilha):
+    snap = catalogo.carregar_snapshot(planilha)
+    carro = {**snap.df_favoritos.iloc[5].to_dict(), **snap.quartis_banco.iloc[5].to_dict()}  # como o /favoritar
+    with Session(engine) as db:
+        db.add(Usuario(usuario_id=1, nome="Teste", email="teste@exemplo.com", senha="x"))
+        db.commit()
+        favoritos.alternar_favorito(db, 1, carro)
+
+    assert _no_banco(engine) == {carro["codigo"]: _esperado(snap)[carro["codigo"]]}
+    assert quartis.executar(engine, planilha)["veiculos_alterados"] == 0
@@ -0,0 +1,74 @@
+# tests/test_senhas.py
+"""Senhas: migração do texto puro, rehash, backend ausente e FilaCheia (pool de processos de verdade)."""
+import asyncio
+
+import pytest
+
+from backend import senhas
+from backend.senhas import FilaCheia, ServicoSenhas
+
+CUSTO = 1000  # pbkdf2 barato: o teste mede o caminho, não o KDF
+
+
+@pytest.fixture(scope="module")
+def servico():
+    servico = ServicoSenhas(algoritmo="pbkdf2", custo=CUSTO, processos=1)
+    yield servico
+    servico.encerrar()
+
+
+def _rodar(corrotina):
+    return asyncio.run(corrotina)
+
+
+def test_texto_puro_migra_no_login(servico):
+    ok, novo = _rodar(servico.verificar("segredo", "segredo"))
+
+    assert ok and senhas.algoritmo_do_hash(novo) == "pbkdf2"
+    assert _rodar(servico.verificar("segredo", novo)) == (True, None)  # já atualizado: nada a regravar
+    assert _rodar(servico.verificar("outra", novo)) == (False, None)
+    assert servico.metricas()["migradas"] >= 1
+
+
+def test_hash_com_custo_antigo_e_refeito(servico):
+    antigo = senhas.gerar_hash("segredo", "pbkdf2", CUSTO // 2)
+
+    ok, novo = _rodar(servico.verificar("segredo", antigo))
+    assert ok and novo != antigo and not senhas.precisa_rehash(novo, "pbkdf2", CUSTO)
+
+
+@pytest.mark.parametrize("algoritmo", ["argon2", "bcrypt", "scrypt"])
+def test_hash_de_outro_algoritmo_migra(servico, algoritmo):
+    if not senhas._disponivel(algoritmo):
+        pytest.skip(f"{algoritmo} não instalado")
+    guardado = senhas.gerar_hash("segredo", algoritmo, {"argon2": 1, "bcrypt": 4, "scrypt": 10}[algoritmo])
+
+    ok, novo = _rodar(servico.verificar("segredo", guardado))
+    assert ok and senhas.algoritmo_do_hash(novo) == "pbkdf2"
+
+
+@pytest.mark.parametrize("antiga", ["$2b$minhasenha", "$argon2-senha", "$scrypt$abc", "$pbkdf2-sha256$x$y$z"])
+def test_texto_puro_com_prefixo_de_hash(servico, antiga):
+    assert senhas.conferir(antiga, antiga)
+    assert not senhas.conferir("outra", antiga)
+    ok, novo = _rodar(servico.verificar(antiga, antiga))
+    assert ok and senhas.algoritmo_do_hash(novo) == "pbkdf2"
+
+
+def test_backend_ausente_recusa_sem_erro(monkeypatch, capsys):
+    if not senhas._disponivel("bcrypt"):
+        pytest.skip("bcrypt não instalado")
+    guardado = senhas.gerar_hash("segredo", "bcrypt", 4)
+    monkeypatch.setattr(senhas, "bcrypt", None)
+
+    assert senhas.conferir("segredo", guardado) is False
+    assert "bcrypt" in capsys.readouterr().out
+
+
+def test_fila_cheia_recusa_sem_enfileirar():
+    servico = ServicoSenhas(algoritmo="pbkdf2", custo=CUSTO, processos=1, fila_max=0)
+
+    with pytest.raises(FilaCheia):
+        _rodar(servico.verificar("segredo", "segredo"))
+    assert servico.metricas()["recusadas_fila_cheia"] == 1
+    assert servico._executor is None  # nem subiu o pool
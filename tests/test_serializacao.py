@@ -0,0 +1,55 @@
+# tests/test_serializacao.py
+"""JSON pré-renderizado do snapshot: mesmos bytes que o JSONResponse antigo gerava a cada request."""
+import pytest
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+from backend import cache_colunar, catalogo
+from backend.catalogo import CAMINHO_PLANILHA, CatalogoSnapshot, hash_arquivo
+from backend.main import app
+from backend.serializacao import adicionar_imagem, montar_json
+
+
+@pytest.fixture(scope="module")
+def snap():
+    df = cache_colunar.ler_planilha(CAMINHO_PLANILHA, hash_arquivo(CAMINHO_PLANILHA))
+    return CatalogoSnapshot(df, CAMINHO_PLANILHA, 0.0, "teste")
+
+
+@pytest.fixture
+def cliente(snap):
+    catalogo.usar_snapshot(snap)
+    yield TestClient(app)
+    catalogo.reiniciar()
+
+
+def _antigo(conteudo) -> bytes:
+    """Corpo que o endpoint antigo devolvia para ``conteudo`` (dicts de adicionar_imagem)."""
+    return JSONResponse(content=jsonable_encoder(conteudo)).body
+
+
+@pytest.mark.parametrize("visao", ["filtro", "busca"])
+def test_cada_linha_igual_ao_json_antigo(snap, visao):
+    df, jsons = (snap.df, snap.json_filtro) if visao == "filtro" else (snap.df_busca, snap.json_busca)
+
+    assert len(jsons) == len(df)
+    for i, registro in enumerate(adicionar_imagem(df)):
+        assert jsons[i] == _antigo(registro), i
+
+
+def test_pagina_montada_igual_a_serializada(snap):
+    linhas = snap.ordem_ranking[100:150]
+    campos = {"total": len(snap), "pagina": 3, "limite": 50, "resultados": None}
+
+    corpo = montar_json(campos, "resultados", linhas, snap.json_filtro)
+    assert corpo == _antigo({**campos, "resultados": adicionar_imagem(snap.df.iloc[linhas])})
+
+
+def test_filtro_carros_responde_os_mesmos_bytes(cliente, snap):
+    resposta = cliente.get("/filtro-carros", params={"marca": "fiat", "pagina": 2, "limite": 10})
+
+    posicoes = snap.indices_filtro["marca"].contem("fiat")
+    linhas = posicoes[snap.rank[posicoes].argsort(kind="stable")][10:20]
+    esperado = {"total": len(posicoes), "pagina": 2, "limite": 10, "resultados": adicionar_imagem(snap.df.iloc[linhas])}
+    assert resposta.status_code == 200 and resposta.content == _antigo(esperado)
@@ -0,0 +1,107 @@
+# tests/test_usuarios.py
+"""GET /usuarios: páginas por keyset e exportações em streaming iguais à listagem antiga (query().all())."""
+import csv
+import io
+import json
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, delete, insert
+from sqlalchemy.orm import Session
+
+from backend import esquemas, usuarios
+from backend.database import Base
+from backend.main import app, get_db
+from backend.modelo import Usuario
+
+QUANTIDADE = 530
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'usuarios.db'}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Usuario), [
+            {"nome": f'Usuário {i}, "aspas"' if i % 7 == 0 else f"Usuário {i}", "email": f"u{i}@exemplo.com", "senha": "x"}
+            for i in range(QUANTIDADE)
+        ])
+        conn.execute(delete(Usuario).where(Usuario.usuario_id % 11 == 0))  # buracos nos ids
+    monkeypatch.setattr(usuarios, "engine", engine)
+    monkeypatch.setattr(usuarios, "TAMANHO_LOTE", 64)  # vários lotes na exportação
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def cliente(engine):
+    def sessao():
+        with Session(engine) as db:
+            yield db
+
+    app.dependency_overrides[get_db] = sessao
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_db, None)
+
+
+def _antigo(engine) -> list:
+    """Registros da listagem antiga: todos os ORM, validados pelo response_model."""
+    with Session(engine) as db:
+        return jsonable_encoder([esquemas.UsuarioResponse.model_validate(u) for u in db.query(Usuario).all()])
+
+
+def test_json_completo_igual_ao_antigo(cliente, engine):
+    resposta = cliente.get("/usuarios")
+
+    assert resposta.status_code == 200
+    assert resposta.content == JSONResponse(content=_antigo(engine)).body
+
+
+@pytest.mark.parametrize("limite", [1, 7, 64, 1000])
+def test_paginas_por_cursor_cobrem_tudo(cliente, engine, limite):
+    vistos, cursor = [], None
+    while True:
+        params = {"limite": limite, **({"cursor": cursor} if cursor is not None else {})}
+        resposta = cliente.get("/usuarios", params=params)
+        pagina = resposta.json()
+        assert len(pagina) <= limite
+        vistos.extend(pagina)
+        cursor = resposta.headers.get("X-Proximo-Cursor")
+        if cursor is None:
+            break
+        assert int(cursor) == pagina[-1]["usuario_id"]
+
+    assert vistos == _antigo(engine)
+
+
+def test_ndjson_e_csv(cliente, engine):
+    esperado = _antigo(engine)
+
+    ndjson = cliente.get("/usuarios", params={"formato": "ndjson"})
+    assert ndjson.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(l) for l in ndjson.text.splitlines()] == esperado
+
+    texto = cliente.get("/usuarios", params={"formato": "csv"}).text
+    linhas = list(csv.DictReader(io.StringIO(texto)))
+    assert [{**l, "usuario_id": int(l["usuario_id"])} for l in linhas] == esperado
+
+
+def test_exportacao_a_partir_do_cursor(engine):
+    esperado = _antigo(engine)
+    cursor = esperado[99]["usuario_id"]
+
+    corpo = b"".join(usuarios.exportar_ndjson(cursor, 150))
+    assert [json.loads(l) for l in corpo.splitlines()] == esperado[100:250]
+    assert json.loads(b"".join(usuarios.exportar_json(cursor))) == esperado[100:]
+
+
+def test_tabela_vazia(engine, cliente):
+    with Session(engine) as db:
+        db.execute(delete(Usuario))
+        db.commit()
+
+    assert cliente.get("/usuarios").json() == []
+    assert cliente.get("/usuarios", params={"formato": "csv"}).text == "usuario_id,nome,email\r\n"
+    assert cliente.get("/usuarios", params={"formato": "ndjson"}).content == b""
@@ -0,0 +1,144 @@
+# tests/test_verificacao_email.py
+"""VerificadorEmail contra um servidor HTTP stub local (sem rede externa)."""
+import asyncio
+import http.server
+import json
+import threading
+import time
+
+import pytest
+
+from backend.verificacao_email import Disjuntor, VerificadorEmail
+
+
+class Stub(http.server.ThreadingHTTPServer):
+    """Responde GET com ``self.status``/``self.corpo`` depois de ``self.atraso`` segundos."""
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.status = 200
+        self.corpo = {"valid": True}
+        self.atraso = 0.0
+        self.chamadas = []
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/api/verify"
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.chamadas.append(self.path)
+        time.sleep(self.server.atraso)
+        dados = json.dumps(self.server.corpo).encode()
+        self.send_response(self.server.status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    servidor = Stub()
+    thread = threading.Thread(target=servidor.serve_forever, daemon=True)
+    thread.start()
+    yield servidor
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def _verificar(verificador: VerificadorEmail, *emails):
+    async def rodar():
+        try:
+            return [await verificador.verificar(e) for e in emails]
+        finally:
+            await verificador.fechar()
+
+    return asyncio.run(rodar())
+
+
+def test_resultado_da_api_e_cache(stub):
+    verificador = VerificadorEmail(url=stub.url)
+    stub.corpo = {"valid": False}
+
+    assert _verificar(verificador, "Fulano@Exemplo.com", "fulano@exemplo.com ") == [False, False]
+    assert len(stub.chamadas) == 1  # a segunda veio do cache (e-mail normalizado)
+
+
+def test_disjuntor_abre_e_fecha(stub):
+    disjuntor = Disjuntor(falhas_para_abrir=2, tempo_aberto=0.2)
+    verificador = VerificadorEmail(url=stub.url, disjuntor=disjuntor)
+    stub.status = 500
+
+    assert _verificar(verificador, "a@x.com", "b@x.com", "c@x.com") == [None, None, None]
+    assert len(stub.chamadas) == 2  # aberto: a terceira nem chamou a API
+    assert disjuntor.estado == "aberto"
+
+    time.sleep(0.25)
+    stub.status = 200
+    assert _verificar(verificador, "d@x.com") == [True]  # tentativa do meio-aberto
+    assert disjuntor.estado == "fechado"
+
+
+def test_resposta_lenta_conta_como_falha(stub):
+    disjuntor = Disjuntor(falhas_para_abrir=1, tempo_aberto=60)
+    verificador = VerificadorEmail(url=stub.url, limiar_lentidao=0.05, disjuntor=disjuntor)
+    stub.atraso = 0.1
+
+    assert _verificar(verificador, "lento@x.com") == [True]
+    assert disjuntor.estado == "aberto"
+
+
+def test_resposta_inesperada_libera_meio_aberto(stub):
+    disjuntor = Disjuntor(falhas_para_abrir=1, tempo_aberto=0.1)
+    verificador = VerificadorEmail(url=stub.url, disjuntor=disjuntor)
+    stub.corpo = ["não", "é", "objeto"]
+
+    assert _verificar(verificador, "a@x.com") == [None]
+    time.sleep(0.15)
+    assert _verificar(verificador, "b@x.com") == [None]  # tentativa do meio-aberto falhou de novo
+
+    time.sleep(0.15)
+    stub.corpo = {"valid": True}
+    assert _verificar(verificador, "c@x.com") == [True]  # a tentativa seguinte foi permitida
+    assert disjuntor.estado == "fechado"
+
+
+def test_erro_nao_previsto_conta_como_falha(stub, monkeypatch):
+    disjuntor = Disjuntor(falhas_para_abrir=1, tempo_aberto=0.1)
+    verificador = VerificadorEmail(url=stub.url, disjuntor=disjuntor)
+
+    async def explode(*args, **kwargs):
+        raise RuntimeError("bug")
+
+    monkeypatch.setattr(verificador, "_obter_client", lambda: type("C", (), {"get": explode})())
+    with pytest.raises(RuntimeError):
+        _verificar(verificador, "a@x.com")
+    assert disjuntor.estado == "aberto"
+
+    monkeypatch.undo()
+    time.sleep(0.15)
+    assert _verificar(verificador, "b@x.com") == [True]
+    assert disjuntor.estado == "fechado"
+
+
+def test_dominio_invalido_fica_em_cache(stub):
+    verificador = VerificadorEmail(url=stub.url)
+    stub.corpo = {"valid": False, "status": "INVALID_DOMAIN", "validations": {"domain_exists": False}}
+
+    assert _verificar(verificador, "a@morto.com", "b@morto.com", "c@Morto.com") == [False, False, False]
+    assert len(stub.chamadas) == 1
+
+
+def test_endereco_invalido_nao_condena_o_dominio(stub):
+    verificador = VerificadorEmail(url=stub.url)
+    stub.corpo = {"valid": False, "status": "INVALID_FORMAT", "validations": {"domain_exists": True, "mx_records": True}}
+    assert _verificar(verificador, "a@vivo.com") == [False]
+
+    stub.corpo = {"valid": True}
+    assert _verificar(verificador, "b@vivo.com") == [True]
+    assert len(stub.chamadas) == 2